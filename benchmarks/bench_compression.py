@@ -0,0 +1,63 @@
+"""
+Compare stored size and encode/decode throughput of JSON column values,
+plain and with each compression codec.
+
+Usage: python benchmarks/bench_compression.py [nvalues]
+"""
+import json
+import random
+import sys
+import time
+from dbrm.compression import encode, decoder
+from dbrm.rows import DECODERS
+
+
+def make_documents(nvalues):
+    rng = random.Random(42)
+    statuses = ["pending", "shipped", "delivered", "returned"]
+    return [
+        {
+            "order_id": i,
+            "status": statuses[i % 4],
+            "customer": {"id": rng.randrange(10_000), "country": rng.choice(["DE", "FR", "US", "CN"])},
+            "lines": [
+                {"sku": f"SKU-{rng.randrange(5000):05d}", "qty": rng.randrange(1, 5),
+                 "price": round(rng.uniform(1, 200), 2), "note": ""}
+                for _ in range(rng.randrange(1, 8))
+            ],
+        }
+        for i in range(nvalues)
+    ]
+
+
+def measure(label, documents, encode_value, decode_value):
+    start = time.perf_counter()
+    stored = [encode_value(doc) for doc in documents]
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for value in stored:
+        decode_value(value)
+    decode_seconds = time.perf_counter() - start
+
+    size = sum(len(value) for value in stored)
+    print(f"{label:<6} {size / len(stored):8.1f} B/value {len(stored) / encode_seconds:12,.0f} enc/s"
+          f" {len(stored) / decode_seconds:12,.0f} dec/s")
+    return size
+
+
+def main(nvalues=20_000):
+    documents = make_documents(nvalues)
+    print(f"{nvalues:,} JSON documents")
+    plain = measure("plain", documents, lambda doc: json.dumps(doc).encode(), DECODERS['dict'])
+    for codec in ("zlib", "zstd"):
+        try:
+            encode({}, 'dict', codec)
+        except ImportError as e:
+            print(f"{codec:<6} skipped: {e}")
+            continue
+        size = measure(codec, documents, lambda doc: encode(doc, 'dict', codec), decoder(DECODERS['dict']))
+        print(f"{'':<6} {plain / size:8.2f}x smaller on the wire")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,53 @@
+"""
+Import-time benchmark for ``import dbrm``.
+
+Runs the import in fresh interpreters, reports the median wall time and
+exits non-zero if a heavy dependency is loaded eagerly or the median
+exceeds the budget.
+
+Usage: python benchmarks/bench_import.py [runs] [budget_ms]
+"""
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pandas", "numpy", "pyodbc", "dotenv", "pyarrow")
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import dbrm\n"
+    "elapsed = time.perf_counter() - start\n"
+    f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+    "print(elapsed, ','.join(loaded))\n"
+)
+
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), output[1].split(",") if len(output) > 1 else []
+
+
+def main(runs=10, budget_ms=150.0):
+    timings, loaded = [], set()
+    for _ in range(runs):
+        elapsed, modules = run_once()
+        timings.append(elapsed * 1000)
+        loaded.update(modules)
+
+    median = statistics.median(timings)
+    print(f"import dbrm: median {median:.1f} ms, min {min(timings):.1f} ms over {runs} runs")
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(sorted(loaded))}")
+        return 1
+    if median > budget_ms:
+        print(f"FAIL: median import time exceeds budget of {budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(int(args[0]) if args else 10, float(args[1]) if len(args) > 1 else 150.0))
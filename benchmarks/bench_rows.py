@@ -0,0 +1,48 @@
+"""
+Compare memory per row and build time of tuples, dicts and generated
+``__slots__`` row classes.
+
+Usage: python benchmarks/bench_rows.py [nrows]
+"""
+import sys
+import time
+import tracemalloc
+from dbrm import Table, Column, Integer, String, Float, DateTime
+
+
+class Event(Table):
+    __tablename__ = 'events'
+    id = Column(Integer, primary_key=True)
+    customer_id = Column(Integer)
+    kind = Column(String)
+    amount = Column(Float)
+    created_at = Column(DateTime)
+
+
+def measure(label, build, source):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = build(source)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_row = size / len(rows)
+    print(f"{label:<8} {per_row:8.1f} B/row {len(rows) / elapsed:14,.0f} rows/s")
+    return rows
+
+
+def main(nrows=200_000):
+    names = list(Event._columns)
+    # Values are shared between all containers so only container overhead is measured
+    kinds = ["click", "view", "purchase"]
+    source = [[i, i % 977, kinds[i % 3], i * 0.5, None] for i in range(nrows)]
+    make_row = Event.row_class()
+
+    print(f"{nrows:,} rows with {len(names)} columns")
+    measure("tuple", lambda rows: [tuple(row) for row in rows], source)
+    measure("dict", lambda rows: [dict(zip(names, row)) for row in rows], source)
+    measure("slots", lambda rows: [make_row(row) for row in rows], source)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
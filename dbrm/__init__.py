@@ -1,8 +1,41 @@
-from .engine import Engine
-from .session import Session
-from .schema import Table, Column
+import importlib
+from .engine import Engine, ReplicatedEngine
+from .scheduler import Workload, default_workloads, workload
+from .session import Session, ReadOnlyError
+from .scoping import ScopedSession, scoped_session
+from .metrics import Metrics
+from .timeouts import QueryTimeout, deadline
+from .writer import BufferedWriter
+from .mirror import Mirror
+from .profiling import LoadReport
+from .lobs import open_blob, write_blob
+from .result import Result
+from .spill import SpilledResult
+from .schema import Table, Column, Index
+from .sharding import ShardedEngine
 from .query import Select, Insert, Update, Delete
-from .remote import transfer_csv
+from .lazyframe import LazyFrame, frame, col
+from .expression import text
+
+# Attributes whose modules pull in pandas/numpy are imported on first access
+_LAZY_ATTRIBUTES = {
+    'transfer_csv': '.remote',
+    'transfer_table': '.remote',
+    'SQLTable': '.sqltable',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 # Define types that map to SQL types
 Integer = int
@@ -18,18 +51,43 @@ BLOB = 'bytes'
 __all__ = [
     # Core components
     'Engine', 
+    'ReplicatedEngine',
+    'Workload',
+    'default_workloads',
+    'workload',
+    'ShardedEngine',
     'Session',
+    'ReadOnlyError',
+    'ScopedSession',
+    'scoped_session',
+    'Metrics',
+    'QueryTimeout',
+    'deadline',
+    'BufferedWriter',
+    'Mirror',
+    'Result',
+    'SpilledResult',
     'Table', 
     'Column',
+    'Index',
     
     # Query builders
     'Select',
     'Insert',
     'Update',
     'Delete',
+    'text',
+    'LazyFrame',
+    'frame',
+    'col',
     
     # Data transfer
     'transfer_csv',
+    'transfer_table',
+    'SQLTable',
+    'LoadReport',
+    'open_blob',
+    'write_blob',
     
     # Types
     'Integer',
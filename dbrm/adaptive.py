@@ -0,0 +1,165 @@
+"""
+Adaptive batch sizing for bulk inserts and fetches.
+"""
+
+import sys
+import time
+from itertools import islice
+
+
+class ChunkSizeController:
+    """Adapts batch sizes to the throughput and latency of each batch.
+
+    After every batch, ``record`` compares rows/s with the previous batch
+    and keeps moving the size in the same direction while throughput
+    improves, reversing when it drops (a simple hill climb). Batches that
+    take longer than ``target_latency`` always shrink the size. The size
+    stays between ``min_size`` and an upper bound set by ``max_size``,
+    ``max_params`` (per statement, divided by the column count) and
+    ``memory_limit`` (divided by the estimated bytes per row).
+    """
+
+    def __init__(self, initial=1000, min_size=100, max_size=100_000,
+                 target_latency=2.0, factor=2.0, tolerance=0.05,
+                 max_params=None, columns=None, memory_limit=None, row_bytes=None):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.factor = factor
+        self.tolerance = tolerance
+        self.max_params = max_params
+        self.columns = columns
+        self.memory_limit = memory_limit
+        self.row_bytes = row_bytes
+        self.size = self._clamp(initial)
+        self.history = []
+        self._direction = 1
+        self._last_rate = None
+
+    @property
+    def upper_bound(self):
+        """Largest batch size allowed by the size, parameter and memory limits."""
+        bound = self.max_size
+        if self.max_params and self.columns:
+            bound = min(bound, self.max_params // self.columns)
+        if self.memory_limit and self.row_bytes:
+            bound = min(bound, int(self.memory_limit // self.row_bytes))
+        return max(bound, self.min_size)
+
+    def _clamp(self, size):
+        return int(min(max(size, self.min_size), self.upper_bound))
+
+    def record(self, rows, seconds):
+        """Record a finished batch and return the size for the next one."""
+        if rows <= 0:
+            return self.size
+        seconds = max(seconds, 1e-9)
+        rate = rows / seconds
+        self.history.append((rows, seconds, rate))
+
+        # Partial batches (e.g. the last one) are not a fair comparison
+        if rows < self.size and seconds <= self.target_latency:
+            return self.size
+
+        if seconds > self.target_latency:
+            self._direction = -1
+        elif self._last_rate is not None and rate < self._last_rate * (1 - self.tolerance):
+            self._direction = -self._direction
+        self._last_rate = rate
+
+        step = self.factor if self._direction > 0 else 1 / self.factor
+        self.size = self._clamp(self.size * step)
+        return self.size
+
+    def batches(self, iterator):
+        """Split an iterator into lists, each sized by the current setting."""
+        iterator = iter(iterator)
+        while True:
+            batch = list(islice(iterator, self.size))
+            if not batch:
+                return
+            yield batch
+
+    def timed(self, rows):
+        """Context manager that records the batch when the block finishes."""
+        return _Timer(self, rows)
+
+    @property
+    def throughput(self):
+        """Overall rows per second across all recorded batches."""
+        rows = sum(r for r, _, _ in self.history)
+        seconds = sum(s for _, s, _ in self.history)
+        return rows / seconds if seconds else 0.0
+
+
+class _Timer:
+    def __init__(self, controller, rows):
+        self.controller = controller
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.controller.record(self.rows, time.perf_counter() - self.start)
+
+
+def controller_for(chunk_size, **kwargs):
+    """
+    Build a controller for ``chunk_size="auto"``, or None for fixed sizes.
+    Args:
+        chunk_size: An int, None or "auto".
+        kwargs: Bounds passed to ChunkSizeController.
+    Returns:
+        ChunkSizeController | None: The controller in auto mode.
+    """
+    if chunk_size == "auto":
+        return ChunkSizeController(**kwargs)
+    if isinstance(chunk_size, str):
+        raise ValueError(f"'{chunk_size}' is not a valid chunk size")
+    return None
+
+
+def fetch_batches(cursor, batch_size=1000, **kwargs):
+    """
+    Yield row batches from a cursor with ``fetchmany``.
+
+    With ``batch_size="auto"`` the fetch size (and ``cursor.arraysize``)
+    is adjusted from the measured time of each fetch. The memory bound
+    uses the size of the first batch to estimate bytes per row.
+
+    Args:
+        cursor: A DBAPI cursor with a pending result set.
+        batch_size: Rows per fetch, or "auto".
+        kwargs: Bounds passed to ChunkSizeController in auto mode.
+    Yields:
+        list: The next batch of rows.
+    """
+    controller = controller_for(batch_size, **kwargs)
+    if controller is None:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+
+    while True:
+        size = controller.size
+        cursor.arraysize = size
+        start = time.perf_counter()
+        batch = cursor.fetchmany(size)
+        elapsed = time.perf_counter() - start
+        if not batch:
+            return
+        if controller.memory_limit and controller.row_bytes is None:
+            controller.row_bytes = _estimate_row_bytes(batch)
+        controller.record(len(batch), elapsed)
+        yield batch
+
+
+def _estimate_row_bytes(batch, sample=100):
+    rows = batch[:sample]
+    total = sum(sys.getsizeof(value) for row in rows for value in row)
+    return max(total / len(rows), 1)
@@ -0,0 +1,111 @@
+"""
+Explicit parameter types for executemany and bulk conversion of DataFrame values.
+
+pyodbc otherwise guesses each parameter's type and size from the first row,
+which forces re-binds and can truncate longer values in later rows.
+"""
+
+import re
+from contextlib import contextmanager
+
+# ODBC SQL type codes (the pyodbc.SQL_* constants)
+SQL_BIT = -7
+SQL_BIGINT = -5
+SQL_DOUBLE = 8
+SQL_VARBINARY = -3
+SQL_WVARCHAR = -9
+SQL_TYPE_DATE = 91
+SQL_TYPE_TIMESTAMP = 93
+
+_VARCHAR = re.compile(r"^N?VARCHAR\((\d+)\)$", re.IGNORECASE)
+
+
+def input_size(sql_type, dialect=None):
+    """
+    ODBC parameter binding for a SQL column type.
+    Args:
+        sql_type (str): A type as produced by DTYPE_MAPPING, e.g. 'VARCHAR(255)'.
+        dialect (str, optional): Dialect name; SQL Server DATETIME only takes
+                                 milliseconds.
+    Returns:
+        tuple | None: (sql_type, column_size, decimal_digits), or None to let
+                      the driver decide.
+    """
+    sql_type = sql_type.upper()
+    match = _VARCHAR.match(sql_type)
+    if match:
+        return (SQL_WVARCHAR, int(match.group(1)), 0)
+    if sql_type in ('TEXT', 'JSON'):
+        return (SQL_WVARCHAR, 0, 0)
+    if sql_type in ('INTEGER', 'BIGINT'):
+        return (SQL_BIGINT, 0, 0)
+    if sql_type in ('DOUBLE', 'FLOAT'):
+        return (SQL_DOUBLE, 0, 0)
+    if sql_type == 'BOOLEAN':
+        return (SQL_BIT, 0, 0)
+    if sql_type == 'DATE':
+        return (SQL_TYPE_DATE, 10, 0)
+    if sql_type == 'DATETIME':
+        return (SQL_TYPE_TIMESTAMP, 23, 3) if dialect == 'mssql' else (SQL_TYPE_TIMESTAMP, 26, 6)
+    if sql_type == 'BLOB':
+        return (SQL_VARBINARY, 0, 0)
+    return None
+
+
+def input_sizes(sql_types, dialect=None) -> list:
+    """Parameter bindings for a list of SQL column types."""
+    return [input_size(sql_type, dialect) for sql_type in sql_types]
+
+
+def column_input_sizes(columns, dialect=None) -> list:
+    """Parameter bindings for declarative ``Column`` objects."""
+    return [input_size(column.sql_type, dialect) for column in columns]
+
+
+@contextmanager
+def bound_input_sizes(cursor, sizes):
+    """Apply ``setinputsizes`` for the block and clear it afterwards."""
+    if not sizes or not hasattr(cursor, 'setinputsizes') or all(size is None for size in sizes):
+        yield
+        return
+    cursor.setinputsizes(sizes)
+    try:
+        yield
+    finally:
+        # pyodbc keeps input sizes for later statements on the cursor
+        cursor.setinputsizes(None)
+
+
+def column_values(series) -> list:
+    """
+    Convert a pandas Series to a list of Python values in one pass.
+
+    Numeric and datetime columns are converted from their NumPy arrays in
+    bulk rather than boxed cell by cell; missing values become None.
+    """
+    import numpy as np
+
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind in 'iub':
+        return values.tolist()
+    if kind == 'f':
+        converted = values.tolist()
+        for i in np.flatnonzero(np.isnan(values)):
+            converted[i] = None
+        return converted
+    if kind == 'M':
+        converted = values.astype('datetime64[us]').tolist()
+        for i in np.flatnonzero(np.isnat(values)):
+            converted[i] = None
+        return converted
+    missing = series.isna().to_numpy()
+    converted = values.tolist()
+    for i in np.flatnonzero(missing):
+        converted[i] = None
+    return converted
+
+
+def frame_rows(frame):
+    """Iterate over a DataFrame's rows as tuples of Python values."""
+    return zip(*(column_values(frame[col]) for col in frame.columns))
@@ -0,0 +1,126 @@
+"""
+Client-side compression of JSON, TEXT and BLOB column values.
+
+Compressed values are stored as bytes behind a 4-byte frame header: the
+magic bytes ``b"\\xdbZ"``, the format version and the codec id. Values
+without the header are read as plain values, so a column can hold both
+while it is being migrated.
+"""
+
+import json
+import threading
+import zlib
+
+MAGIC = b"\xdbZ"
+VERSION = 1
+HEADER_SIZE = 4
+
+# Codec ids in the frame header; STORED marks values that did not shrink
+STORED = 0
+ZLIB = 1
+ZSTD = 2
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+
+_local = threading.local()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("compress='zstd' requires the zstandard package") from None
+    return zstandard
+
+
+def _zstd_compressor(level):
+    # Compressor objects are not safe for concurrent use, so keep one per thread
+    compressors = _local.__dict__.setdefault("zstd", {})
+    compressor = compressors.get(level)
+    if compressor is None:
+        compressor = compressors[level] = _zstandard().ZstdCompressor(level=level)
+    return compressor
+
+
+def _zstd_decompressor():
+    decompressor = getattr(_local, "zstd_decompressor", None)
+    if decompressor is None:
+        decompressor = _local.zstd_decompressor = _zstandard().ZstdDecompressor()
+    return decompressor
+
+
+def check_codec(codec):
+    """Validate a codec name; returns its id."""
+    if codec not in CODECS:
+        raise ValueError(f"'{codec}' is not a supported codec; use one of {sorted(CODECS)}")
+    if codec == "zstd":
+        _zstandard()
+    return CODECS[codec]
+
+
+def compress(data, codec="zlib", level=None):
+    """
+    Compress bytes into a framed value.
+    Args:
+        data (bytes): The serialized value.
+        codec (str): 'zlib' or 'zstd'.
+        level (int, optional): Compression level; the codec's default if omitted.
+    Returns:
+        bytes: Header and payload; the payload is stored as is when
+               compressing would not make it smaller.
+    """
+    codec_id = check_codec(codec)
+    if codec_id == ZLIB:
+        payload = zlib.compress(data, 6 if level is None else level)
+    else:
+        payload = _zstd_compressor(3 if level is None else level).compress(data)
+    if len(payload) >= len(data):
+        codec_id, payload = STORED, data
+    return MAGIC + bytes((VERSION, codec_id)) + payload
+
+
+def is_framed(value):
+    """Whether a stored value carries the compression frame header."""
+    return (
+        isinstance(value, (bytes, bytearray, memoryview))
+        and len(value) >= HEADER_SIZE
+        and bytes(value[:3]) == MAGIC + bytes((VERSION,))
+    )
+
+
+def decompress(value):
+    """Payload of a framed value; plain values are returned unchanged."""
+    if not is_framed(value):
+        return value
+    value = bytes(value)
+    codec_id, payload = value[3], value[HEADER_SIZE:]
+    if codec_id == STORED:
+        return payload
+    if codec_id == ZLIB:
+        return zlib.decompress(payload)
+    if codec_id == ZSTD:
+        return _zstd_decompressor().decompress(payload)
+    raise ValueError(f"Unknown compression codec id {codec_id}")
+
+
+def serialize(value, type_name):
+    """Bytes to compress for a value of a column type ('dict', 'list', 'text', 'bytes', ...)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if type_name in ('dict', 'list') and not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"))
+    return str(value).encode('utf-8')
+
+
+def encode(value, type_name, codec, level=None):
+    """Serialize and compress a column value; None and framed values are returned unchanged."""
+    if value is None or is_framed(value):
+        return value
+    return compress(serialize(value, type_name), codec, level)
+
+
+def decoder(decode=None):
+    """Wrap a row decoder so framed values are decompressed first."""
+    def decode_compressed(value):
+        value = decompress(value)
+        return decode(value) if decode is not None else value
+    return decode_compressed
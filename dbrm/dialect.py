@@ -0,0 +1,50 @@
+"""
+SQL dialect detection.
+"""
+
+# ODBC info type for the DBMS product name (pyodbc.SQL_DBMS_NAME)
+SQL_DBMS_NAME = 17
+
+_HINTS = (
+    ('sql server', 'mssql'),
+    ('sqlserver', 'mssql'),
+    ('mariadb', 'mysql'),
+    ('mysql', 'mysql'),
+    ('postgres', 'postgresql'),
+    ('psql', 'postgresql'),
+    ('sqlite', 'sqlite'),
+)
+
+
+def from_name(name) -> str:
+    """
+    Guess the dialect from a driver, DBMS or connection string.
+    Args:
+        name: Text naming the database product.
+    Returns:
+        str: 'mssql', 'mysql', 'postgresql', 'sqlite' or 'generic'.
+    """
+    name = (name or '').lower()
+    for hint, dialect in _HINTS:
+        if hint in name:
+            return dialect
+    return 'generic'
+
+
+def of(target) -> str:
+    """
+    Get the dialect of an engine, session, connection or cursor.
+    Args:
+        target: Object to inspect. A ``dialect`` attribute wins; otherwise
+                the live connection is asked for its DBMS name.
+    Returns:
+        str: The dialect name, 'generic' if it cannot be determined.
+    """
+    dialect = getattr(target, 'dialect', None)
+    if isinstance(dialect, str):
+        return dialect
+    connection = getattr(target, 'connection', target)
+    try:
+        return from_name(connection.getinfo(SQL_DBMS_NAME))
+    except Exception:
+        return 'generic'
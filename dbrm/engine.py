@@ -1,18 +1,55 @@
-import pyodbc
 import os
+import threading
+import time
 from contextlib import contextmanager
-from dotenv import load_dotenv
+from .pool import ConnectionPool
+from .isolation import restore as restore_isolation
+from .dialect import from_name, of as dialect_of
+from .metrics import Metrics
+from .timeouts import remaining
+from .scheduler import Scheduler, ScheduledConnection
 
 class Engine:
-    """Database engine that manages connections."""
+    """Database engine that manages connections.
+
+    By default every ``connect()`` opens a fresh connection. Pass
+    ``pool_size`` to pool them instead: that many idle connections are
+    kept for reuse and up to ``max_overflow`` more are opened under load.
+
+    ``timeout`` is the default statement timeout in seconds for Sessions
+    on this engine; runtime counters are kept in ``metrics``.
+
+    With ``workloads`` (a dict of ``Workload`` settings, see
+    ``default_workloads()``), checkouts are scheduled per workload class
+    so that, for example, batch loads cannot take every connection.
+    """
     
-    def __init__(self, connection_string=None, **kwargs):
+    def __init__(self, connection_string=None, pool_size=None, max_overflow=10,
+                 pool_timeout=30.0, dialect=None, timeout=None, workloads=None, **kwargs):
         self.connection_string = connection_string
+        # DSNs rarely name the product; None means "ask the first connection"
+        guessed = from_name(connection_string)
+        self.dialect = dialect or (None if guessed == 'generic' else guessed)
+        self.timeout = timeout
+        self.metrics = Metrics()
         self._connection_params = kwargs
+        self.pool = None
+        if pool_size is not None:
+            self.pool = ConnectionPool(
+                self._create_connection, size=pool_size,
+                max_overflow=max_overflow, timeout=pool_timeout,
+                reset=self._reset_connection,
+            )
+        self.pool_timeout = pool_timeout
+        self.scheduler = None
+        if workloads is not None:
+            capacity = None if pool_size is None else pool_size + max_overflow
+            self.scheduler = Scheduler(capacity, workloads, metrics=self.metrics)
         
     @classmethod
-    def from_env(cls):
-        """Create engine from environment variables."""
+    def from_env(cls, **kwargs):
+        """Create engine from environment variables; ``kwargs`` go to the constructor."""
+        from dotenv import load_dotenv
         load_dotenv()
         
         connection_string = (
@@ -23,16 +60,57 @@ class Engine:
             f'PWD={os.getenv("PWD")};'
             'charset=utf8mb4;'
         )
-        return cls(connection_string)
+        return cls(connection_string, **kwargs)
     
-    def connect(self):
-        """Get a connection."""
+    def _create_connection(self):
+        # pyodbc is only loaded once a connection is actually needed
+        import pyodbc
         conn = pyodbc.connect(self.connection_string)
         conn.setdecoding(pyodbc.SQL_CHAR, encoding='utf-8')
         conn.setdecoding(pyodbc.SQL_WCHAR, encoding='utf-8')
         conn.setencoding(encoding='utf-8')
         return conn
     
+    def _reset_connection(self, connection, info):
+        # Undo a session's isolation level before the connection is reused
+        restore_isolation(connection, info, self.dialect)
+    
+    def connect(self, workload=None):
+        """Get a connection, from the pool when pooling is enabled.
+
+        With a scheduler, the checkout waits for a slot of the ``workload``
+        class (default: the enclosing ``workload()`` block, else
+        interactive). Inside a ``deadline()`` block the wait is limited to
+        the time left. The slot and the pool checkout share one
+        ``pool_timeout``.
+        """
+        left = remaining()
+        timeout = self.pool_timeout if left is None else min(self.pool_timeout, max(left, 0))
+        if self.scheduler is None:
+            return self._checkout(timeout)
+        expires = time.monotonic() + timeout
+        name = self.scheduler.acquire(workload, timeout)
+        try:
+            connection = self._checkout(max(expires - time.monotonic(), 0))
+        except BaseException:
+            self.scheduler.release(name)
+            raise
+        return ScheduledConnection(connection, self.scheduler, name)
+
+    def _checkout(self, timeout):
+        if self.pool is None:
+            connection = self._create_connection()
+        else:
+            connection = self.pool.connect(timeout=timeout)
+        if self.dialect is None:
+            self.dialect = dialect_of(connection)
+        return connection
+    
+    def dispose(self):
+        """Close all idle pooled connections."""
+        if self.pool is not None:
+            self.pool.dispose()
+    
     @contextmanager
     def begin(self):
         """Get a connection as a context manager."""
@@ -41,3 +119,157 @@ class Engine:
             yield conn
         finally:
             conn.close()
+
+
+class RoutedConnection:
+    """Connection proxy that reports back to its node when closed."""
+
+    def __init__(self, connection, node, engine):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_node', node)
+        object.__setattr__(self, '_engine', engine)
+        object.__setattr__(self, '_closed', False)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def close(self):
+        """Close the connection and release its slot on the node."""
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        self._engine._release(self._node)
+        self._connection.close()
+
+
+class _Node:
+    """A routing target together with its load and health state."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.outstanding = 0
+        self.healthy = True
+        self.failed_at = None
+
+    def __repr__(self):
+        state = "up" if self.healthy else "down"
+        return f"<Node {state} outstanding={self.outstanding}>"
+
+
+class ReplicatedEngine:
+    """Engine that sends writes to a primary and reads to replicas.
+
+    Sessions bound to this engine route SELECT statements and read-only
+    sessions to a healthy replica, and everything else, including
+    ``session.begin()`` transactions, to the primary.
+    """
+
+    routes_reads = True
+    STRATEGIES = ("round_robin", "least_outstanding")
+
+    def __init__(self, primary, replicas=(), strategy="round_robin",
+                 retry_interval=30.0, health_check_query="SELECT 1", timeout=None):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"'{strategy}' is not a valid routing strategy")
+        self.primary = self._as_engine(primary)
+        self.timeout = timeout if timeout is not None else getattr(self.primary, 'timeout', None)
+        self.metrics = Metrics()
+        self.replicas = [_Node(self._as_engine(replica)) for replica in replicas]
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self.health_check_query = health_check_query
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @staticmethod
+    def _as_engine(target):
+        return target if hasattr(target, 'connect') else Engine(target)
+
+    @property
+    def connection_string(self):
+        return self.primary.connection_string
+
+    @property
+    def dialect(self):
+        return self.primary.dialect
+
+    def connect(self, readonly=False):
+        """Get a connection, from a replica when ``readonly`` is set."""
+        if not readonly or not self.replicas:
+            return self.primary.connect()
+
+        tried = set()
+        while True:
+            node = self._choose(exclude=tried)
+            if node is None:
+                return self.primary.connect()
+            tried.add(id(node))
+            try:
+                connection = node.engine.connect()
+            except Exception:
+                self._release(node)
+                self._mark_down(node)
+                continue
+            if not node.healthy:
+                self._mark_up(node)
+            return RoutedConnection(connection, node, self)
+
+    @contextmanager
+    def begin(self):
+        """Get a primary connection as a context manager."""
+        conn = self.primary.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _choose(self, exclude=()):
+        """Pick a replica in rotation and reserve a slot on it."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                node for node in self.replicas
+                if id(node) not in exclude
+                and (node.healthy or now - node.failed_at >= self.retry_interval)
+            ]
+            if not candidates:
+                return None
+            if self.strategy == "least_outstanding":
+                node = min(candidates, key=lambda n: n.outstanding)
+            else:
+                node = candidates[self._next % len(candidates)]
+                self._next += 1
+            node.outstanding += 1
+            return node
+
+    def _release(self, node):
+        with self._lock:
+            node.outstanding -= 1
+
+    def _mark_down(self, node):
+        with self._lock:
+            node.healthy = False
+            node.failed_at = time.monotonic()
+
+    def _mark_up(self, node):
+        with self._lock:
+            node.healthy = True
+            node.failed_at = None
+
+    def check_health(self):
+        """Probe every replica and update which ones are in rotation."""
+        for node in self.replicas:
+            try:
+                conn = node.engine.connect()
+                try:
+                    conn.cursor().execute(self.health_check_query).fetchone()
+                finally:
+                    conn.close()
+            except Exception:
+                self._mark_down(node)
+            else:
+                self._mark_up(node)
+        return [node.healthy for node in self.replicas]
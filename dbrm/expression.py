@@ -0,0 +1,263 @@
+"""
+SQL expression objects that compile to placeholder SQL and bound parameters.
+
+Comparisons on table columns, e.g. ``User.id == 5``, build expressions
+instead of booleans. Compiling one yields SQL text with ``?`` placeholders
+and a separate parameter list, so the text is the same for every value and
+the server can reuse one cached plan.
+"""
+
+import re
+
+_OR = re.compile(r"\bOR\b", re.IGNORECASE)
+
+
+class ClauseElement:
+    """Base class of compilable SQL expressions."""
+
+    def compile(self) -> tuple:
+        """Compile to (sql, params)."""
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return BooleanClause("AND", [self, other])
+
+    def __rand__(self, other):
+        return BooleanClause("AND", [other, self])
+
+    def __or__(self, other):
+        return BooleanClause("OR", [self, other])
+
+    def __ror__(self, other):
+        return BooleanClause("OR", [other, self])
+
+    def __invert__(self):
+        return Not(self)
+
+    def __str__(self):
+        return self.compile()[0]
+
+    def __repr__(self):
+        sql, params = self.compile()
+        return f"<{type(self).__name__} {sql!r} {params!r}>"
+
+
+class TextClause(ClauseElement):
+    """Raw SQL fragment with its own bound parameters."""
+
+    def __init__(self, sql, params=()):
+        self.sql = sql
+        self.params = list(params)
+
+    def compile(self):
+        return self.sql, list(self.params)
+
+
+def text(sql, *params):
+    """
+    Wrap a raw SQL condition with bound parameters.
+    Args:
+        sql (str): SQL text using ``?`` placeholders.
+        params: Values for the placeholders.
+    Returns:
+        TextClause: An expression usable wherever conditions are accepted.
+    """
+    return TextClause(sql, params)
+
+
+def _operand(value):
+    """Compile a right-hand operand; columns are inlined, values bound."""
+    if hasattr(value, 'sql_name'):
+        return value.sql_name, []
+    if isinstance(value, ClauseElement):
+        return value.compile()
+    return "?", [value]
+
+
+class BinaryExpression(ClauseElement):
+    """Comparison between a column and a value or another column."""
+
+    def __init__(self, left, operator, right):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def compile(self):
+        left_sql, left_params = _operand(self.left)
+        if self.right is None and self.operator in ("=", "<>"):
+            null_test = "IS NULL" if self.operator == "=" else "IS NOT NULL"
+            return f"{left_sql} {null_test}", left_params
+        right_sql, right_params = _operand(self.right)
+        return f"{left_sql} {self.operator} {right_sql}", left_params + right_params
+
+    def __bool__(self):
+        # Lets ``column in some_list`` and column identity checks keep working
+        if self.operator == "=" and hasattr(self.right, 'sql_name'):
+            return self.left is self.right
+        if self.operator == "<>" and hasattr(self.right, 'sql_name'):
+            return self.left is not self.right
+        raise TypeError("Boolean value of a SQL expression is undefined")
+
+
+class InExpression(ClauseElement):
+    """``column IN (...)`` with one placeholder per value."""
+
+    def __init__(self, column, values, negate=False):
+        self.column = column
+        self.values = list(values)
+        self.negate = negate
+
+    def compile(self):
+        column_sql, params = _operand(self.column)
+        if not self.values:
+            # IN () is not valid SQL; match nothing (or everything)
+            return ("1 = 1" if self.negate else "1 = 0"), params
+        operator = "NOT IN" if self.negate else "IN"
+        placeholders = ", ".join("?" for _ in self.values)
+        return f"{column_sql} {operator} ({placeholders})", params + self.values
+
+
+class BetweenExpression(ClauseElement):
+    """``column BETWEEN ? AND ?``."""
+
+    def __init__(self, column, low, high):
+        self.column = column
+        self.low = low
+        self.high = high
+
+    def compile(self):
+        column_sql, params = _operand(self.column)
+        low_sql, low_params = _operand(self.low)
+        high_sql, high_params = _operand(self.high)
+        return f"{column_sql} BETWEEN {low_sql} AND {high_sql}", params + low_params + high_params
+
+
+class BooleanClause(ClauseElement):
+    """Conditions joined by AND or OR."""
+
+    def __init__(self, operator, clauses):
+        self.operator = operator
+        self.clauses = []
+        for clause in clauses:
+            # Flatten (a & b) & c into one clause
+            if isinstance(clause, BooleanClause) and clause.operator == operator:
+                self.clauses.extend(clause.clauses)
+            else:
+                self.clauses.append(clause)
+
+    def compile(self):
+        sql, params = compile_clauses(self.clauses, f" {self.operator} ")
+        return f"({sql})", params
+
+
+class Not(ClauseElement):
+    """Negated condition."""
+
+    def __init__(self, clause):
+        self.clause = clause
+
+    def compile(self):
+        sql, params = compile_clause(self.clause)
+        return f"NOT ({sql})", params
+
+
+class Ordering:
+    """Column with a sort direction, for ``order_by``."""
+
+    def __init__(self, column, direction):
+        self.column = column
+        self.direction = direction
+
+    def __str__(self):
+        return f"{self.column.sql_name} {self.direction}"
+
+
+class ColumnOperators:
+    """Comparison operators shared by column objects.
+
+    Subclasses provide ``sql_name``, the SQL used to reference the column.
+    """
+
+    def __eq__(self, other):
+        return BinaryExpression(self, "=", other)
+
+    def __ne__(self, other):
+        return BinaryExpression(self, "<>", other)
+
+    def __lt__(self, other):
+        return BinaryExpression(self, "<", other)
+
+    def __le__(self, other):
+        return BinaryExpression(self, "<=", other)
+
+    def __gt__(self, other):
+        return BinaryExpression(self, ">", other)
+
+    def __ge__(self, other):
+        return BinaryExpression(self, ">=", other)
+
+    __hash__ = object.__hash__
+
+    def in_(self, values):
+        """``column IN (values)``."""
+        return InExpression(self, values)
+
+    def not_in(self, values):
+        """``column NOT IN (values)``."""
+        return InExpression(self, values, negate=True)
+
+    def between(self, low, high):
+        """``column BETWEEN low AND high``."""
+        return BetweenExpression(self, low, high)
+
+    def like(self, pattern):
+        """``column LIKE pattern``."""
+        return BinaryExpression(self, "LIKE", pattern)
+
+    def is_(self, value=None):
+        """``column IS NULL`` (or another ``IS`` comparison)."""
+        return BinaryExpression(self, "=", value) if value is None else BinaryExpression(self, "IS", value)
+
+    def is_not(self, value=None):
+        """``column IS NOT NULL``."""
+        return BinaryExpression(self, "<>", value) if value is None else BinaryExpression(self, "IS NOT", value)
+
+    def asc(self):
+        return Ordering(self, "ASC")
+
+    def desc(self):
+        return Ordering(self, "DESC")
+
+
+def compile_clause(clause) -> tuple:
+    """
+    Compile a condition, which may be raw SQL text or an expression.
+    Args:
+        clause: A string or an object with ``compile()``.
+    Returns:
+        tuple: (sql, params).
+    """
+    if hasattr(clause, 'compile') and not isinstance(clause, str):
+        return clause.compile()
+    return str(clause), []
+
+
+def compile_clauses(clauses, separator=" AND ") -> tuple:
+    """
+    Compile and join several conditions.
+    Args:
+        clauses: Iterable of strings or expressions.
+        separator (str): Text placed between the conditions.
+    Returns:
+        tuple: (sql, params).
+    """
+    clauses = list(clauses)
+    parts, params = [], []
+    for clause in clauses:
+        sql, clause_params = compile_clause(clause)
+        if len(clauses) > 1 and isinstance(clause, (str, TextClause)) and _OR.search(sql):
+            # "a = 1 OR b = 2 AND c = 3" would bind the OR last
+            sql = f"({sql})"
+        parts.append(sql)
+        params.extend(clause_params)
+    return separator.join(parts), params
@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from .dialect import of as dialect_of
+
+# Non-unique secondary indexes of a table, as (name, create statement or None).
+# Unique indexes and those backing constraints are left alone, since
+# dropping them would stop duplicates being rejected during the load.
+_SECONDARY_INDEXES = {
+    'sqlite': (
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+        "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'"
+    ),
+    'postgresql': (
+        "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid JOIN pg_class t ON t.oid = x.indrelid "
+        "WHERE t.relname = ? AND NOT x.indisunique"
+    ),
+    'mysql': (
+        "SELECT INDEX_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND NON_UNIQUE = 1 "
+        "ORDER BY INDEX_NAME, SEQ_IN_INDEX"
+    ),
+    'mssql': (
+        "SELECT i.name, NULL FROM sys.indexes i "
+        "WHERE i.object_id = OBJECT_ID(?) AND i.type_desc = 'NONCLUSTERED' "
+        "AND i.is_unique = 0 AND i.is_disabled = 0"
+    ),
+}
+
+
+def secondary_indexes(executor, table_name, dialect=None) -> list:
+    """
+    Look up the non-unique secondary indexes of a table.
+    Args:
+        executor: A Session or cursor to run the lookup on.
+        table_name (str): The table to inspect.
+        dialect (str, optional): Dialect name; detected when omitted.
+    Returns:
+        list: (name, create_sql) pairs; create_sql is None on SQL Server,
+              where indexes are disabled and rebuilt instead of dropped.
+    """
+    dialect = dialect or dialect_of(executor)
+    query = _SECONDARY_INDEXES.get(dialect)
+    if query is None:
+        return []
+    rows = executor.execute(query, [table_name]).fetchall()
+
+    if dialect != 'mysql':
+        return [(name, sql) for name, sql in rows]
+    columns = {}
+    for name, column in rows:
+        columns.setdefault(name, []).append(column)
+    return [
+        (name, f"CREATE INDEX {name} ON {table_name} ({', '.join(cols)})")
+        for name, cols in columns.items()
+    ]
+
+
+def _drop_sql(name, table_name, dialect):
+    if dialect == 'mssql':
+        return f"ALTER INDEX {name} ON {table_name} DISABLE"
+    if dialect == 'mysql':
+        return f"DROP INDEX {name} ON {table_name}"
+    return f"DROP INDEX {name}"
+
+
+@contextmanager
+def deferred_indexes(executor, table_name, dialect=None):
+    """
+    Take a table's secondary indexes offline for a bulk load.
+
+    Non-unique secondary indexes are disabled (SQL Server) or dropped
+    before the block runs and rebuilt once it finishes, even if the load
+    fails, so that rows are not indexed one at a time.
+
+    Args:
+        executor: A Session or cursor with ``execute`` and ``commit``.
+        table_name (str): The table being loaded.
+        dialect (str, optional): Dialect name; detected when omitted.
+    Yields:
+        list: Names of the deferred indexes.
+    """
+    dialect = dialect or dialect_of(executor)
+    indexes = secondary_indexes(executor, table_name, dialect)
+    for name, _ in indexes:
+        executor.execute(_drop_sql(name, table_name, dialect))
+    executor.commit()
+    try:
+        yield [name for name, _ in indexes]
+    finally:
+        for name, create_sql in indexes:
+            if create_sql is None:
+                executor.execute(f"ALTER INDEX {name} ON {table_name} REBUILD")
+            else:
+                executor.execute(create_sql)
+        executor.commit()
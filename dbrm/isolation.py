@@ -0,0 +1,117 @@
+"""
+Transaction isolation levels and server-enforced read-only mode per dialect.
+"""
+
+LEVELS = ("READ UNCOMMITTED", "READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE", "SNAPSHOT")
+
+# Statements setting the level for the rest of the connection's life
+_SET = {
+    'mssql': "SET TRANSACTION ISOLATION LEVEL {level}",
+    'mysql': "SET SESSION TRANSACTION ISOLATION LEVEL {level}",
+    'postgresql': "SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL {level}",
+    'generic': "SET TRANSACTION ISOLATION LEVEL {level}",
+}
+
+# Snapshot reads under another name: REPEATABLE READ in PostgreSQL is
+# snapshot isolation, and InnoDB reads from a consistent snapshot at it
+_ALIASES = {
+    ('postgresql', 'SNAPSHOT'): 'REPEATABLE READ',
+    ('mysql', 'SNAPSHOT'): 'REPEATABLE READ',
+}
+
+# Server defaults that connections are reset to
+DEFAULTS = {
+    'mssql': 'READ COMMITTED',
+    'mysql': 'REPEATABLE READ',
+    'postgresql': 'READ COMMITTED',
+    'sqlite': 'SERIALIZABLE',
+    'generic': 'READ COMMITTED',
+}
+
+# Read-only mode enforced by the server, and the statement undoing it.
+# SQL Server has no per-session switch; ApplicationIntent=ReadOnly in the
+# connection string only routes to readable secondaries.
+_READ_ONLY = {
+    'postgresql': ("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+                   "SET SESSION CHARACTERISTICS AS TRANSACTION READ WRITE"),
+    'mysql': ("SET SESSION TRANSACTION READ ONLY", "SET SESSION TRANSACTION READ WRITE"),
+    'sqlite': ("PRAGMA query_only = 1", "PRAGMA query_only = 0"),
+}
+
+
+def check_level(level) -> str:
+    """
+    Normalize an isolation level name.
+    Args:
+        level (str): e.g. "SNAPSHOT", "read committed" or "REPEATABLE_READ".
+    Returns:
+        str: The level in upper case with single spaces.
+    """
+    name = " ".join(str(level).replace("_", " ").upper().split())
+    if name not in LEVELS:
+        raise ValueError(f"'{level}' is not an isolation level; use one of {', '.join(LEVELS)}")
+    return name
+
+
+def statement(dialect, level):
+    """SQL setting ``level`` for the connection, or None when nothing needs to run."""
+    level = _ALIASES.get((dialect, level), level)
+    if dialect == 'sqlite':
+        # SQLite is serializable; shared-cache readers may opt into dirty reads
+        return f"PRAGMA read_uncommitted = {int(level == 'READ UNCOMMITTED')}"
+    return _SET.get(dialect, _SET['generic']).format(level=level)
+
+
+def _run(connection, sql):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+    # PostgreSQL's SET is transactional; keep it past the pool's rollback
+    connection.commit()
+
+
+def apply(connection, level, dialect):
+    """
+    Set a connection's isolation level unless it is already set.
+
+    Pooled connections remember the level in their ``info`` dict, so it is
+    set once per checkout and restored by the engine when they return.
+    """
+    info = getattr(connection, 'info', None)
+    if isinstance(info, dict) and info.get('isolation') == level:
+        return
+    _run(connection, statement(dialect, level))
+    if isinstance(info, dict):
+        info['isolation'] = level
+
+
+def apply_read_only(connection, dialect) -> bool:
+    """
+    Make the server reject writes on a connection until it is restored.
+    Args:
+        connection: The connection to restrict.
+        dialect (str): Dialect name.
+    Returns:
+        bool: False when the dialect cannot enforce read-only mode.
+    """
+    if dialect not in _READ_ONLY:
+        return False
+    info = getattr(connection, 'info', None)
+    if isinstance(info, dict) and info.get('readonly'):
+        return True
+    _run(connection, _READ_ONLY[dialect][0])
+    if isinstance(info, dict):
+        info['readonly'] = True
+    return True
+
+
+def restore(connection, info, dialect):
+    """Reset a connection to the server defaults if a session changed them."""
+    if info.pop('readonly', False) and dialect in _READ_ONLY:
+        _run(connection, _READ_ONLY[dialect][1])
+    level = info.pop('isolation', None)
+    default = DEFAULTS.get(dialect, DEFAULTS['generic'])
+    if level is not None and level != default:
+        _run(connection, statement(dialect, default))
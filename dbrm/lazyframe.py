@@ -0,0 +1,295 @@
+"""
+Lazy, DataFrame-style queries compiled to a single SQL statement.
+
+A LazyFrame records filters, projections, aggregations, sorts and limits
+without touching the database. ``collect()`` or ``to_pandas()`` compiles
+them into one SELECT, nesting subqueries only where SQL evaluation order
+requires it, e.g. a filter on an aggregate or after a limit, and fetches
+just the final rows.
+"""
+
+from .dialect import of as dialect_of
+from .expression import ClauseElement, ColumnOperators, Ordering
+from .query import Select
+from .rows import row_class
+
+# Aggregate templates by (dialect, function); the dialect may be None for all
+_AGGREGATES = {
+    (None, 'sum'): "SUM({column})",
+    (None, 'mean'): "AVG({column})",
+    # AVG of an integer column is an integer on SQL Server
+    ('mssql', 'mean'): "AVG(CAST({column} AS FLOAT))",
+    (None, 'min'): "MIN({column})",
+    (None, 'max'): "MAX({column})",
+    (None, 'count'): "COUNT({column})",
+    (None, 'size'): "COUNT(*)",
+    (None, 'nunique'): "COUNT(DISTINCT {column})",
+    (None, 'std'): "STDDEV_SAMP({column})",
+    ('mssql', 'std'): "STDEV({column})",
+    (None, 'var'): "VAR_SAMP({column})",
+    ('mssql', 'var'): "VAR({column})",
+}
+AGGREGATES = sorted({name for _, name in _AGGREGATES})
+
+
+class ColumnRef(ColumnOperators):
+    """An unqualified column name, e.g. an aggregate's output column."""
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def sql_name(self):
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+
+def col(name) -> ColumnRef:
+    """Refer to a column by name, e.g. ``col("total") > 100`` after ``agg``."""
+    return ColumnRef(name)
+
+
+def _ref(column) -> str:
+    return getattr(column, 'sql_name', None) or str(column)
+
+
+def _name(column) -> str:
+    return getattr(column, 'name', None) or str(column)
+
+
+def _aggregate_sql(function, column, dialect):
+    template = _AGGREGATES.get((dialect, function)) or _AGGREGATES.get((None, function))
+    if dialect == 'sqlite' and function in ('std', 'var'):
+        raise ValueError(f"SQLite has no '{function}' aggregate")
+    return template.format(column=_ref(column))
+
+
+def _specs(args, named):
+    """Normalize ``agg`` arguments to (output name, column, function) triples."""
+    specs = []
+    for mapping in args:
+        for column, functions in mapping.items():
+            if isinstance(functions, str):
+                specs.append((_name(column), column, functions))
+            else:
+                specs.extend((f"{_name(column)}_{f}", column, f) for f in functions)
+    for output, spec in named.items():
+        column, function = spec
+        specs.append((output, column, function))
+    for _, _, function in specs:
+        if function not in AGGREGATES:
+            raise ValueError(f"'{function}' is not a supported aggregate; use one of {', '.join(AGGREGATES)}")
+    if not specs:
+        raise ValueError("agg() needs at least one aggregate")
+    return specs
+
+
+class _Plan:
+    """Replays recorded operations into nested Select objects."""
+
+    def __init__(self, select, alias):
+        self.select = select
+        self.alias = alias
+        # Output columns of an aggregate at the current level, by name
+        self.outputs = None
+        self.aggregated = False
+
+    @property
+    def limited(self):
+        return self.select.limit_count is not None or self.select.offset_count is not None
+
+    def wrap(self):
+        """Continue from a subquery over the query built so far."""
+        inner = self.select
+        if not self.limited:
+            # Order is not kept through a subquery, and SQL Server rejects it
+            inner.order_by_columns = []
+        self.select = Select().from_(inner, alias=self.alias)
+        self.outputs = None
+
+    def filter(self, conditions):
+        if self.outputs is not None or self.limited:
+            self.wrap()
+        self.select.where_clauses.extend(conditions)
+
+    def project(self, columns):
+        if self.outputs is not None:
+            missing = [_name(c) for c in columns if _name(c) not in self.outputs]
+            if missing:
+                raise ValueError(f"Unknown columns {missing}; available: {list(self.outputs)}")
+            # Unselected aggregates are simply not computed
+            self.outputs = {_name(c): self.outputs[_name(c)] for c in columns}
+            self.select.columns = list(self.outputs.values())
+        else:
+            self.select.columns = [_ref(c) for c in columns]
+
+    def aggregate(self, keys, specs, dialect):
+        if self.outputs is not None or self.limited:
+            self.wrap()
+        outputs = {_name(key): _ref(key) for key in keys}
+        for output, column, function in specs:
+            outputs[output] = f"{_aggregate_sql(function, column, dialect)} AS {output}"
+        self.outputs = outputs
+        self.aggregated = True
+        self.select.columns = list(outputs.values())
+        self.select.group_by_columns = [_ref(key) for key in keys]
+        self.select.order_by_columns = []
+
+    def sort(self, orderings):
+        if self.limited:
+            self.wrap()
+        self.select.order_by_columns = list(orderings)
+
+    def head(self, n):
+        current = self.select.limit_count
+        self.select.limit_count = n if current is None else min(n, current)
+
+
+class GroupBy:
+    """Group keys waiting for their aggregates; see ``LazyFrame.groupby``."""
+
+    def __init__(self, frame, keys):
+        self.frame = frame
+        self.keys = keys
+
+    def agg(self, *args, **named):
+        """
+        Aggregate each group.
+        Args:
+            args: Dicts of column -> function name or list of names, as in
+                  pandas; outputs are named after the column, or
+                  ``<column>_<function>`` for lists.
+            named: ``output=(column, function)`` pairs.
+        Returns:
+            LazyFrame: One row per group: the keys, then the aggregates.
+        """
+        return self.frame._record('aggregate', list(self.keys), _specs(args, named))
+
+    def size(self, name="size"):
+        """Row count per group."""
+        return self.agg(**{name: ("*", "size")})
+
+
+class LazyFrame:
+    """
+    DataFrame-style query over a table, built lazily.
+
+    Operations return new frames and run nothing; see the module docstring.
+    Columns may be given as Table columns (``User.age``), names, or
+    ``col("name")`` for columns produced by ``agg``.
+    """
+
+    def __init__(self, source, session=None, operations=()):
+        self.source = source
+        self.session = session
+        self.operations = tuple(operations)
+        self.entity = source if hasattr(source, '__tablename__') else None
+
+    def _record(self, *operation):
+        return LazyFrame(self.source, self.session, self.operations + (operation,))
+
+    def filter(self, *conditions, **equals):
+        """Keep rows matching every condition; ``name=value`` tests equality."""
+        conditions = list(conditions) + [ColumnRef(name) == value for name, value in equals.items()]
+        return self._record('filter', conditions)
+
+    def select(self, *columns):
+        """Keep only these columns."""
+        return self._record('project', list(columns))
+
+    def __getitem__(self, key):
+        if isinstance(key, ClauseElement):
+            return self.filter(key)
+        if isinstance(key, (list, tuple)):
+            return self.select(*key)
+        return self.select(key)
+
+    def groupby(self, *keys):
+        """Group by columns; follow with ``.agg(...)`` or ``.size()``."""
+        return GroupBy(self, keys)
+
+    def agg(self, *args, **named):
+        """Aggregate all rows into one; arguments as for ``GroupBy.agg``."""
+        return GroupBy(self, ()).agg(*args, **named)
+
+    def sort_values(self, by, ascending=True):
+        """
+        Sort rows.
+        Args:
+            by: A column, a list of columns, or ``Column.desc()`` orderings.
+            ascending (bool | list): Direction, per column if a list.
+
+        Filters applied after ``head()`` or ``agg()`` read from a subquery,
+        which does not keep its order; sort again after them if needed.
+        """
+        columns = by if isinstance(by, (list, tuple)) else [by]
+        directions = ascending if isinstance(ascending, (list, tuple)) else [ascending] * len(columns)
+        orderings = [
+            column if isinstance(column, Ordering) else f"{_ref(column)} {'ASC' if up else 'DESC'}"
+            for column, up in zip(columns, directions)
+        ]
+        return self._record('sort', orderings)
+
+    def head(self, n=5):
+        """Keep the first ``n`` rows."""
+        return self._record('head', n)
+
+    def _select(self, dialect):
+        if isinstance(self.source, Select):
+            plan = _Plan(Select().from_(self.source._copy(), alias="source"), "source")
+        else:
+            base = Select().from_(self.source)
+            plan = _Plan(base, base.from_table)
+        for operation, *args in self.operations:
+            if operation == 'aggregate':
+                plan.aggregate(*args, dialect)
+            else:
+                getattr(plan, operation)(*args)
+        return plan
+
+    def compile(self, dialect="generic"):
+        """Compile to (sql, params) for a dialect."""
+        return self._select(dialect).select.compile(dialect=dialect)
+
+    def _execute(self, session):
+        session = session or self.session
+        if session is None:
+            raise ValueError("No session given to run the frame on")
+        dialect = dialect_of(session)
+        plan = self._select(dialect)
+        sql, params = plan.select.compile(dialect=dialect)
+        return session.execute(sql, params), plan
+
+    def collect(self, session=None):
+        """Run the query and return its rows as compact row objects."""
+        cursor, plan = self._execute(session)
+        # Aggregate outputs are not the table's columns, so skip its decoders
+        table = None if plan.aggregated else self.entity
+        make_row = row_class([c[0] for c in cursor.description], table)
+        return [make_row(row) for row in cursor.fetchall()]
+
+    def to_pandas(self, session=None):
+        """Run the query and return the result as a pandas DataFrame."""
+        import pandas as pd
+        cursor, _ = self._execute(session)
+        columns = [c[0] for c in cursor.description]
+        return pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+
+    def __repr__(self):
+        sql, params = self.compile()
+        return f"<LazyFrame {sql!r} {params!r}>"
+
+
+def frame(source, session=None) -> LazyFrame:
+    """
+    Start a lazy query.
+    Args:
+        source: A Table class, a table name or a Select to build on.
+        session (Session, optional): Default session for ``collect()``
+                                     and ``to_pandas()``.
+    Returns:
+        LazyFrame: An empty plan over ``source``.
+    """
+    return LazyFrame(source, session)
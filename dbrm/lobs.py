@@ -0,0 +1,248 @@
+"""
+Streaming reads and writes of large BLOB and TEXT column values.
+
+Values are moved in chunks with SUBSTRING reads and append-updates, so
+memory use depends on the chunk size, not on the size of the value.
+"""
+
+import io
+from .dialect import of as dialect_of
+from .expression import compile_clause
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Templates by dialect; ranges are 1-based (offset, count) parameters
+_SUBSTRING = {
+    'postgresql': "SUBSTRING({column} FROM ? FOR ?)",
+    'sqlite': "substr({column}, ?, ?)",
+}
+
+# Length in bytes (binary) or characters (text), by (dialect, text)
+_LENGTH = {
+    ('mssql', False): "DATALENGTH({column})",
+    # LEN ignores trailing spaces
+    ('mssql', True): "LEN({column} + 'x') - 1",
+    ('postgresql', False): "OCTET_LENGTH({column})",
+    ('postgresql', True): "CHAR_LENGTH({column})",
+    ('mysql', False): "LENGTH({column})",
+    ('mysql', True): "CHAR_LENGTH({column})",
+    ('sqlite', False): "length({column})",
+    ('sqlite', True): "length({column})",
+}
+
+# SET clause appending one parameter to the stored value, by (dialect, text)
+_APPEND = {
+    ('mssql', False): "{column}.WRITE(?, NULL, NULL)",
+    ('mssql', True): "{column}.WRITE(?, NULL, NULL)",
+    ('mysql', False): "{column} = CONCAT({column}, ?)",
+    ('mysql', True): "{column} = CONCAT({column}, ?)",
+    # || yields TEXT in SQLite
+    ('sqlite', False): "{column} = CAST({column} || ? AS BLOB)",
+}
+
+
+def _condition(where):
+    """(sql, params) locating the row: an expression, SQL text or a dict of key values."""
+    if isinstance(where, dict):
+        return " AND ".join(f"{name} = ?" for name in where), list(where.values())
+    return compile_clause(where)
+
+
+def _names(table, column):
+    return getattr(table, '__tablename__', table), getattr(column, 'name', None) or column
+
+
+class _RangeSource:
+    """Fetches ranges of one row's column value."""
+
+    def __init__(self, session, table, column, where, text=False, dialect=None):
+        self.session = session
+        self.table, self.column = _names(table, column)
+        self.condition, self.params = _condition(where)
+        self.text = text
+        self.dialect = dialect or dialect_of(session)
+        self._length = None
+
+    def _select(self, expression, params):
+        sql = f"SELECT {expression} FROM {self.table} WHERE {self.condition}"
+        row = self.session.execute(sql, params + self.params).fetchone()
+        if row is None:
+            raise ValueError(f"No row in {self.table} matches {self.condition}")
+        return row[0]
+
+    def length(self):
+        """Size of the value in bytes (characters for text); 0 when NULL."""
+        if self._length is None:
+            template = _LENGTH.get((self.dialect, self.text),
+                                   "CHAR_LENGTH({column})" if self.text else "LENGTH({column})")
+            self._length = self._select(template.format(column=self.column), []) or 0
+        return self._length
+
+    def fetch(self, offset, count):
+        template = _SUBSTRING.get(self.dialect, "SUBSTRING({column}, ?, ?)")
+        value = self._select(template.format(column=self.column), [offset + 1, count])
+        if value is None:
+            return "" if self.text else b""
+        return value if self.text else bytes(value)
+
+
+class _ChunkedReads:
+    """Position, seeking and a one-chunk read-ahead buffer over a _RangeSource."""
+
+    def _init_reads(self, source, chunk_size):
+        self.source = source
+        self.chunk_size = chunk_size
+        self._position = 0
+        self._buffer = "" if source.text else b""
+        self._buffer_start = 0
+
+    @property
+    def size(self):
+        """Length of the whole value; queried on first use."""
+        return self.source.length()
+
+    def _read(self, size):
+        """Up to ``size`` items from the current position, fetching at most one chunk."""
+        offset = self._position - self._buffer_start
+        if not 0 <= offset < len(self._buffer):
+            self._buffer = self.source.fetch(self._position, max(size, self.chunk_size))
+            self._buffer_start, offset = self._position, 0
+        data = self._buffer[offset:offset + size]
+        self._position += len(data)
+        return data
+
+    def _read_all(self):
+        parts = []
+        while True:
+            data = self._read(self.chunk_size)
+            if not data:
+                return parts
+            parts.append(data)
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"Invalid whence ({whence})")
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+
+class BlobReader(_ChunkedReads, io.RawIOBase):
+    """Binary file object over a stored value; ranges are fetched on demand."""
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__()
+        self._init_reads(source, chunk_size)
+
+    def readinto(self, buffer):
+        data = self._read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readall(self):
+        return b"".join(self._read_all())
+
+
+class TextReader(_ChunkedReads, io.TextIOBase):
+    """Text file object over a stored value; positions count characters."""
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__()
+        self._init_reads(source, chunk_size)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return "".join(self._read_all())
+        return self._read(size)
+
+    def readline(self, size=-1):
+        parts, count = [], 0
+        while size < 0 or count < size:
+            data = self._read(self.chunk_size if size < 0 else size - count)
+            end = data.find("\n") + 1
+            if end:
+                # Step back to just after the newline
+                self._position -= len(data) - end
+                data = data[:end]
+            parts.append(data)
+            count += len(data)
+            if not data or end:
+                break
+        return "".join(parts)
+
+
+def open_blob(session, table, column, where, text=False, chunk_size=DEFAULT_CHUNK_SIZE, dialect=None):
+    """
+    Open a stored BLOB or TEXT value as a read-only, seekable file object.
+    Args:
+        session: The Session to read through.
+        table: Table class or name.
+        column: Column object or name.
+        where: The row, as an expression (``Document.id == 5``), SQL text or
+               a dict of key values.
+        text (bool): Return str chunks; positions then count characters.
+        chunk_size (int): Bytes or characters fetched per round trip.
+        dialect (str, optional): Dialect name; detected when omitted.
+    Returns:
+        BlobReader | TextReader: The file object.
+    """
+    source = _RangeSource(session, table, column, where, text, dialect)
+    return TextReader(source, chunk_size) if text else BlobReader(source, chunk_size)
+
+
+def write_blob(session, table, column, where, stream, chunk_size=DEFAULT_CHUNK_SIZE, dialect=None):
+    """
+    Replace a stored BLOB or TEXT value with the contents of a stream, one chunk at a time.
+
+    The first chunk overwrites the value and later chunks are appended
+    (``.WRITE`` on SQL Server, ``CONCAT`` or ``||`` elsewhere), all in
+    one transaction.
+
+    Args:
+        session: The Session to write through.
+        table: Table class or name.
+        column: Column object or name.
+        where: The row, as for ``open_blob``.
+        stream: A readable binary or text stream, or a bytes/str value.
+        chunk_size (int): Bytes or characters sent per statement.
+        dialect (str, optional): Dialect name; detected when omitted.
+    Returns:
+        int: Bytes (characters for text) written.
+    """
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        stream = io.BytesIO(stream)
+    elif isinstance(stream, str):
+        stream = io.StringIO(stream)
+    table, column = _names(table, column)
+    condition, params = _condition(where)
+    dialect = dialect or dialect_of(session)
+
+    with session.begin():
+        chunk = stream.read(chunk_size)
+        text = isinstance(chunk, str)
+        cursor = session.execute(f"UPDATE {table} SET {column} = ? WHERE {condition}", [chunk] + params)
+        if getattr(cursor, 'rowcount', -1) == 0:
+            raise ValueError(f"No row in {table} matches {condition}")
+        append = _APPEND.get((dialect, text), "{column} = {column} || ?").format(column=column)
+        written = len(chunk)
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            session.execute(f"UPDATE {table} SET {append} WHERE {condition}", [chunk] + params)
+            written += len(chunk)
+    return written
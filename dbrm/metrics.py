@@ -0,0 +1,101 @@
+"""
+Thread-safe counters, gauges and timings for runtime statistics.
+"""
+
+import threading
+from collections import deque
+
+
+class Timing:
+    """Summary of observed durations; percentiles use the most recent samples."""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+        }
+
+
+class Metrics:
+    """Named counters, gauges (with their peak) and timings.
+
+    ``snapshot()`` returns a flat dict: counters and gauges by name, each
+    gauge's high-water mark as ``<name>_peak`` and timings as summary dicts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._peaks = {}
+        self._timings = {}
+
+    def incr(self, name, value=1):
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Set a gauge."""
+        with self._lock:
+            self._set_gauge(name, value)
+
+    def adjust(self, name, delta):
+        """Move a gauge up or down, e.g. for things in use."""
+        with self._lock:
+            self._set_gauge(name, self._gauges.get(name, 0) + delta)
+
+    def _set_gauge(self, name, value):
+        self._gauges[name] = value
+        self._peaks[name] = max(self._peaks.get(name, value), value)
+
+    def observe(self, name, seconds):
+        """Record a duration."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = Timing()
+            timing.observe(seconds)
+
+    def get(self, name, default=0):
+        """Current value of a counter or gauge."""
+        with self._lock:
+            return self._counters.get(name, self._gauges.get(name, default))
+
+    def snapshot(self):
+        """Copy of all values."""
+        with self._lock:
+            values = dict(self._counters)
+            values.update(self._gauges)
+            values.update({f"{name}_peak": peak for name, peak in self._peaks.items()})
+            values.update({name: timing.summary() for name, timing in self._timings.items()})
+            return values
+
+    def reset(self):
+        """Clear everything except current gauge values."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._peaks = dict(self._gauges)
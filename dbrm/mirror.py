@@ -0,0 +1,330 @@
+"""
+Local in-memory mirrors of small remote tables.
+"""
+
+import datetime
+import decimal
+import re
+import sqlite3
+import threading
+import time
+from .query import Select
+from .result import Result
+from .session import Session, _QUOTED, _is_read_statement
+from .metrics import Metrics
+from .expression import text
+
+# A FROM list or JOIN target, up to the next clause; "FROM a, b" names both tables
+_TABLE_REFERENCE = re.compile(
+    r"\b(FROM|JOIN)\b(.*?)(?=\b(?:WHERE|GROUP|ORDER|HAVING|LIMIT|OFFSET|FETCH|WINDOW|UNION|INTERSECT"
+    r"|EXCEPT|JOIN|ON|USING|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|SELECT|FROM)\b|;|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_NAME = re.compile(r"[\w.]+")
+_INNERMOST = re.compile(r"\(([^()]*)\)")
+
+# Dates and decimals are stored as text and parsed back by declared column type
+sqlite3.register_converter("dbrm_timestamp", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("dbrm_date", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("dbrm_decimal", lambda value: decimal.Decimal(value.decode()))
+
+_LOCAL_TYPES = {
+    bool: "INTEGER",
+    int: "INTEGER",
+    float: "REAL",
+    # The TEXT in the declared type gives the column text affinity, so
+    # SQLite does not turn the digits into a float
+    decimal.Decimal: "dbrm_decimal TEXT",
+    datetime.datetime: "dbrm_timestamp",
+    datetime.date: "dbrm_date",
+    bytes: "BLOB",
+    bytearray: "BLOB",
+}
+
+
+def _local_type(type_code, sample):
+    """SQLite column type for a remote column; drivers without type codes use a sample value."""
+    if type_code not in _LOCAL_TYPES and sample is not None:
+        type_code = type(sample)
+    return _LOCAL_TYPES.get(type_code, "TEXT")
+
+
+def _local_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _from_lists(sql):
+    names = set()
+    for keyword, items in _TABLE_REFERENCE.findall(sql):
+        items = items.split(",") if keyword.upper() == "FROM" else [items]
+        for item in items:
+            match = _NAME.match(item.strip())
+            if match:
+                names.add(match.group().lower())
+    return names
+
+
+def referenced_tables(sql):
+    """Names of the tables a statement reads from (FROM lists and JOIN clauses)."""
+    sql = _QUOTED.sub(" ", sql)
+    names = set()
+    # Subqueries are read innermost first and left behind as a "?" placeholder
+    match = _INNERMOST.search(sql)
+    while match:
+        names |= _from_lists(match.group(1))
+        sql = f"{sql[:match.start()]} ? {sql[match.end():]}"
+        match = _INNERMOST.search(sql)
+    return names | _from_lists(sql)
+
+
+class MirroredTable:
+    """One remote table or query kept in the local store."""
+
+    def __init__(self, name, query, key=(), watermark=None, indexes=()):
+        self.name = name
+        self.query = query
+        self.key = tuple(key)
+        self.watermark = watermark
+        self.indexes = [(index,) if isinstance(index, str) else tuple(index) for index in indexes]
+        self.columns = None
+        self.last_watermark = None
+        self.refreshed_at = None
+        self.rows = 0
+        self.lock = threading.Lock()
+
+    @property
+    def age(self):
+        """Seconds since the last successful refresh, or None if never loaded."""
+        if self.refreshed_at is None:
+            return None
+        return time.monotonic() - self.refreshed_at
+
+    @property
+    def incremental(self):
+        return bool(self.watermark and self.key and self.columns)
+
+    def __repr__(self):
+        return f"<MirroredTable {self.name} rows={self.rows} watermark={self.last_watermark!r}>"
+
+
+class Mirror:
+    """Read-through copies of small, frequently read tables in local SQLite.
+
+    Tables (or ``Select`` queries) added with ``add`` are loaded into an
+    in-memory SQLite database. A background thread refreshes them every
+    ``refresh_interval`` seconds; tables with a ``watermark`` column (an
+    ``updated_at`` timestamp or a SQL Server ``rowversion``) and a key only
+    fetch rows past the highest watermark seen and upsert them, other
+    tables are reloaded. Every ``full_refresh_interval`` seconds mirrored
+    tables are reloaded in full, which also drops deleted rows.
+
+    ``execute`` has the same interface as ``Session.execute``, so queries
+    can run on a mirror directly, e.g. ``Select().from_(Currency).all(mirror)``.
+    Statements that read only mirrored tables are answered locally as long
+    as each table is at most ``max_staleness`` seconds old; older tables are
+    refreshed first, and statements touching other tables go to the engine.
+    """
+
+    def __init__(self, engine, refresh_interval=30.0, max_staleness=60.0,
+                 full_refresh_interval=None, background=True, workload=None):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.full_refresh_interval = full_refresh_interval
+        self.workload = workload
+        self.metrics = Metrics()
+        self.last_error = None
+        self.tables = {}
+        self._local = sqlite3.connect(":memory:", check_same_thread=False,
+                                      detect_types=sqlite3.PARSE_DECLTYPES)
+        self._local_lock = threading.Lock()
+        self._last_result = None
+        self._last_full_refresh = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="dbrm-mirror", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, source, name=None, key=None, watermark=None, indexes=(), load=True):
+        """
+        Mirror a table or query locally.
+        Args:
+            source: A Table class, a table name or a Select.
+            name (str, optional): Local table name; required for a Select
+                                  and defaults to the source table's name.
+            key (list, optional): Key columns used to upsert changed rows;
+                                  defaults to a Table class's primary key.
+            watermark (str, optional): Column that grows on every change,
+                                       e.g. 'updated_at' or a rowversion.
+            indexes (list, optional): Columns, or column tuples, to index locally.
+            load (bool): Load the rows now rather than on first use.
+        Returns:
+            MirroredTable: The mirrored table.
+        """
+        if isinstance(source, Select):
+            if name is None:
+                raise ValueError("A name is required to mirror a Select")
+            query = source
+        else:
+            query = Select().from_(source)
+        name = name or query.from_table
+        if key is None:
+            key = getattr(source, '_primary_key', None) or getattr(query.from_entity, '_primary_key', ())
+        table = MirroredTable(name, query, key, watermark, indexes)
+        self.tables[name.lower()] = table
+        if load:
+            self.refresh(name)
+        return table
+
+    def _fetch(self, query):
+        sql, params = query.compile()
+        with Session(self.engine, workload=self.workload) as session:
+            cursor = session.execute(sql, params)
+            return [col[0] for col in cursor.description], cursor.description, cursor.fetchall()
+
+    def _create(self, table, description, rows):
+        """(Re)create the local table; caller holds the local lock."""
+        samples = [next((row[i] for row in rows if row[i] is not None), None) for i in range(len(description))]
+        columns = [f"{col[0]} {_local_type(col[1], sample)}" for col, sample in zip(description, samples)]
+        if table.key:
+            columns.append(f"PRIMARY KEY ({', '.join(table.key)})")
+        self._local.execute(f"DROP TABLE IF EXISTS {table.name}")
+        self._local.execute(f"CREATE TABLE {table.name} ({', '.join(columns)})")
+        for index in table.indexes:
+            self._local.execute(
+                f"CREATE INDEX ix_{table.name}_{'_'.join(index)} ON {table.name} ({', '.join(index)})"
+            )
+
+    def refresh(self, name=None, full=False):
+        """
+        Bring mirrored tables up to date.
+        Args:
+            name (str, optional): The table to refresh; all tables if omitted.
+            full (bool): Reload every row instead of only changed ones.
+        Returns:
+            int: The number of rows fetched from the server.
+        """
+        if name is None:
+            return sum(self.refresh(table.name, full) for table in list(self.tables.values()))
+        table = self.tables[name.lower()]
+        with table.lock:
+            incremental = table.incremental and not full
+            query = table.query
+            if incremental and table.last_watermark is not None:
+                query = query._copy()
+                query.where(text(f"{table.watermark} > ?", table.last_watermark))
+
+            start = time.perf_counter()
+            started_at = time.monotonic()
+            columns, description, rows = self._fetch(query)
+            local_rows = [tuple(_local_value(value) for value in row) for row in rows]
+            placeholders = ", ".join("?" for _ in columns)
+            with self._local_lock, self._local:
+                if not incremental or table.columns is None:
+                    self._create(table, description, rows)
+                    self._local.executemany(f"INSERT INTO {table.name} VALUES ({placeholders})", local_rows)
+                    table.columns = columns
+                elif local_rows:
+                    self._local.executemany(
+                        f"INSERT OR REPLACE INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})",
+                        local_rows,
+                    )
+                table.rows = self._local.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0]
+
+            if table.watermark and rows:
+                position = columns.index(table.watermark)
+                newest = max(row[position] for row in rows if row[position] is not None)
+                if table.last_watermark is None or newest > table.last_watermark:
+                    table.last_watermark = newest
+            # Changes committed while the query ran may be missing, so the age counts from its start
+            table.refreshed_at = started_at
+        self.metrics.observe("refresh_seconds", time.perf_counter() - start)
+        self.metrics.incr("rows_fetched", len(rows))
+        self.metrics.incr("full_refreshes" if not incremental else "incremental_refreshes")
+        return len(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            full = (self.full_refresh_interval is not None
+                    and time.monotonic() - self._last_full_refresh >= self.full_refresh_interval)
+            for table in list(self.tables.values()):
+                try:
+                    self.refresh(table.name, full=full)
+                except Exception as e:
+                    self.last_error = e
+                    self.metrics.incr("refresh_errors")
+            if full:
+                self._last_full_refresh = time.monotonic()
+
+    def is_fresh(self, name, max_staleness=None):
+        """Whether a mirrored table was refreshed within the staleness bound."""
+        bound = self.max_staleness if max_staleness is None else max_staleness
+        age = self.tables[name.lower()].age
+        return age is not None and (bound is None or age <= bound)
+
+    def execute(self, query, params=None, max_staleness=None):
+        """
+        Run a read of mirrored tables only locally; every other statement runs on the engine.
+        Args:
+            query (str | Select): The statement.
+            params (list, optional): Bound parameters.
+            max_staleness (float, optional): Overrides the mirror's staleness bound.
+        Returns:
+            Result: The buffered result set.
+        """
+        if hasattr(query, 'compile'):
+            query, params = query.compile()
+        names = referenced_tables(query)
+        if not _is_read_statement(query) or not names or not names <= set(self.tables):
+            self.metrics.incr("remote_reads")
+            with Session(self.engine, workload=self.workload) as session:
+                self._last_result = Result.from_cursor(session.execute(query, params))
+            return self._last_result
+
+        for name in names:
+            if not self.is_fresh(name, max_staleness):
+                self.metrics.incr("stale_refreshes")
+                self.refresh(name)
+        with self._local_lock:
+            cursor = self._local.execute(query, [_local_value(value) for value in params or ()])
+            self._last_result = Result.from_cursor(cursor)
+        self.metrics.incr("local_reads")
+        return self._last_result
+
+    def fetchall(self):
+        """Fetch all results from the last query."""
+        return self._last_result.fetchall()
+
+    def fetchone(self):
+        """Fetch one result from the last query."""
+        return self._last_result.fetchone()
+
+    def stats(self):
+        """Row count, watermark and age of every mirrored table, plus read counters."""
+        stats = self.metrics.snapshot()
+        stats["tables"] = {
+            table.name: {"rows": table.rows, "watermark": table.last_watermark, "age": table.age}
+            for table in self.tables.values()
+        }
+        return stats
+
+    def close(self):
+        """Stop background refreshes and drop the local copies."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._local.close()
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PooledConnection:
+    """Connection proxy that returns to its pool instead of closing.
+
+    ``info`` is a dict kept with the underlying connection across
+    checkouts, for state such as a session's isolation level.
+    """
+
+    def __init__(self, connection, pool, info=None):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_closed', False)
+        object.__setattr__(self, 'info', {} if info is None else info)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def close(self):
+        """Hand the connection back to the pool."""
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        self._pool._return(self._connection, self.info)
+
+    def invalidate(self):
+        """Discard the underlying connection instead of reusing it."""
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        self._pool._discard(self._connection)
+
+
+class ConnectionPool:
+    """Thread-safe pool of DBAPI connections.
+
+    Keeps up to ``size`` idle connections and allows ``max_overflow``
+    extra connections under load. Connections are rolled back before they
+    are reused, then passed to ``reset(connection, info)`` if given; ones
+    that fail the reset are discarded.
+    """
+
+    def __init__(self, creator, size=5, max_overflow=10, timeout=30.0, reset=None):
+        self._creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self._reset = reset
+        self._idle = deque()
+        self._checked_out = 0
+        self._cond = threading.Condition()
+
+    @property
+    def checked_out(self):
+        """Number of connections currently in use."""
+        return self._checked_out
+
+    @property
+    def idle(self):
+        """Number of idle connections ready for reuse."""
+        return len(self._idle)
+
+    def connect(self, timeout=None):
+        """Check a connection out of the pool."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._idle and self._checked_out >= self.size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available within {timeout}s "
+                        f"({self._checked_out} checked out)"
+                    )
+                self._cond.wait(remaining)
+            self._checked_out += 1
+            connection, info = self._idle.popleft() if self._idle else (None, {})
+
+        if connection is None:
+            try:
+                connection = self._creator()
+            except Exception:
+                with self._cond:
+                    self._checked_out -= 1
+                    self._cond.notify()
+                raise
+        return PooledConnection(connection, self, info)
+
+    def _return(self, connection, info):
+        try:
+            connection.rollback()
+            if self._reset:
+                self._reset(connection, info)
+        except Exception:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._checked_out -= 1
+            keep = len(self._idle) < self.size
+            if keep:
+                self._idle.append((connection, info))
+            self._cond.notify()
+        if not keep:
+            connection.close()
+
+    def _discard(self, connection):
+        with self._cond:
+            self._checked_out -= 1
+            self._cond.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """Close all idle connections."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
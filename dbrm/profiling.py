@@ -0,0 +1,190 @@
+"""
+Per-stage timing, row, byte and memory accounting for bulk loads.
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageStats:
+    """Totals for one stage of a load, summed over all the times it ran."""
+
+    __slots__ = ("wall", "cpu", "rows", "bytes", "calls", "peak_memory")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.calls = 0
+        self.peak_memory = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"<StageStats wall={self.wall:.3f}s cpu={self.cpu:.3f}s rows={self.rows} calls={self.calls}>"
+
+
+class _StageTimer:
+    """A running measurement of one stage; ``stop()`` adds it to the report."""
+
+    def __init__(self, report, name, rows=0, bytes=0):
+        self.report = report
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+
+    def stop(self):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        self.report.add(self.name, rows=self.rows, bytes=self.bytes, wall=wall, cpu=cpu, peak_memory=peak)
+
+
+def frame_bytes(frame, sample=1000):
+    """Estimated in-memory size of a DataFrame, from the deep size of its first rows."""
+    if not len(frame):
+        return 0
+    head = frame.head(sample)
+    return int(head.memory_usage(deep=True, index=False).sum() * len(frame) / len(head))
+
+
+class LoadReport:
+    """Where the time of a load went, stage by stage.
+
+    Each stage (e.g. 'read_csv', 'convert', 'insert', 'commit') collects
+    wall and CPU time of the loading thread, rows, bytes and, when
+    ``trace_memory`` is set, the tracemalloc peak while it ran. Stages that
+    run once per chunk are summed.
+
+    With ``profile`` set to a file name, the whole run is also recorded
+    with cProfile and the stats are written there (readable with
+    ``pstats`` or snakeviz); with ``profile=True`` they are kept in
+    ``self.profile`` as a ``pstats.Stats``.
+    """
+
+    def __init__(self, table=None, trace_memory=False, profile=None):
+        self.table = table
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.stages = {}
+        self.rows = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._profiler = None
+        self._started_tracing = False
+        self._start = None
+
+    def start(self):
+        """Begin timing the run and start the requested tracing."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = (time.perf_counter(), time.thread_time())
+
+    def stop(self):
+        """Finish the run; writes the cProfile output if requested."""
+        if self._start is None:
+            return
+        wall, cpu = self._start
+        self.wall += time.perf_counter() - wall
+        self.cpu += time.thread_time() - cpu
+        self._start = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            if self.profile is True:
+                import pstats
+                self.profile = pstats.Stats(self._profiler)
+            else:
+                self._profiler.dump_stats(self.profile)
+            self._profiler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def run(self):
+        """Time the enclosed load as a whole."""
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def timer(self, name, rows=0, bytes=0):
+        """Start measuring a stage; call ``stop()`` on the result when it ends."""
+        return _StageTimer(self, name, rows, bytes)
+
+    @contextmanager
+    def stage(self, name, rows=0, bytes=0):
+        """Measure the enclosed block as (part of) a stage."""
+        timer = self.timer(name, rows, bytes)
+        try:
+            yield timer
+        finally:
+            timer.stop()
+
+    def add(self, name, rows=0, bytes=0, wall=0.0, cpu=0.0, peak_memory=None, calls=1):
+        """Add measurements or counts to a stage."""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        stats.calls += calls
+        stats.wall += wall
+        stats.cpu += cpu
+        stats.rows += rows
+        stats.bytes += bytes
+        if peak_memory is not None:
+            stats.peak_memory = max(stats.peak_memory or 0, peak_memory)
+
+    @property
+    def peak_memory(self):
+        """Highest traced memory over all stages, or None without ``trace_memory``."""
+        peaks = [stats.peak_memory for stats in self.stages.values() if stats.peak_memory is not None]
+        return max(peaks) if peaks else None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.wall if self.wall else 0.0
+
+    def as_dict(self):
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "rows_per_second": self.rows_per_second,
+            "peak_memory": self.peak_memory,
+            "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+        }
+
+    def summary(self):
+        """The stages as a text table, slowest first."""
+        lines = [f"{'stage':<16}{'wall s':>10}{'cpu s':>10}{'share':>8}{'rows':>12}{'MB':>10}{'peak MB':>10}"]
+        # Stages can also be timed outside run(), e.g. SQLTable's constructor
+        total = max(self.wall, sum(stats.wall for stats in self.stages.values()))
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1].wall):
+            share = stats.wall / total if total else 0.0
+            peak = "" if stats.peak_memory is None else f"{stats.peak_memory / 2**20:.1f}"
+            lines.append(
+                f"{name:<16}{stats.wall:>10.3f}{stats.cpu:>10.3f}{share:>8.0%}"
+                f"{stats.rows:>12}{stats.bytes / 2**20:>10.1f}{peak:>10}"
+            )
+        lines.append(f"{'total':<16}{self.wall:>10.3f}{self.cpu:>10.3f}{'':>8}{self.rows:>12}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+    def __repr__(self):
+        return f"<LoadReport table={self.table!r} rows={self.rows} wall={self.wall:.3f}s stages={list(self.stages)}>"
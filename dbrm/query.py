@@ -1,9 +1,17 @@
+import copy
+from .rows import row_class
+from .adaptive import fetch_batches
+from .spill import spill_result, DEFAULT_MEMORY_LIMIT
+from .expression import compile_clause, compile_clauses, text
+
+
 class Select:
     """Builds SELECT queries in a fluent interface style."""
     
     def __init__(self, *columns):
         self.columns = columns or ["*"]
         self.from_table = None
+        self.from_entity = None
         self.where_clauses = []
         self.order_by_columns = []
         self.limit_count = None
@@ -11,13 +19,21 @@ class Select:
         self.group_by_columns = []
         self.having_clauses = []
         self.join_clauses = []
+        self.from_alias = None
     
-    def from_(self, table):
-        """Specify the FROM table."""
-        if hasattr(table, '__tablename__'):
+    def from_(self, table, alias=None):
+        """Specify the FROM table, or a Select to read from as a subquery."""
+        self.from_alias = alias
+        if isinstance(table, Select):
+            self.from_table = table
+            self.from_entity = None
+            self.from_alias = alias or "subquery"
+        elif hasattr(table, '__tablename__'):
             self.from_table = table.__tablename__
+            self.from_entity = table
         else:
             self.from_table = table
+            self.from_entity = None
         return self
     
     def where(self, condition):
@@ -59,46 +75,284 @@ class Select:
         self.join_clauses.append((join_type, table_name, condition))
         return self
     
-    def build(self):
-        """Build the SQL query string."""
+    def compile(self, into=None, dialect="generic"):
+        """Compile the query into SQL text and its bound parameters.
+        
+        ``into`` names a new table for ``SELECT ... INTO`` (SQL Server).
+        With ``dialect="mssql"``, LIMIT/OFFSET become TOP or OFFSET/FETCH.
+        """
         if not self.from_table:
             raise ValueError("No FROM table specified")
         
+        mssql = dialect == "mssql"
         columns = ", ".join(str(col) for col in self.columns)
-        sql = f"SELECT {columns} FROM {self.from_table}"
+        if mssql and self.limit_count is not None and self.offset_count is None:
+            columns = f"TOP {self.limit_count} {columns}"
+        sql = f"SELECT {columns}"
+        if into:
+            sql += f" INTO {into}"
+        if isinstance(self.from_table, Select):
+            subquery, params = self.from_table.compile(dialect=dialect)
+            sql += f" FROM ({subquery}) AS {self.from_alias}"
+        else:
+            sql += f" FROM {self.from_table}"
+            params = []
+            if self.from_alias:
+                sql += f" AS {self.from_alias}"
         
         # Add JOIN clauses
         for join_type, table, condition in self.join_clauses:
+            condition, condition_params = compile_clause(condition)
             sql += f" {join_type} JOIN {table} ON {condition}"
+            params += condition_params
         
         # Add WHERE clauses
         if self.where_clauses:
-            sql += " WHERE " + " AND ".join(self.where_clauses)
+            condition, condition_params = compile_clauses(self.where_clauses)
+            sql += " WHERE " + condition
+            params += condition_params
         
         # Add GROUP BY
         if self.group_by_columns:
-            sql += " GROUP BY " + ", ".join(self.group_by_columns)
+            sql += " GROUP BY " + ", ".join(str(col) for col in self.group_by_columns)
         
         # Add HAVING
         if self.having_clauses:
-            sql += " HAVING " + " AND ".join(self.having_clauses)
+            condition, condition_params = compile_clauses(self.having_clauses)
+            sql += " HAVING " + condition
+            params += condition_params
         
         # Add ORDER BY
         if self.order_by_columns:
-            sql += " ORDER BY " + ", ".join(self.order_by_columns)
+            sql += " ORDER BY " + ", ".join(str(col) for col in self.order_by_columns)
+        
+        if mssql and self.offset_count is not None:
+            # OFFSET/FETCH needs an ORDER BY
+            if not self.order_by_columns:
+                sql += " ORDER BY (SELECT NULL)"
+            sql += f" OFFSET {self.offset_count} ROWS"
+            if self.limit_count is not None:
+                sql += f" FETCH NEXT {self.limit_count} ROWS ONLY"
+            return sql, params
         
         # Add LIMIT and OFFSET
-        if self.limit_count is not None:
+        if self.limit_count is not None and not mssql:
             sql += f" LIMIT {self.limit_count}"
         
         if self.offset_count is not None:
             sql += f" OFFSET {self.offset_count}"
         
+        return sql, params
+    
+    def build(self):
+        """Build the SQL query string; use ``compile()`` when values are bound."""
+        sql, params = self.compile()
+        if params:
+            raise ValueError("Query has bound values; use compile() to get (sql, params)")
         return sql
     
-    def execute(self, session):
-        """Execute this query using the provided session."""
-        return session.execute(self.build())
+    def execute(self, session, timeout=None):
+        """Execute this query using the provided session.
+        
+        ``timeout`` cancels the query after that many seconds.
+        """
+        sql, params = self.compile()
+        if timeout is None:
+            return session.execute(sql, params)
+        return session.execute(sql, params, timeout=timeout)
+    
+    def insert_into(self, table, columns=None):
+        """Copy this query's rows into an existing table on the server.
+        
+        Returns an ``INSERT INTO ... SELECT`` statement; its ``execute``
+        returns the number of rows inserted.
+        """
+        return InsertFromSelect(table, self, columns)
+    
+    def create_table_as(self, name):
+        """Create a new table from this query's rows on the server.
+        
+        Returns a ``CREATE TABLE ... AS SELECT`` statement, compiled as
+        ``SELECT ... INTO`` on SQL Server; its ``execute`` returns the
+        number of rows copied.
+        """
+        return CreateTableAs(name, self)
+    
+    def _row_class(self, cursor):
+        names = [col[0] for col in cursor.description]
+        return row_class(names, self.from_entity)
+    
+    def iterate(self, session, batch_size=1000):
+        """Execute and yield compact row objects, fetching in batches.
+        
+        Rows are instances of a generated ``__slots__`` class with one
+        attribute per result column; when selecting from a Table class,
+        JSON columns are decoded and ``lazy`` columns decode on access.
+        With ``batch_size="auto"`` the fetch size adapts to the measured
+        fetch throughput.
+        """
+        cursor = self.execute(session)
+        make_row = self._row_class(cursor)
+        for batch in fetch_batches(cursor, batch_size):
+            for row in batch:
+                yield make_row(row)
+    
+    def all(self, session):
+        """Execute and return all rows as compact row objects."""
+        cursor = self.execute(session)
+        make_row = self._row_class(cursor)
+        return [make_row(row) for row in cursor.fetchall()]
+    
+    def spill(self, session, memory_limit=DEFAULT_MEMORY_LIMIT, batch_size=10000, directory=None):
+        """Execute and keep the rows in memory up to ``memory_limit`` bytes,
+        then in local column files.
+        
+        Returns a ``SpilledResult`` that can be iterated, sliced and loaded
+        with ``to_pandas()``; its rows are compact row objects as from
+        ``all()``. Close it (or use ``with``) to remove the files.
+        """
+        cursor = self.execute(session)
+        return spill_result(cursor, memory_limit, batch_size, directory, self._row_class(cursor))
+    
+    def first(self, session):
+        """Execute and return the first row as a row object, or None."""
+        cursor = self.execute(session)
+        row = cursor.fetchone()
+        return None if row is None else self._row_class(cursor)(row)
+    
+    def _copy(self):
+        """Return an independent copy of this query."""
+        query = copy.copy(self)
+        for attr in ("where_clauses", "order_by_columns", "group_by_columns",
+                     "having_clauses", "join_clauses"):
+            setattr(query, attr, list(getattr(self, attr)))
+        return query
+    
+    def partitions(self, partition_column, bounds, partitions):
+        """Split this query into range-bounded sub-queries.
+        
+        Returns a list of (sql, params) pairs whose ranges cover
+        ``bounds`` (inclusive) on ``partition_column``.
+        """
+        low, high = bounds
+        integral = isinstance(low, int) and isinstance(high, int)
+        if integral:
+            # The last cut is high + 1, so every range can be half-open
+            cuts = [low + (high - low + 1) * i // partitions for i in range(partitions + 1)]
+        else:
+            cuts = [low + (high - low) * i / partitions for i in range(partitions)] + [high]
+        cuts = sorted(set(cuts)) or [low]
+        if len(cuts) == 1:
+            cuts.append(high)
+        
+        queries = []
+        for i, (start, stop) in enumerate(zip(cuts, cuts[1:])):
+            upper = "<=" if not integral and i == len(cuts) - 2 else "<"
+            query = self._copy()
+            query.where(text(f"{partition_column} >= ? AND {partition_column} {upper} ?", start, stop))
+            queries.append(query.compile())
+        return queries
+    
+    def read_parallel(self, source, partition_column, partitions=4, bounds=None,
+                      output="pandas", callback=None, batch_size=10000):
+        """
+        Read this query over several connections at once.
+        
+        The range of ``partition_column`` is split into ``partitions``
+        predicate-bounded sub-queries that run concurrently on pooled
+        connections from the engine.
+        
+        Args:
+            source: A Session or Engine. A Session only supplies its engine
+                    and, when ``bounds`` is not given, the MIN/MAX lookup.
+            partition_column (str): Column to split the range on.
+            partitions (int): Number of concurrent sub-queries.
+            bounds (tuple, optional): Inclusive (low, high) range to use
+                                      instead of querying MIN/MAX.
+            output (str): 'pandas', 'arrow' or 'rows'.
+            callback (callable, optional): If set, called as
+                ``callback(partition_index, rows)`` for every fetched batch,
+                from worker threads, and nothing is accumulated.
+            batch_size (int | str): Rows per ``fetchmany`` call, or "auto"
+                                    to adapt it per partition.
+        
+        Returns:
+            The concatenated result in the requested format, or the total
+            row count when ``callback`` is used.
+        """
+        if self.limit_count is not None or self.offset_count is not None:
+            raise ValueError("LIMIT/OFFSET queries cannot be read in partitions")
+        partition_column = str(partition_column)
+        if self.group_by_columns and partition_column not in map(str, self.group_by_columns):
+            raise ValueError("Grouped queries must be grouped by the partition column")
+        if output not in ("pandas", "arrow", "rows"):
+            raise ValueError(f"'{output}' is not a valid output")
+        
+        engine = getattr(source, 'engine', source)
+        if bounds is None:
+            bounds_query = self._copy()
+            bounds_query.columns = [f"MIN({partition_column})", f"MAX({partition_column})"]
+            bounds_query.order_by_columns = []
+            bounds_query.group_by_columns = []
+            bounds_query.having_clauses = []
+            sql, params = bounds_query.compile()
+            if hasattr(source, 'execute'):
+                bounds = tuple(source.execute(sql, params).fetchone())
+            else:
+                conn = engine.connect()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(sql, params) if params else cursor.execute(sql)
+                    bounds = tuple(cursor.fetchone())
+                finally:
+                    conn.close()
+        
+        queries = [] if bounds[0] is None else self.partitions(partition_column, bounds, partitions)
+        
+        def read(item):
+            index, (sql, params) = item
+            conn = engine.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                columns = [col[0] for col in cursor.description]
+                rows, count = [], 0
+                for batch in fetch_batches(cursor, batch_size):
+                    count += len(batch)
+                    if callback:
+                        callback(index, batch)
+                    else:
+                        rows.extend(tuple(row) for row in batch)
+                return columns, rows, count
+            finally:
+                conn.close()
+        
+        if queries:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+                parts = list(pool.map(read, enumerate(queries)))
+        else:
+            parts = []
+        
+        if callback:
+            return sum(count for _, _, count in parts)
+        
+        rows = [row for _, part_rows, _ in parts for row in part_rows]
+        if output == "rows":
+            return rows
+        
+        columns = parts[0][0] if parts else [str(col) for col in self.columns]
+        if output == "arrow":
+            import pyarrow as pa
+            return pa.table({name: [row[i] for row in rows] for i, name in enumerate(columns)})
+        import pandas as pd
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def stored_values(entity, values):
+    """Values as written to ``entity``'s columns, e.g. JSON serialized or compressed."""
+    columns = getattr(entity, '_columns', {})
+    return [columns[name].to_db(value) if name in columns else value for name, value in values.items()]
 
 
 class Insert:
@@ -109,6 +363,7 @@ class Insert:
             self.table = table.__tablename__
         else:
             self.table = table
+        self.entity = table if hasattr(table, '_columns') else None
         self._values = {}
     
     def values(self, **kwargs):
@@ -121,9 +376,11 @@ class Insert:
         columns = ", ".join(self._values.keys())
         placeholders = ", ".join(["?" for _ in self._values])
         sql = f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders})"
-        params = list(self._values.values())
+        params = stored_values(self.entity, self._values)
         return sql, params
     
+    compile = build
+    
     def execute(self, session):
         """Execute this query using the provided session."""
         sql, params = self.build()
@@ -138,6 +395,7 @@ class Update:
             self.table = table.__tablename__
         else:
             self.table = table
+        self.entity = table if hasattr(table, '_columns') else None
         self.set_values = {}
         self.where_clauses = []
     
@@ -152,17 +410,21 @@ class Update:
         return self
     
     def build(self):
-        """Build the SQL query string."""
+        """Build the SQL query string and its parameters."""
         set_clause = ", ".join([f"{k} = ?" for k in self.set_values.keys()])
         sql = f"UPDATE {self.table} SET {set_clause}"
         
-        params = list(self.set_values.values())
+        params = stored_values(self.entity, self.set_values)
         
         if self.where_clauses:
-            sql += " WHERE " + " AND ".join(self.where_clauses)
+            condition, condition_params = compile_clauses(self.where_clauses)
+            sql += " WHERE " + condition
+            params += condition_params
         
         return sql, params
     
+    compile = build
+    
     def execute(self, session):
         """Execute this query using the provided session."""
         sql, params = self.build()
@@ -184,15 +446,88 @@ class Delete:
         self.where_clauses.append(condition)
         return self
     
-    def build(self):
-        """Build the SQL query string."""
+    def compile(self):
+        """Compile the query into SQL text and its bound parameters."""
         sql = f"DELETE FROM {self.table}"
+        params = []
         
         if self.where_clauses:
-            sql += " WHERE " + " AND ".join(self.where_clauses)
+            condition, params = compile_clauses(self.where_clauses)
+            sql += " WHERE " + condition
         
+        return sql, params
+    
+    def build(self):
+        """Build the SQL query string; use ``compile()`` when values are bound."""
+        sql, params = self.compile()
+        if params:
+            raise ValueError("Query has bound values; use compile() to get (sql, params)")
         return sql
     
     def execute(self, session):
         """Execute this query using the provided session."""
-        return session.execute(self.build())
+        sql, params = self.compile()
+        return session.execute(sql, params)
+
+
+class InsertFromSelect:
+    """Builds INSERT INTO ... SELECT queries."""
+    
+    def __init__(self, table, select, columns=None):
+        if hasattr(table, '__tablename__'):
+            self.table = table.__tablename__
+        else:
+            self.table = table
+        self.select = select
+        self.columns = [getattr(col, 'name', col) for col in columns or []]
+    
+    def compile(self):
+        """Compile the query into SQL text and its bound parameters."""
+        select_sql, params = self.select.compile()
+        sql = f"INSERT INTO {self.table}"
+        if self.columns:
+            sql += f" ({', '.join(self.columns)})"
+        return f"{sql} {select_sql}", params
+    
+    def build(self):
+        """Build the SQL query string; use ``compile()`` when values are bound."""
+        sql, params = self.compile()
+        if params:
+            raise ValueError("Query has bound values; use compile() to get (sql, params)")
+        return sql
+    
+    def execute(self, session):
+        """Execute this query using the provided session; returns the row count."""
+        sql, params = self.compile()
+        return session.execute(sql, params).rowcount
+
+
+class CreateTableAs:
+    """Builds CREATE TABLE ... AS SELECT (or SELECT ... INTO) queries."""
+    
+    def __init__(self, name, select):
+        self.name = name
+        self.select = select
+    
+    def compile(self, dialect="generic"):
+        """Compile the query for a dialect into SQL text and its bound parameters."""
+        if dialect == 'mssql':
+            return self.select.compile(into=self.name, dialect=dialect)
+        select_sql, params = self.select.compile(dialect=dialect)
+        return f"CREATE TABLE {self.name} AS {select_sql}", params
+    
+    def build(self, dialect="generic"):
+        """Build the SQL query string; use ``compile()`` when values are bound."""
+        sql, params = self.compile(dialect)
+        if params:
+            raise ValueError("Query has bound values; use compile() to get (sql, params)")
+        return sql
+    
+    def execute(self, session):
+        """Execute this query using the provided session; returns the row count."""
+        sql, params = self.compile(session.dialect)
+        count = session.execute(sql, params).rowcount
+        if count is None or count < 0:
+            # Some drivers (e.g. SQLite) report no count for CREATE TABLE AS
+            count = session.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        return count
@@ -1,30 +1,49 @@
+import datetime
+import decimal
+import os
+import queue
+import threading
+import time
 import pandas as pd
+import dbrm.sqlinterpreter as itp
 from .engine import Engine
 from .session import Session
 from .schema import Table, Column
+from .indexes import deferred_indexes
+from .adaptive import ChunkSizeController, fetch_batches
+from .binding import frame_rows, input_sizes, bound_input_sizes
+from .profiling import LoadReport, frame_bytes
+from .dialect import of as dialect_of
+from contextlib import nullcontext
 
-def infer_schema_from_dataframe(df, table_name):
-    """Infer SQL schema from a pandas DataFrame."""
+def _frame_sql_types(df):
+    """SQL type of every DataFrame column, as used in the inferred schema."""
     from .utils import DTYPE_MAPPING
     
-    columns = []
+    sql_types = []
     for col_name, dtype in df.dtypes.items():
         dtype_name = dtype.name if hasattr(dtype, 'name') else str(dtype)
         
         # Handle text fields that might be longer than VARCHAR(255)
-        if dtype_name == "object" and df[col_name].notna().any():
+        # pandas 3 gives string columns the "str" dtype instead of object
+        is_text = pd.api.types.is_string_dtype(dtype) or dtype == object
+        if is_text and df[col_name].notna().any():
             length = df[col_name].str.len().max() if hasattr(df[col_name], 'str') else 0
             if length and length > 255:
                 dtype_name = "text"
                 
-        sql_type = DTYPE_MAPPING.get(dtype_name, 'VARCHAR(255)')
-        columns.append(f"{col_name} {sql_type}")
-    
+        sql_types.append(DTYPE_MAPPING.get(dtype_name, 'VARCHAR(255)'))
+    return sql_types
+
+def infer_schema_from_dataframe(df, table_name):
+    """Infer SQL schema from a pandas DataFrame."""
+    columns = [f"{col_name} {sql_type}" for col_name, sql_type in zip(df.columns, _frame_sql_types(df))]
     create_query = f"CREATE TABLE {table_name} (\n  " + ",\n  ".join(columns) + "\n)"
     return create_query
 
-def _insert_dataframe_to_table(df, table_name, session):
+def _insert_dataframe_to_table(df, table_name, session, report=None):
     """Insert a DataFrame into an existing table."""
+    report = report or LoadReport(table_name)
     # Generate column list
     columns = df.columns.tolist()
     columns_str = ', '.join(columns)
@@ -35,10 +54,62 @@ def _insert_dataframe_to_table(df, table_name, session):
     # Prepare insert query
     insert_query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
     
-    # Execute in batches
+    # Values are converted column by column, not boxed per cell by iterrows();
+    # missing values become None here
+    with report.stage("convert", rows=len(df), bytes=frame_bytes(df)):
+        rows = list(frame_rows(df))
+        sizes = input_sizes(_frame_sql_types(df), dialect_of(session))
     with session.begin():
-        for _, row in df.iterrows():
-            session.execute(insert_query, tuple(row))
+        # One executemany per chunk, bound with the schema's types like SQLTable
+        with report.stage("insert", rows=len(df)):
+            session.executemany(insert_query, rows, input_sizes=sizes)
+        commit = report.timer("commit")
+    commit.stop()
+    report.rows += len(df)
+
+def _read_chunks(chunks, report):
+    """Yield DataFrame chunks, timing each read as the 'read_csv' stage."""
+    while True:
+        with report.stage("read_csv") as timer:
+            chunk = next(chunks, None)
+            timer.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+def _sorted(frame, sort_by, report):
+    if not sort_by:
+        return frame
+    with report.stage("sort", rows=len(frame)):
+        return frame.sort_values(sort_by, kind="stable")
+
+def _insert_adaptive_chunks(csv_file, table_name, session, sort_by, pandas_kwargs, report=None):
+    """Read and insert a CSV file in chunks sized by a ChunkSizeController."""
+    report = report or LoadReport(table_name)
+    controller = ChunkSizeController(memory_limit=64 * 1024 * 1024)
+    reader = pd.read_csv(csv_file, iterator=True, **pandas_kwargs)
+    with reader:
+        while True:
+            with report.stage("read_csv") as timer:
+                try:
+                    chunk = reader.get_chunk(controller.size)
+                except StopIteration:
+                    break
+                timer.rows = len(chunk)
+            if controller.row_bytes is None:
+                controller.row_bytes = max(chunk.memory_usage(deep=True, index=False).sum() / len(chunk), 1)
+                controller.columns = len(chunk.columns)
+            chunk = _sorted(chunk, sort_by, report)
+            with controller.timed(len(chunk)):
+                _insert_dataframe_to_table(chunk, table_name, session, report)
+    return controller
+
+def _create_from_frame(frame, table_name, session, report):
+    with report.stage("infer_schema", rows=len(frame)):
+        create_query = infer_schema_from_dataframe(frame, table_name)
+    with report.stage("create"):
+        session.execute(create_query)
+        session.commit()
 
 def transfer_csv(
     csv_file,
@@ -46,6 +117,10 @@ def transfer_csv(
     engine=None,
     if_exists='fail',
     chunk_size=None,
+    bulk_load=False,
+    sort_by=None,
+    trace_memory=False,
+    profile=None,
     **pandas_kwargs
 ):
     """
@@ -61,57 +136,280 @@ def transfer_csv(
         Database engine to use. If None, creates one from environment variables.
     if_exists : str
         How to behave if the table already exists: 'fail', 'replace', or 'append'
-    chunk_size : int, optional
-        If set, read the file in chunks of specified size
+    chunk_size : int or "auto", optional
+        If set, read the file in chunks of specified size. With "auto", each
+        chunk is sized from the rows/s and latency of the previous inserts
+    bulk_load : bool
+        If True, drop (or disable) the table's secondary indexes during the
+        load and rebuild them once all rows are in
+    sort_by : list of str, optional
+        Columns to sort the data by before loading, usually the clustered
+        key; applied per chunk when chunk_size is set
+    trace_memory : bool
+        If True, record the peak traced memory of every stage with tracemalloc
+    profile : str or True, optional
+        File to write cProfile stats of the whole load to; True keeps them
+        in the report's ``profile`` attribute
     pandas_kwargs : dict
         Additional keyword arguments for pd.read_csv()
+    
+    Returns:
+    --------
+    LoadReport
+        Wall and CPU time, rows, bytes and peak memory per stage
     """
     engine = engine or Engine.from_env()
+    report = LoadReport(table_name, trace_memory=trace_memory, profile=profile)
     
-    with Session(engine) as session:
-        # Check if table exists
-        exists_query = f"SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{table_name}'"
-        try:
-            result = session.execute(exists_query).fetchone()
-            table_exists = result[0] > 0
-        except:
-            # If information_schema query fails, try direct query
+    with report.run(), Session(engine) as session:
+        with report.stage("check"):
+            # Check if table exists
+            exists_query = f"SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{table_name}'"
             try:
-                session.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
-                table_exists = True
+                result = session.execute(exists_query).fetchone()
+                table_exists = result[0] > 0
             except:
-                table_exists = False
-        
-        if table_exists:
-            if if_exists == 'fail':
-                raise ValueError(f"Table '{table_name}' already exists")
-            elif if_exists == 'replace':
-                session.execute(f"DROP TABLE {table_name}")
-                table_exists = False
+                # If information_schema query fails, try direct query
+                try:
+                    session.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+                    table_exists = True
+                except:
+                    table_exists = False
+            
+            if table_exists:
+                if if_exists == 'fail':
+                    raise ValueError(f"Table '{table_name}' already exists")
+                elif if_exists == 'replace':
+                    session.execute(f"DROP TABLE {table_name}")
+                    table_exists = False
         
         # Process in chunks if specified
         if chunk_size:
             # Read first chunk to infer schema
-            first_chunk = pd.read_csv(csv_file, nrows=1, **pandas_kwargs)
+            with report.stage("read_csv"):
+                first_chunk = pd.read_csv(csv_file, nrows=1, **pandas_kwargs)
             
             if not table_exists:
                 # Create table from schema
-                create_query = infer_schema_from_dataframe(first_chunk, table_name)
-                session.execute(create_query)
-                session.commit()
+                _create_from_frame(first_chunk, table_name, session, report)
             
             # Process in chunks
-            for chunk in pd.read_csv(csv_file, chunksize=chunk_size, **pandas_kwargs):
-                _insert_dataframe_to_table(chunk, table_name, session)
+            with deferred_indexes(session, table_name) if bulk_load else nullcontext():
+                if chunk_size == "auto":
+                    _insert_adaptive_chunks(csv_file, table_name, session, sort_by, pandas_kwargs, report)
+                else:
+                    chunks = pd.read_csv(csv_file, chunksize=chunk_size, **pandas_kwargs)
+                    for chunk in _read_chunks(iter(chunks), report):
+                        chunk = _sorted(chunk, sort_by, report)
+                        _insert_dataframe_to_table(chunk, table_name, session, report)
         else:
             # Read entire file
-            df = pd.read_csv(csv_file, **pandas_kwargs)
+            with report.stage("read_csv") as timer:
+                df = pd.read_csv(csv_file, **pandas_kwargs)
+                timer.rows = len(df)
             
             if not table_exists:
                 # Create table from schema
-                create_query = infer_schema_from_dataframe(df, table_name)
-                session.execute(create_query)
-                session.commit()
+                _create_from_frame(df, table_name, session, report)
             
             # Insert all data
-            _insert_dataframe_to_table(df, table_name, session)
+            df = _sorted(df, sort_by, report)
+            with deferred_indexes(session, table_name) if bulk_load else nullcontext():
+                _insert_dataframe_to_table(df, table_name, session, report)
+    
+    if isinstance(csv_file, (str, os.PathLike)) and os.path.exists(csv_file):
+        report.add("read_csv", bytes=os.path.getsize(csv_file), calls=0)
+    return report
+
+
+# Python types reported by the driver in cursor.description
+_PYTHON_TYPE_NAMES = {
+    bool: 'bool',
+    int: 'int',
+    float: 'float',
+    datetime.datetime: 'datetime',
+    datetime.date: 'date',
+    bytes: 'bytes',
+    bytearray: 'bytes',
+    dict: 'dict',
+    list: 'list',
+}
+
+def _column_type(column, sample):
+    """
+    SQL type for a cursor.description entry.
+
+    Sizes and precisions come from the description, since the first batch
+    says nothing about longer strings or larger numbers further on. The
+    sample value is only used for drivers that report no type code, and
+    then the widest type is chosen.
+    """
+    from .utils import DTYPE_MAPPING
+
+    type_code = column[1] if isinstance(column[1], type) else None
+    if type_code is None and sample is not None:
+        type_code = type(sample)
+    size = column[3] if isinstance(column[3], int) else None
+    precision = column[4] if isinstance(column[4], int) else size
+    if type_code is decimal.Decimal:
+        return f"DECIMAL({precision}, {column[5] or 0})" if precision else "DECIMAL(38, 10)"
+    if type_code is int:
+        # INTEGER is 32-bit on most servers; anything wider or unknown needs BIGINT
+        return DTYPE_MAPPING['int'] if precision and precision <= 10 else "BIGINT"
+    if type_code is float:
+        # Drivers report float precision in bits or digits; a double holds either
+        return DTYPE_MAPPING['float64']
+    if type_code is str:
+        if size and 0 < size <= 255:
+            return f"VARCHAR({size})"
+        return DTYPE_MAPPING['text']
+    return DTYPE_MAPPING.get(_PYTHON_TYPE_NAMES.get(type_code), 'VARCHAR(255)')
+
+def _source_query(source):
+    """(sql, params) for a Select, a Table class or a table name."""
+    if hasattr(source, 'compile'):
+        return source.compile()
+    table_name = getattr(source, '__tablename__', source)
+    return f"SELECT * FROM {table_name}", []
+
+def _table_exists(conn, table_name):
+    try:
+        conn.cursor().execute(f"SELECT 1 FROM {table_name} WHERE 1 = 0").fetchall()
+        return True
+    except Exception:
+        # Clear the failed statement (PostgreSQL aborts the transaction)
+        conn.rollback()
+        return False
+
+def transfer_table(
+    src_engine,
+    source,
+    dst_engine,
+    dst_table,
+    if_exists='fail',
+    batch_size=10000,
+    max_batches=4,
+):
+    """
+    Copy a table or query result from one database to another.
+    
+    Rows are read with fetchmany() on one thread and written with
+    executemany() (fast_executemany on pyodbc) on another, connected by a
+    bounded queue, so at most ``max_batches`` batches are held in memory.
+    The destination table is created from the source cursor's metadata.
+    
+    Parameters:
+    -----------
+    src_engine : Engine
+        Engine to read from
+    source : Select, Table or str
+        The query, Table class or table name to copy
+    dst_engine : Engine
+        Engine to write to
+    dst_table : str
+        Name of the destination table
+    if_exists : str
+        How to behave if the destination exists: 'fail', 'replace', or 'append'
+    batch_size : int or "auto"
+        Rows per fetch and insert batch; "auto" adapts it to the read rate
+    max_batches : int
+        Number of batches that may wait between the reader and the writer
+    
+    Returns:
+    --------
+    dict
+        "rows", "batches", "seconds" and "rows_per_second" of the copy
+    """
+    if if_exists not in ('fail', 'replace', 'append'):
+        raise ValueError(f"'{if_exists}' is not valid for if_exists")
+    sql, params = _source_query(source)
+    batches = queue.Queue(maxsize=max_batches)
+    stop = threading.Event()
+    done = object()
+    start = time.perf_counter()
+
+    def put(item):
+        # Give up if the writer has failed instead of blocking forever
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        conn = src_engine.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params) if params else cursor.execute(sql)
+            if not put(cursor.description):
+                return
+            for batch in fetch_batches(cursor, batch_size):
+                if not put([tuple(row) for row in batch]):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+        finally:
+            conn.close()
+
+    reader = threading.Thread(target=read, name="dbrm-transfer-reader", daemon=True)
+    reader.start()
+    rows = count = 0
+    conn = dst_engine.connect()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.fast_executemany = True
+        except AttributeError:
+            pass
+
+        description = batches.get()
+        if isinstance(description, BaseException):
+            raise description
+        first = batches.get()
+        if isinstance(first, BaseException):
+            raise first
+
+        columns = [column[0] for column in description]
+        sample_rows = [] if first is done else first
+        samples = [
+            next((row[i] for row in sample_rows if row[i] is not None), None)
+            for i in range(len(columns))
+        ]
+        types = [_column_type(column, sample) for column, sample in zip(description, samples)]
+        exists = _table_exists(conn, dst_table)
+        if exists and if_exists == 'fail':
+            raise ValueError(f"Table '{dst_table}' already exists")
+        if exists and if_exists == 'replace':
+            cursor.execute(itp.drop_table(dst_table))
+            conn.commit()
+            exists = False
+        if not exists:
+            cursor.execute(itp.create_table(dst_table, columns, types))
+            conn.commit()
+
+        insert_sql = itp.insert_many_template(dst_table, columns)
+        batch = first
+        with bound_input_sizes(cursor, input_sizes(types, dialect_of(dst_engine))):
+            while batch is not done:
+                if isinstance(batch, BaseException):
+                    raise batch
+                cursor.executemany(insert_sql, batch)
+                conn.commit()
+                rows += len(batch)
+                count += 1
+                batch = batches.get()
+    finally:
+        stop.set()
+        conn.close()
+        reader.join()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "batches": count,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,55 @@
+class Result:
+    """Buffered rows and metadata for a single statement's result set."""
+
+    def __init__(self, rows=None, description=None, rowcount=-1):
+        self.rows = list(rows) if rows is not None else []
+        self.description = description
+        self.rowcount = rowcount
+        self._position = 0
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Capture the current result set of a cursor."""
+        description = cursor.description
+        rows = cursor.fetchall() if description else []
+        return cls(rows, description, cursor.rowcount)
+
+    @property
+    def columns(self):
+        """Column names of the result set."""
+        if not self.description:
+            return []
+        return [col[0] for col in self.description]
+
+    def fetchone(self):
+        """Fetch the next row, or None when exhausted."""
+        if self._position >= len(self.rows):
+            return None
+        row = self.rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size=1):
+        """Fetch up to ``size`` of the remaining rows."""
+        rows = self.rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        """Fetch all remaining rows."""
+        rows = self.rows[self._position:]
+        self._position = len(self.rows)
+        return rows
+
+    def scalar(self):
+        """Return the first column of the first row, or None."""
+        return self.rows[0][0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"Result(rows={len(self.rows)}, rowcount={self.rowcount})"
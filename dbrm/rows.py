@@ -0,0 +1,171 @@
+import functools
+import json
+import keyword
+from .compression import decoder as decompressing
+
+_UNSET = object()
+# Generated classes kept for reuse; the oldest are dropped past this many
+_CACHE_SIZE = 1024
+
+
+def _decode_json(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value).decode('utf-8')
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _decode_text(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode('utf-8')
+    return value
+
+
+def _decode_bytes(value):
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return value
+
+
+# Decoders by Column.type name; JSON is always decoded, TEXT and BLOB
+# only normalised when a column asks for lazy decoding.
+DECODERS = {
+    'dict': _decode_json,
+    'list': _decode_json,
+    'text': _decode_text,
+    'bytes': _decode_bytes,
+}
+
+
+class Row:
+    """Base class of the compact ``__slots__`` rows built by ``row_class``."""
+
+    __slots__ = ()
+    _fields = ()
+    _table = None
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            key = self._fields[key]
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Row):
+            return NotImplemented
+        return self._fields == other._fields and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash((self._fields, tuple(self)))
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+    def _asdict(self):
+        """Return the row as a dict of column name to value."""
+        return {name: getattr(self, name) for name in self._fields}
+
+
+class _LazyColumn:
+    """Descriptor that decodes a raw column value on first access."""
+
+    def __init__(self, raw, decoded, decoder):
+        self.raw = raw
+        self.decoded = decoded
+        self.decoder = decoder
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.decoded)
+        if value is _UNSET:
+            raw = getattr(instance, self.raw)
+            value = None if raw is None else self.decoder(raw)
+            setattr(instance, self.decoded, value)
+            setattr(instance, self.raw, None)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.decoded, value)
+        setattr(instance, self.raw, None)
+
+
+def _field_names(names):
+    """Turn result column names into unique attribute names."""
+    fields, seen = [], set()
+    for i, name in enumerate(names):
+        name = str(name)
+        if not name.isidentifier() or keyword.iskeyword(name) or name.startswith('_'):
+            name = f"col{i}"
+        base, n = name, 1
+        while name in seen:
+            name = f"{base}_{n}"
+            n += 1
+        seen.add(name)
+        fields.append(name)
+    return tuple(fields)
+
+
+def row_class(names, table=None):
+    """
+    Get the generated ``__slots__`` row class for a set of result columns.
+
+    Recently used classes are cached per (table, column names). Columns of ``table``
+    with a JSON type are decoded when a row is built, or on first
+    attribute access if the column is declared with ``lazy=True``, in
+    which case TEXT and BLOB values are normalised lazily as well.
+    Columns declared with ``compress`` are always decompressed and
+    decoded on first access.
+
+    Args:
+        names: Result column names, e.g. from ``cursor.description``.
+        table: Optional TableBase subclass the columns belong to.
+
+    Returns:
+        type: A ``Row`` subclass; instantiate it with a row sequence.
+    """
+    return _build_row_class(table, tuple(names))
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _build_row_class(table, names):
+    fields = _field_names(names)
+    columns = getattr(table, '_columns', {})
+    namespace = {'_fields': fields, '_table': table}
+    slots, body, env = [], [], {'_UNSET': _UNSET}
+
+    for i, (name, field) in enumerate(zip(names, fields)):
+        column = columns.get(name)
+        decoder = DECODERS.get(column.type_name) if column is not None else None
+        lazy = getattr(column, 'lazy', False)
+        if getattr(column, 'compress', None):
+            base = decoder or (_decode_text if column.type_name == 'str' else None)
+            decoder, lazy = decompressing(base), True
+        if decoder is not None and lazy:
+            raw, decoded = f"_raw_{field}", f"_val_{field}"
+            slots += [raw, decoded]
+            namespace[field] = _LazyColumn(raw, decoded, decoder)
+            body.append(f"    self.{raw} = values[{i}]")
+            body.append(f"    self.{decoded} = _UNSET")
+        elif decoder is _decode_json:
+            slots.append(field)
+            env[f"_decode_{i}"] = decoder
+            body.append(f"    value = values[{i}]")
+            body.append(f"    self.{field} = None if value is None else _decode_{i}(value)")
+        else:
+            slots.append(field)
+            body.append(f"    self.{field} = values[{i}]")
+
+    source = "def __init__(self, values):\n" + ("\n".join(body) or "    pass")
+    exec(source, env)
+    namespace['__init__'] = env['__init__']
+    namespace['__slots__'] = tuple(slots)
+
+    name = f"{table.__name__}Row" if table is not None else "Row"
+    return type(name, (Row,), namespace)
@@ -0,0 +1,191 @@
+"""
+Connection checkout scheduling between workload classes.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from .pool import PoolTimeout
+
+_workload = contextvars.ContextVar("dbrm_workload", default=None)
+
+
+class Workload:
+    """Settings for one workload class.
+
+    ``limit`` caps the connections the class may hold at once (None for
+    no cap), ``weight`` sets its share when classes compete for free
+    connections, and ``priority`` (lower first) breaks ties.
+    """
+
+    def __init__(self, limit=None, weight=1, priority=0):
+        self.limit = limit
+        self.weight = weight
+        self.priority = priority
+        self.active = 0
+        self.waiters = deque()
+
+    def __repr__(self):
+        return f"<Workload limit={self.limit} active={self.active} waiting={len(self.waiters)}>"
+
+
+def default_workloads():
+    """Interactive work gets most of the capacity; batch and maintenance are capped."""
+    return {
+        "interactive": Workload(weight=6, priority=0),
+        "batch": Workload(limit=4, weight=3, priority=1),
+        "maintenance": Workload(limit=1, weight=1, priority=2),
+    }
+
+
+@contextmanager
+def workload(name):
+    """
+    Run a block under a workload class; connections opened in it are scheduled as ``name``.
+    Args:
+        name (str): The workload class, e.g. 'batch'.
+    """
+    token = _workload.set(name)
+    try:
+        yield
+    finally:
+        _workload.reset(token)
+
+
+def current_workload():
+    """The workload class set by the enclosing ``workload()`` block, if any."""
+    return _workload.get()
+
+
+class _Waiter:
+    __slots__ = ("granted", "queued_at")
+
+    def __init__(self):
+        self.granted = False
+        self.queued_at = time.perf_counter()
+
+
+class Scheduler:
+    """Hands out connection slots to workload classes.
+
+    At most ``capacity`` slots are in use, and each class stays within its
+    own limit. When a slot frees up it goes to the waiting class using the
+    smallest share of its weight (active / weight), so busy batch jobs
+    cannot crowd out interactive requests and no class starves. Waiters
+    within a class are served first come, first served.
+
+    Queue depth, active slots and wait times per class are recorded in
+    ``metrics`` as ``queue_depth.<class>``, ``active.<class>`` and
+    ``checkout_wait.<class>``.
+    """
+
+    def __init__(self, capacity=None, workloads=None, default="interactive", metrics=None):
+        self.capacity = capacity
+        self.workloads = workloads if workloads is not None else default_workloads()
+        if default not in self.workloads:
+            raise ValueError(f"Default workload '{default}' is not defined")
+        self.default = default
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._active = 0
+
+    def _record(self, name, cls):
+        if self.metrics is not None:
+            self.metrics.gauge(f"queue_depth.{name}", len(cls.waiters))
+            self.metrics.gauge(f"active.{name}", cls.active)
+
+    def _dispatch(self):
+        """Grant free slots to waiters; caller holds the lock."""
+        granted = False
+        while self.capacity is None or self._active < self.capacity:
+            eligible = [
+                (name, cls) for name, cls in self.workloads.items()
+                if cls.waiters and (cls.limit is None or cls.active < cls.limit)
+            ]
+            if not eligible:
+                break
+            name, cls = min(eligible, key=lambda item: (item[1].active / item[1].weight, item[1].priority))
+            cls.waiters.popleft().granted = True
+            cls.active += 1
+            self._active += 1
+            self._record(name, cls)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, name=None, timeout=None):
+        """
+        Wait for a slot for a workload class.
+        Args:
+            name (str, optional): The class; defaults to the current ``workload()`` or ``default``.
+            timeout (float, optional): Seconds to wait; None waits indefinitely.
+        Returns:
+            str: The class the slot was granted to, to pass to ``release``.
+        """
+        name = name or current_workload() or self.default
+        cls = self.workloads.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown workload '{name}'")
+        waiter = _Waiter()
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            cls.waiters.append(waiter)
+            self._dispatch()
+            self._record(name, cls)
+            while not waiter.granted:
+                remaining = None if expires is None else expires - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    cls.waiters.remove(waiter)
+                    self._record(name, cls)
+                    if self.metrics is not None:
+                        self.metrics.incr(f"checkout_timeouts.{name}")
+                    raise PoolTimeout(f"No '{name}' connection slot available within {timeout}s")
+                self._cond.wait(remaining)
+        if self.metrics is not None:
+            self.metrics.observe(f"checkout_wait.{name}", time.perf_counter() - waiter.queued_at)
+        return name
+
+    def release(self, name):
+        """Return a slot taken by ``acquire``."""
+        with self._cond:
+            cls = self.workloads[name]
+            cls.active -= 1
+            self._active -= 1
+            self._record(name, cls)
+            self._dispatch()
+
+    def stats(self):
+        """Active and waiting counts and the limit of every class."""
+        with self._cond:
+            return {
+                name: {"active": cls.active, "waiting": len(cls.waiters), "limit": cls.limit}
+                for name, cls in self.workloads.items()
+            }
+
+
+class ScheduledConnection:
+    """Connection proxy that gives its scheduler slot back when closed."""
+
+    def __init__(self, connection, scheduler, workload):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_scheduler', scheduler)
+        object.__setattr__(self, '_workload', workload)
+        object.__setattr__(self, '_closed', False)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def close(self):
+        """Close the connection and release its slot."""
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        try:
+            self._connection.close()
+        finally:
+            self._scheduler.release(self._workload)
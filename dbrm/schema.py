@@ -1,24 +1,166 @@
+import json
 from .utils import DTYPE_MAPPING
+from .rows import row_class
+from .expression import ColumnOperators
+from .compression import check_codec, decompress, encode
 
-class Column:
-    """Represents a database column."""
+# Column types whose values can be compressed on the client
+COMPRESSIBLE_TYPES = ('dict', 'list', 'text', 'bytes', 'str')
+
+class Column(ColumnOperators):
+    """Represents a database column.
+    
+    Comparisons on a column build parameterized expressions, e.g.
+    ``User.id == 5`` or ``User.age.between(18, 30)``.
+    
+    ``compress="zlib"`` or ``"zstd"`` stores JSON, TEXT and BLOB values
+    compressed (see ``dbrm.compression``) in a binary column; they are
+    decompressed on first access when rows are read.
+    """
     
     def __init__(self, type_=None, primary_key=False, nullable=True, 
-                 unique=False, default=None, autoincrement=False):
+                 unique=False, default=None, autoincrement=False, lazy=False,
+                 index=False, compress=None):
+        if compress is not None:
+            check_codec(compress)
+            if _type_name(type_) not in COMPRESSIBLE_TYPES:
+                raise ValueError(f"Only JSON, TEXT and BLOB columns can be compressed, not {type_!r}")
         self.type = type_
         self.primary_key = primary_key
         self.nullable = nullable
         self.unique = unique
         self.default = default
         self.autoincrement = autoincrement
+        self.lazy = lazy
+        self.index = index
+        self.compress = compress
         self.name = None
+        self.table = None
+    
+    @property
+    def type_name(self):
+        """Key of the column type in DTYPE_MAPPING, e.g. 'int' or 'dict'."""
+        return _type_name(self.type)
+    
+    @property
+    def sql_type(self):
+        """SQL type used to create the column; compressed values are binary."""
+        if self.compress:
+            return DTYPE_MAPPING['bytes']
+        return DTYPE_MAPPING.get(self.type_name, 'VARCHAR(255)')
+    
+    def to_db(self, value):
+        """Convert a Python value to the value stored in the column."""
+        if value is None:
+            return None
+        if self.compress:
+            return encode(value, self.type_name, self.compress)
+        if self.type_name in ('dict', 'list') and not isinstance(value, (str, bytes)):
+            return json.dumps(value)
+        return value
+    
+    def from_db(self, value):
+        """Convert a stored column value back to its Python value."""
+        if value is None:
+            return None
+        if self.compress:
+            value = decompress(value)
+            if isinstance(value, (bytearray, memoryview)):
+                value = bytes(value)
+            if self.type_name in ('text', 'str') and isinstance(value, bytes):
+                return value.decode('utf-8')
+        if self.type_name in ('dict', 'list'):
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = bytes(value).decode('utf-8')
+            if isinstance(value, str):
+                return json.loads(value)
+        return value
         
     def __set_name__(self, owner, name):
         self.name = name
+        self.table = owner
+    
+    @property
+    def sql_name(self):
+        """Column reference qualified with its table name."""
+        if self.table is None:
+            return self.name
+        return f"{self.table.__tablename__}.{self.name}"
+    
+    def __str__(self):
+        return self.sql_name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.__dict__.get(self.name)
+    
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+        instance._state.modified.add(self.name)
+
+
+def _type_name(type_):
+    return type_.__name__ if hasattr(type_, '__name__') else str(type_)
+
+
+class Index:
+    """Represents a secondary index on one or more columns."""
+    
+    def __init__(self, name, *columns, unique=False):
+        self.name = name
+        self._columns = columns
+        self.unique = unique
+    
+    @property
+    def columns(self):
+        """Names of the indexed columns."""
+        # Column objects only learn their names once the table class is built
+        return [col.name if isinstance(col, Column) else col for col in self._columns]
+    
+    def create_sql(self, table_name, dialect='generic'):
+        """Build the CREATE INDEX statement for this index."""
+        unique = "UNIQUE " if self.unique else ""
+        # Only some servers accept IF NOT EXISTS on indexes
+        if_not_exists = "IF NOT EXISTS " if dialect in ("sqlite", "postgresql") else ""
+        columns = ", ".join(self.columns)
+        sql = f"CREATE {unique}INDEX {if_not_exists}{self.name} ON {table_name} ({columns})"
+        if dialect == "mssql":
+            return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{self.name}' "
+                    f"AND object_id = OBJECT_ID('{table_name}')) {sql}")
+        return sql
+
+
+class RowState:
+    """Persistence bookkeeping for a table row instance."""
+    
+    __slots__ = ("persistent", "committed", "modified")
+    
+    def __init__(self):
+        self.persistent = False
+        self.committed = {}
+        self.modified = set()
+    
+    def changes(self, instance):
+        """Names of columns whose value differs from the last flushed state."""
+        return [
+            name for name in instance._columns
+            if name in self.modified
+            and instance.__dict__.get(name) != self.committed.get(name)
+        ]
+    
+    def mark_flushed(self, instance):
+        self.persistent = True
+        self.committed = {name: instance.__dict__.get(name) for name in instance._columns}
+        self.modified.clear()
 
 
 class TableBase:
-    """Base class for all table definitions."""
+    """Base class for all table definitions.
+    
+    Subclasses can also be instantiated as rows, e.g. ``User(name="a")``,
+    and handed to ``Session.add`` to be written on the next flush.
+    """
     
     @classmethod
     def __init_subclass__(cls):
@@ -29,14 +171,68 @@ class TableBase:
             if isinstance(attr, Column):
                 attr.__set_name__(cls, name)
                 cls._columns[name] = attr
+        cls._primary_key = tuple(
+            name for name, column in cls._columns.items() if column.primary_key
+        )
+        
+        cls._indexes = [
+            Index(f"ix_{cls.__tablename__}_{name}", name)
+            for name, column in cls._columns.items() if column.index
+        ]
+        for index in getattr(cls, '__indexes__', ()):
+            if not isinstance(index, Index):
+                columns = [index] if isinstance(index, str) else list(index)
+                index = Index(f"ix_{cls.__tablename__}_{'_'.join(columns)}", *columns)
+            cls._indexes.append(index)
+    
+    def __init__(self, **values):
+        self._state = RowState()
+        for name in values:
+            if name not in self._columns:
+                raise TypeError(f"'{name}' is not a column of {type(self).__name__}")
+        for name, column in self._columns.items():
+            if name in values:
+                setattr(self, name, values[name])
+            elif column.default is not None:
+                default = column.default
+                setattr(self, name, default() if callable(default) else default)
+    
+    @classmethod
+    def _from_row(cls, names, row):
+        """Build a persistent instance from a fetched row."""
+        instance = cls.__new__(cls)
+        instance._state = RowState()
+        columns = cls._columns
+        # Decoded like row_class rows, so writing the row back does not re-encode stored values
+        instance.__dict__.update(
+            (name, columns[name].from_db(value) if name in columns else value)
+            for name, value in zip(names, row)
+        )
+        instance._state.mark_flushed(instance)
+        return instance
+    
+    @classmethod
+    def row_class(cls, columns=None):
+        """Get the compact ``__slots__`` row class for this table's columns."""
+        return row_class(tuple(columns or cls._columns), cls)
+    
+    def _identity(self):
+        """Identity-map key of this row, or None if its key is not set."""
+        key = tuple(self.__dict__.get(name) for name in self._primary_key)
+        if not key or any(value is None for value in key):
+            return None
+        return (type(self), key)
+    
+    def __repr__(self):
+        values = ", ".join(f"{name}={self.__dict__.get(name)!r}" for name in self._columns)
+        return f"{type(self).__name__}({values})"
     
     @classmethod
     def create(cls, session):
         """Create this table in the database."""
         columns = []
         for name, column in cls._columns.items():
-            type_name = column.type.__name__ if hasattr(column.type, '__name__') else str(column.type)
-            sql_type = DTYPE_MAPPING.get(type_name, 'VARCHAR(255)')
+            sql_type = column.sql_type
             nullable = "NOT NULL" if not column.nullable else "NULL"
             pk = "PRIMARY KEY" if column.primary_key else ""
             autoinc = "AUTO_INCREMENT" if column.autoincrement else ""
@@ -46,9 +242,31 @@ class TableBase:
         
         create_sql = f"CREATE TABLE IF NOT EXISTS {cls.__tablename__} (\n  " + ",\n  ".join(columns) + "\n)"
         session.execute(create_sql)
+        dialect = getattr(session, 'dialect', 'generic')
+        existing = cls._mysql_index_names(session) if dialect == 'mysql' and cls._indexes else set()
+        for index in cls._indexes:
+            if index.name.lower() not in existing:
+                session.execute(index.create_sql(cls.__tablename__, dialect))
         session.commit()
         return True
     
+    @classmethod
+    def _mysql_index_names(cls, session):
+        """Names of the indexes already on this table; MySQL has no CREATE INDEX IF NOT EXISTS."""
+        # A Batch only queues statements, so the lookup runs on its session
+        executor = getattr(session, 'session', session)
+        rows = executor.execute(
+            "SELECT DISTINCT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ?",
+            [cls.__tablename__],
+        ).fetchall()
+        return {row[0].lower() for row in rows}
+    
+    @classmethod
+    def create_index_sql(cls, dialect='generic'):
+        """Build the CREATE INDEX statements for this table's indexes."""
+        return [index.create_sql(cls.__tablename__, dialect) for index in cls._indexes]
+    
     @classmethod
     def drop(cls, session):
         """Drop this table from the database."""
@@ -0,0 +1,137 @@
+import contextvars
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from .session import Session
+from .metrics import Metrics
+
+
+def _close_session(session, metrics, started):
+    """Close a scoped Session; runs on ``remove()`` or when its scope is gone."""
+    try:
+        session.close()
+    finally:
+        metrics.adjust("sessions_active", -1)
+        metrics.incr("sessions_closed")
+        metrics.observe("session_seconds", time.perf_counter() - started)
+
+
+class _Scope:
+    """Holder for one scope's Session; closing is tied to its lifetime."""
+
+    __slots__ = ("session", "close", "__weakref__")
+
+    def __init__(self, session, metrics):
+        self.session = session
+        # Also fires when a thread ends or a context is dropped without remove()
+        self.close = weakref.finalize(self, _close_session, session, metrics, time.perf_counter())
+
+
+class ScopedSession:
+    """Registry that gives each thread, or each context, its own Session.
+
+    Calling the registry returns the current scope's Session, creating it
+    on first use, and attribute access is forwarded to it, so
+    ``db.execute(...)`` works directly. Sessions draw connections from the
+    engine's pool. ``remove()`` closes the current Session and ``scope()``
+    wraps a block, such as one request, in a Session of its own that is
+    removed when the block ends. A Session whose thread finishes, or whose
+    context is discarded, is closed as well.
+
+    With ``scope="context"`` Sessions are kept in a ContextVar instead of
+    a thread-local, for asyncio code; use ``scope()`` in each task so that
+    tasks do not inherit their parent's Session.
+    """
+
+    def __init__(self, engine, scope="thread", **session_kwargs):
+        if scope not in ("thread", "context"):
+            raise ValueError(f"'{scope}' is not a valid scope")
+        self.engine = engine
+        self.scope_kind = scope
+        self.session_kwargs = session_kwargs
+        self.metrics = Metrics()
+        if scope == "thread":
+            self._local = threading.local()
+        else:
+            self._var = contextvars.ContextVar(f"dbrm_session_{id(self)}", default=None)
+
+    def _get(self):
+        if self.scope_kind == "thread":
+            return getattr(self._local, 'scope', None)
+        return self._var.get()
+
+    def _set(self, scope):
+        if self.scope_kind == "thread":
+            self._local.scope = scope
+        else:
+            self._var.set(scope)
+
+    def _new_scope(self):
+        session = Session(self.engine, **self.session_kwargs)
+        self.metrics.incr("sessions_created")
+        self.metrics.adjust("sessions_active", 1)
+        return _Scope(session, self.metrics)
+
+    def __call__(self):
+        """Return the Session of the current thread or context."""
+        scope = self._get()
+        if scope is None:
+            scope = self._new_scope()
+            self._set(scope)
+        return scope.session
+
+    def __getattr__(self, name):
+        return getattr(self(), name)
+
+    @property
+    def has_session(self):
+        """Whether the current thread or context has a Session."""
+        return self._get() is not None
+
+    def remove(self):
+        """Close the current Session; the next call creates a new one."""
+        scope = self._get()
+        if scope is not None:
+            self._set(None)
+            scope.close()
+
+    @contextmanager
+    def scope(self):
+        """Run a block with its own Session, rolled back on error and removed at the end.
+
+        Can also be used as a decorator, e.g. on a request handler.
+        """
+        previous = self._get()
+        scope = self._new_scope()
+        self._set(scope)
+        try:
+            yield scope.session
+        except Exception:
+            scope.session.rollback()
+            raise
+        finally:
+            self._set(previous)
+            scope.close()
+
+    def stats(self):
+        """Session counts and timings, plus pool usage when the engine has a pool."""
+        stats = self.metrics.snapshot()
+        pool = getattr(self.engine, 'pool', None)
+        if pool is not None:
+            stats["pool_checked_out"] = pool.checked_out
+            stats["pool_idle"] = pool.idle
+        return stats
+
+
+def scoped_session(engine, scope="thread", **session_kwargs):
+    """
+    Create a registry of per-thread (or per-context) Sessions.
+    Args:
+        engine: The Engine the Sessions connect through.
+        scope (str): 'thread' or 'context'.
+        session_kwargs: Arguments for each Session, e.g. ``readonly``.
+    Returns:
+        ScopedSession: The registry.
+    """
+    return ScopedSession(engine, scope=scope, **session_kwargs)
@@ -1,70 +1,374 @@
+import re
 from contextlib import contextmanager
+from .result import Result
+from .unitofwork import UnitOfWork
+from .dialect import of as dialect_of
+from .timeouts import TimedCursor, effective_timeout, statement_timeout
+from .binding import bound_input_sizes
+from .scheduler import workload as use_workload
+from .isolation import apply as apply_isolation, apply_read_only, check_level
+
+_READ_KEYWORDS = ("SELECT", "WITH")
+_WRITE_PATTERN = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|INTO)\b", re.IGNORECASE)
+# String literals, quoted identifiers and comments, whose words are not keywords
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\[[^\]]*\]|`[^`]*`|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def _is_read_statement(sql):
+    """Conservatively decide whether SQL text only reads data."""
+    for statement in _QUOTED.sub(" ", sql).split(";"):
+        words = statement.split(None, 1)
+        if not words:
+            continue
+        if words[0].upper() not in _READ_KEYWORDS or _WRITE_PATTERN.search(statement):
+            return False
+    return True
+
+
+class ReadOnlyError(Exception):
+    """Raised when a read-only session is asked to write."""
+
+
+def _compile(statement, params=None):
+    """Turn a raw SQL string or a query builder into (sql, params)."""
+    if hasattr(statement, 'compile'):
+        statement = statement.compile()
+    elif hasattr(statement, 'build'):
+        statement = statement.build()
+    if isinstance(statement, tuple):
+        statement, params = statement
+    return statement, list(params) if params else []
+
+
+class Batch:
+    """Collects several statements and sends them in a single round trip.
+
+    A batch accepts the same calls as a Session (``execute``/``commit``),
+    so builders and ``TableBase.create`` can target it directly.
+    """
+
+    def __init__(self, session, statements=()):
+        self.session = session
+        self.statements = []
+        self.results = None
+        self._commit = False
+        for statement in statements:
+            self.add(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None and self.results is None:
+            self.run()
+
+    def add(self, statement, params=None):
+        """Queue a statement, a (sql, params) pair or a query builder."""
+        self.statements.append(_compile(statement, params))
+        return self
+
+    def execute(self, query, params=None):
+        """Queue a statement (Session-compatible alias of ``add``)."""
+        self.add(query, params)
+
+    @property
+    def dialect(self):
+        return self.session.dialect
+
+    def commit(self):
+        """Commit on the session once the batch has run."""
+        self._commit = True
+
+    def build(self):
+        """Build the combined SQL text and its flattened parameters."""
+        sql = ";\n".join(stmt.rstrip().rstrip(";") for stmt, _ in self.statements)
+        params = [param for _, stmt_params in self.statements for param in stmt_params]
+        return sql, params
+
+    def run(self):
+        """Send the batch and return one Result per result set."""
+        self.results = []
+        if not self.statements:
+            return self.results
+
+        sql, params = self.build()
+        cursor = self.session.execute(sql, params)
+        while True:
+            self.results.append(Result.from_cursor(cursor))
+            if not cursor.nextset():
+                break
+
+        if self._commit:
+            self.session.commit()
+        return self.results
+
 
 class Session:
-    """Manages database operations and transactions."""
+    """Manages database operations and transactions.
+
+    When the engine routes reads (see ``ReplicatedEngine``), SELECT
+    statements and read-only sessions are served from a replica while
+    writes and transactions go to the primary. With ``sticky`` set, reads
+    issued after a write stay on the primary so the session sees its own
+    writes.
+
+    Table row objects passed to ``add``/``delete`` are tracked in an
+    identity map and written in batches by ``flush``, which also runs on
+    ``commit`` and at the end of ``begin()``.
+
+    Statements are cancelled after ``timeout`` seconds (default: the
+    engine's ``timeout``), or sooner inside a ``deadline()`` block, and
+    raise QueryTimeout. ``cancel()`` stops the running statement from
+    another thread.
+
+    ``workload`` names the class the session's connections are scheduled
+    under when the engine has workload scheduling enabled.
+
+    ``isolation`` ("READ COMMITTED", "SNAPSHOT", ...) is set once on each
+    connection the session checks out and reset when it goes back to the
+    pool. ``readonly`` sessions raise ReadOnlyError for any statement
+    other than SELECT/WITH, put their connections in the server's
+    read-only mode where the dialect has one, and on a routing engine run
+    everything, including ``begin()`` transactions, on a replica.
+    """
     
-    def __init__(self, engine):
+    def __init__(self, engine, readonly=False, sticky=True, timeout=None, workload=None,
+                 isolation=None):
         self.engine = engine
+        self.readonly = readonly
+        self.isolation = None if isolation is None else check_level(isolation)
+        self.sticky = sticky
+        self.timeout = timeout
+        self.workload = workload
         self._connection = None
         self._cursor = None
+        self._read_connection = None
+        self._read_cursor = None
+        self._last_cursor = None
+        self._watchdog = None
+        self._wrote = False
         self._transaction_level = 0
+        self._uow = UnitOfWork()
+    
+    @property
+    def dialect(self):
+        """SQL dialect of the database this session talks to."""
+        dialect = getattr(self.engine, 'dialect', None)
+        if isinstance(dialect, str):
+            return dialect
+        # The engine learns its dialect from the first connection it opens
+        connection = self._connection or self._read_connection or self._transaction_connection()
+        dialect = getattr(self.engine, 'dialect', None)
+        return dialect if isinstance(dialect, str) else dialect_of(connection)
+    
+    @property
+    def _routes_reads(self):
+        return getattr(self.engine, 'routes_reads', False) is True
     
     def __enter__(self):
-        self._connection = self.engine.connect()
-        self._cursor = self._connection.cursor()
+        if not self._routes_reads:
+            self._open_primary()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._cursor:
-            self._cursor.close()
-        if self._connection:
-            self._connection.close()
-            self._connection = None
-        
-    def execute(self, query, params=None):
-        """Execute a raw SQL query."""
-        if params:
-            self._cursor.execute(query, params)
-        else:
-            self._cursor.execute(query)
+        self.close()
+    
+    def close(self):
+        """Close cursors, release connections and forget tracked row objects."""
+        self._disarm()
+        for cursor in (self._cursor, self._read_cursor):
+            if cursor:
+                cursor.close()
+        for connection in (self._connection, self._read_connection):
+            if connection:
+                connection.close()
+        self._cursor = self._read_cursor = self._last_cursor = None
+        self._connection = self._read_connection = None
+        self._uow.clear()
+    
+    def _connect(self, **kwargs):
+        if self.workload is None:
+            return self.engine.connect(**kwargs)
+        with use_workload(self.workload):
+            return self.engine.connect(**kwargs)
+    
+    def _prepare(self, connection):
+        if self.isolation is None and not self.readonly:
+            return connection
+        dialect = getattr(self.engine, 'dialect', None)
+        if not isinstance(dialect, str):
+            dialect = dialect_of(connection)
+        if self.isolation is not None:
+            apply_isolation(connection, self.isolation, dialect)
+        if self.readonly:
+            # The server also refuses writes the statement check cannot see
+            apply_read_only(connection, dialect)
+        return connection
+    
+    def _open_primary(self):
+        self._connection = self._prepare(self._connect())
+        self._cursor = self._connection.cursor()
+    
+    def _primary_cursor(self):
+        if self._cursor is None:
+            self._open_primary()
         return self._cursor
     
+    def _replica_cursor(self):
+        if self._read_cursor is None:
+            self._read_connection = self._prepare(self._connect(readonly=True))
+            self._read_cursor = self._read_connection.cursor()
+        return self._read_cursor
+    
+    def _cursor_for(self, query):
+        """Pick the cursor a statement should run on."""
+        is_read = _is_read_statement(query)
+        if self.readonly and not is_read:
+            raise ReadOnlyError(f"Read-only session cannot run: {query[:80]}")
+        if self._routes_reads and (self.readonly or not self._transaction_level):
+            if self.readonly or (is_read and not (self.sticky and self._wrote)):
+                return self._replica_cursor()
+        if not is_read:
+            self._wrote = True
+        return self._primary_cursor()
+        
+    def _timeout(self, cursor, timeout=None, keep=False):
+        return statement_timeout(
+            cursor,
+            effective_timeout(timeout, self.timeout, getattr(self.engine, 'timeout', None)),
+            getattr(self.engine, 'metrics', None),
+            keep=keep,
+        )
+    
+    def _disarm(self):
+        # A timer left from the previous statement must not cancel the next one
+        if self._watchdog is not None:
+            self._watchdog.disarm()
+            self._watchdog = None
+    
+    def execute(self, query, params=None, timeout=None):
+        """Execute a raw SQL query, optionally with a timeout in seconds.
+        
+        Under a timeout the cursor is returned wrapped, so that fetching
+        the rows counts against the same timeout.
+        """
+        self._disarm()
+        cursor = self._cursor_for(query)
+        self._last_cursor = cursor
+        with self._timeout(cursor, timeout, keep=True) as watchdog:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+        if watchdog is None:
+            return cursor
+        self._watchdog = watchdog
+        self._last_cursor = TimedCursor(cursor, watchdog)
+        return self._last_cursor
+    
+    def cancel(self):
+        """Cancel the statement running on this session; safe from another thread."""
+        for cursor in (self._cursor, self._read_cursor):
+            if cursor is not None:
+                cursor.cancel()
+        metrics = getattr(self.engine, 'metrics', None)
+        if metrics is not None:
+            metrics.incr("statements_cancelled")
+    
+    def batch(self, *statements):
+        """Collect statements to be sent together in one round trip."""
+        return Batch(self, statements)
+
     def fetchall(self):
         """Fetch all results from the last query."""
-        return self._cursor.fetchall()
+        return (self._last_cursor or self._cursor).fetchall()
     
     def fetchone(self):
         """Fetch one result from the last query."""
-        return self._cursor.fetchone()
+        return (self._last_cursor or self._cursor).fetchone()
     
     @contextmanager
     def begin(self):
         """Begin a transaction."""
+        connection = self._transaction_connection()
         self._transaction_level += 1
         if self._transaction_level == 1:
-            self._connection.autocommit = False
+            connection.autocommit = False
         try:
             yield self
             if self._transaction_level == 1:
-                self._connection.commit()
+                self.flush()
+                connection.commit()
+                self._uow.commit()
         except Exception:
             if self._transaction_level == 1:
-                self._connection.rollback()
+                connection.rollback()
+                self._uow.rollback()
             raise
         finally:
             self._transaction_level -= 1
             if self._transaction_level == 0:
-                self._connection.autocommit = True
+                connection.autocommit = True
+    
+    def _transaction_connection(self):
+        # Read-only transactions, e.g. snapshot reports, stay on the replica
+        if self.readonly and self._routes_reads:
+            self._replica_cursor()
+            return self._read_connection
+        self._primary_cursor()
+        return self._connection
     
     def commit(self):
-        """Commit the current transaction."""
-        self._connection.commit()
+        """Flush pending row changes and commit the current transaction."""
+        self.flush()
+        if self._connection:
+            self._connection.commit()
+        self._uow.commit()
     
     def rollback(self):
-        """Roll back the current transaction."""
-        self._connection.rollback()
+        """Roll back the current transaction and the row changes flushed in it."""
+        if self._connection:
+            self._connection.rollback()
+        self._uow.rollback()
         
-    def executemany(self, query, params_seq):
-        """Execute a query with multiple parameter sets."""
-        self._cursor.executemany(query, params_seq)
-        return self._cursor
+    def executemany(self, query, params_seq, timeout=None, input_sizes=None):
+        """Execute a query with multiple parameter sets.
+        
+        ``input_sizes`` binds the parameters with explicit ODBC types
+        (see ``dbrm.binding``) instead of guessing them from the first row.
+        """
+        if self.readonly:
+            raise ReadOnlyError(f"Read-only session cannot run: {query[:80]}")
+        self._disarm()
+        cursor = self._primary_cursor()
+        self._wrote = True
+        self._last_cursor = cursor
+        with self._timeout(cursor, timeout), bound_input_sizes(cursor, input_sizes):
+            cursor.executemany(query, params_seq)
+        return cursor
+    
+    @property
+    def identity_map(self):
+        """Row objects tracked by this session, keyed by (class, primary key)."""
+        return self._uow.identity_map
+    
+    def add(self, obj):
+        """Track a row object; new rows are inserted on the next flush."""
+        self._uow.add(obj)
+    
+    def add_all(self, objs):
+        """Track several row objects."""
+        for obj in objs:
+            self._uow.add(obj)
+    
+    def delete(self, obj):
+        """Mark a row object for deletion on the next flush."""
+        self._uow.delete(obj)
+    
+    def get(self, table, key):
+        """Get a row object by primary key, from the identity map if present."""
+        return self._uow.get(self, table, key)
+    
+    def flush(self):
+        """Write pending inserts, updates and deletes as executemany batches."""
+        return self._uow.flush(self)
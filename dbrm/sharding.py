@@ -0,0 +1,386 @@
+import copy
+import heapq
+import re
+from functools import total_ordering
+from .engine import Engine
+from .session import Session, _compile
+from .result import Result
+from .expression import BinaryExpression
+import dbrm.sqlinterpreter as itp
+
+_AGGREGATE = re.compile(
+    r"^\s*(COUNT|SUM|MIN|MAX|AVG)\s*\((.*)\)\s*(?:AS\s+(\w+))?\s*$", re.IGNORECASE
+)
+# Any aggregate call, e.g. inside SUM(a) / COUNT(*), which cannot be merged
+_ANY_AGGREGATE = re.compile(
+    r"\b(COUNT|COUNT_BIG|SUM|MIN|MAX|AVG|STDEV|STDEVP|STDDEV\w*|VAR|VARP|VARIANCE|VAR_\w+|MEDIAN"
+    r"|GROUP_CONCAT|STRING_AGG|ARRAY_AGG|LISTAGG|BIT_\w+|BOOL_\w+|EVERY)\s*\(",
+    re.IGNORECASE,
+)
+# ORDER BY item the merge can follow: a selected column, its direction and NULL placement
+_ORDER_TERM = re.compile(
+    r"^\s*([\w.]+)(?:\s+(ASC|DESC))?(?:\s+NULLS\s+(FIRST|LAST))?\s*$", re.IGNORECASE
+)
+# Servers that sort NULLs above every value, so last in ascending order;
+# SQL Server, MySQL and SQLite sort them below
+_NULLS_HIGH = ("postgresql", "oracle")
+_COMBINE = {
+    "COUNT": lambda a, b: a + b,
+    "SUM": lambda a, b: a + b,
+    "MIN": min,
+    "MAX": max,
+}
+
+
+def _balanced(text):
+    depth = 0
+    for char in text:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def _aggregate_plan(columns):
+    """
+    Plan how per-shard aggregates are merged.
+    Args:
+        columns: The columns of the Select.
+    Returns:
+        tuple: (plan, shard_columns). ``plan`` has one (kind, positions, name)
+               entry per output column, kind being 'KEY', 'AVG' or the
+               aggregate function; None when nothing is aggregated.
+               ``shard_columns`` are the columns each shard selects, with
+               AVG(x) split into SUM(x) and COUNT(x).
+    """
+    plan, shard_columns, aggregated = [], [], False
+    for column in columns:
+        text = str(column)
+        match = _AGGREGATE.match(text)
+        if match and not _balanced(match.group(2)):
+            match = None
+        if match is None:
+            if _ANY_AGGREGATE.search(text):
+                raise ValueError(f"{text.strip()} cannot be merged across shards")
+            plan.append(("KEY", [len(shard_columns)], text))
+            shard_columns.append(column)
+            continue
+        func, arg, alias = match.group(1).upper(), match.group(2), match.group(3)
+        if arg.strip().upper().startswith("DISTINCT") or _ANY_AGGREGATE.search(arg):
+            raise ValueError(f"{text.strip()} cannot be merged across shards")
+        aggregated = True
+        if func == "AVG":
+            n = len(shard_columns)
+            plan.append(("AVG", [n, n + 1], alias or text.strip()))
+            shard_columns += [f"SUM({arg}) AS avg_sum_{n}", f"COUNT({arg}) AS avg_count_{n}"]
+        else:
+            plan.append((func, [len(shard_columns)], text))
+            shard_columns.append(column)
+    return (plan if aggregated else None), shard_columns
+
+
+@total_ordering
+class _SortKey:
+    """Row wrapper ordering rows by several columns with mixed directions."""
+
+    __slots__ = ("values", "descending", "nulls_first")
+
+    def __init__(self, values, descending, nulls_first):
+        self.values = values
+        self.descending = descending
+        self.nulls_first = nulls_first
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __lt__(self, other):
+        for a, b, desc, nulls_first in zip(self.values, other.values, self.descending, self.nulls_first):
+            if a == b:
+                continue
+            # NULL placement does not flip with the direction
+            if a is None or b is None:
+                return (a is None) == nulls_first
+            return b < a if desc else a < b
+        return False
+
+
+class ShardedEngine:
+    """Routes statements across several databases by a shard key.
+
+    ``shard_func`` maps a shard key value to one of ``shards`` (a list
+    index or a dict key). Inserts are split per shard and sent in batches;
+    SELECTs without a shard key fan out to every shard in parallel and the
+    partial results are merged, including ORDER BY/LIMIT and simple
+    COUNT/SUM/MIN/MAX/AVG recombination; AVG is fetched from every shard
+    as SUM and COUNT. Other aggregate expressions raise ValueError.
+    """
+
+    def __init__(self, shards, shard_func, shard_key, max_workers=None):
+        if not isinstance(shards, dict):
+            shards = dict(enumerate(shards))
+        self.shards = {
+            name: shard if hasattr(shard, 'connect') else Engine(shard)
+            for name, shard in shards.items()
+        }
+        self.shard_func = shard_func
+        self.shard_key = shard_key
+        self.max_workers = max_workers or len(self.shards)
+        self._key_pattern = re.compile(
+            r"^\s*(?:\w+\.)?" + re.escape(shard_key) + r"\s*=\s*(?:'([^']*)'|(-?\d+))\s*$"
+        )
+
+    def shard_for(self, key):
+        """Return the name of the shard that owns ``key``."""
+        shard = self.shard_func(key)
+        if shard not in self.shards:
+            raise KeyError(f"Shard function returned unknown shard '{shard}'")
+        return shard
+
+    def session(self, key):
+        """Open a Session on the shard that owns ``key``."""
+        return Session(self.shards[self.shard_for(key)])
+
+    def _map(self, func, items):
+        """Run ``func`` over ``items`` on a thread pool, preserving order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def _key_from_select(self, query):
+        """Find a ``shard_key = literal`` condition in a Select."""
+        for condition in getattr(query, 'where_clauses', []):
+            if isinstance(condition, BinaryExpression):
+                column, value = condition.left, condition.right
+                if (condition.operator == "=" and getattr(column, 'name', None) == self.shard_key
+                        and value is not None and not hasattr(value, 'sql_name')):
+                    return value
+                continue
+            match = self._key_pattern.match(str(condition))
+            if match:
+                text, number = match.groups()
+                return text if text is not None else int(number)
+        return None
+
+    def execute(self, statement, params=None, key=None):
+        """Execute a statement on its shard, or on all shards and merge.
+
+        The shard is taken from ``key``, from the values of an ``Insert``,
+        or from a ``shard_key = literal`` WHERE condition of a ``Select``.
+        Without one, a ``Select`` is fanned out and merged, and any other
+        statement is run on every shard.
+        """
+        if key is None:
+            values = getattr(statement, '_values', None)
+            if values is not None:
+                key = values.get(self.shard_key)
+            else:
+                key = self._key_from_select(statement)
+
+        if key is not None:
+            with self.session(key) as session:
+                sql, sql_params = _compile(statement, params)
+                cursor = session.execute(sql, sql_params)
+                result = Result.from_cursor(cursor)
+                session.commit()
+                return result
+
+        if hasattr(statement, 'from_table'):
+            return self.select(statement)
+        return self.fan_out(statement, params)
+
+    def fan_out(self, statement, params=None):
+        """Run a statement on every shard in parallel; one Result per shard."""
+        sql, sql_params = _compile(statement, params)
+
+        def run(engine):
+            with Session(engine) as session:
+                cursor = session.execute(sql, sql_params)
+                result = Result.from_cursor(cursor)
+                session.commit()
+                return result
+
+        return dict(zip(self.shards, self._map(run, self.shards.values())))
+
+    def select(self, query):
+        """Fan a Select out to all shards and merge the partial results."""
+        plan, shard_columns = _aggregate_plan(query.columns)
+        is_aggregate = plan is not None
+        if is_aggregate and query.having_clauses:
+            raise ValueError("HAVING cannot be merged across shards")
+
+        shard_query = copy.copy(query)
+        shard_query.limit_count = None
+        shard_query.offset_count = None
+        if is_aggregate:
+            # AVG is fetched as SUM and COUNT; merged rows are ordered here
+            shard_query.columns = shard_columns
+            shard_query.order_by_columns = []
+        if not is_aggregate and query.limit_count is not None:
+            # Every shard must return enough rows to cover the global window
+            shard_query.limit_count = query.limit_count + (query.offset_count or 0)
+
+        results = list(self.fan_out(shard_query).values())
+        description = next((r.description for r in results if r.description), None)
+
+        if is_aggregate:
+            rows, description = self._combine_aggregates(plan, [r.rows for r in results], description)
+            rows = self._order(rows, query.order_by_columns, description)
+        elif query.order_by_columns:
+            keys, desc, nulls = self._sort_spec(query.order_by_columns, description, self._dialect())
+            streams = [
+                [(_SortKey([row[i] for i in keys], desc, nulls), n, row) for n, row in enumerate(r.rows)]
+                for r in results
+            ]
+            rows = [row for _, _, row in heapq.merge(*streams)]
+        else:
+            rows = [row for r in results for row in r.rows]
+
+        start = query.offset_count or 0
+        end = start + query.limit_count if query.limit_count is not None else None
+        rows = rows[start:end]
+        return Result(rows, description, len(rows))
+
+    def _dialect(self):
+        """Dialect of the shards, which decides where unqualified NULLs sort."""
+        for engine in self.shards.values():
+            dialect = getattr(engine, 'dialect', None)
+            if isinstance(dialect, str):
+                return dialect
+        return "generic"
+
+    @staticmethod
+    def _sort_spec(order_by_columns, description, dialect="generic"):
+        """
+        Resolve ORDER BY terms to result column positions, directions and
+        NULL placement; NULLS FIRST/LAST wins over the dialect's default.
+        """
+        names = [col[0].lower() for col in description or []]
+        keys, desc, nulls = [], [], []
+        for term in order_by_columns:
+            match = _ORDER_TERM.match(str(term))
+            if match is None:
+                raise ValueError(
+                    f"ORDER BY {str(term).strip()} cannot be merged across shards; "
+                    "select it under an alias and order by the alias"
+                )
+            column, direction, placement = match.groups()
+            name = column.split('.')[-1].lower()
+            if name not in names:
+                raise ValueError(f"ORDER BY column '{column}' must be selected to merge shards")
+            descending = (direction or "").upper() == "DESC"
+            if placement:
+                nulls_first = placement.upper() == "FIRST"
+            else:
+                nulls_first = descending if dialect in _NULLS_HIGH else not descending
+            keys.append(names.index(name))
+            desc.append(descending)
+            nulls.append(nulls_first)
+        return keys, desc, nulls
+
+    def _order(self, rows, order_by_columns, description):
+        if not order_by_columns:
+            return rows
+        keys, desc, nulls = self._sort_spec(order_by_columns, description, self._dialect())
+        return sorted(rows, key=lambda row: _SortKey([row[i] for i in keys], desc, nulls))
+
+    @staticmethod
+    def _combine_aggregates(plan, shard_rows, description):
+        """Recombine per-shard aggregates, grouped by the non-aggregate columns."""
+        functions = {}
+        for kind, positions, _ in plan:
+            if kind == "AVG":
+                functions.update({position: _COMBINE["SUM"] for position in positions})
+            elif kind != "KEY":
+                functions[positions[0]] = _COMBINE[kind]
+        group_positions = [positions[0] for kind, positions, _ in plan if kind == "KEY"]
+
+        groups = {}
+        for rows in shard_rows:
+            for row in rows:
+                group = tuple(row[i] for i in group_positions)
+                merged = groups.get(group)
+                if merged is None:
+                    groups[group] = list(row)
+                    continue
+                for i, func in functions.items():
+                    if row[i] is None:
+                        continue
+                    merged[i] = row[i] if merged[i] is None else func(merged[i], row[i])
+
+        def project(row):
+            values = []
+            for kind, positions, _ in plan:
+                if kind == "AVG":
+                    total, count = row[positions[0]], row[positions[1]]
+                    values.append(total / count if count else None)
+                else:
+                    values.append(row[positions[0]])
+            return tuple(values)
+
+        if description:
+            description = [
+                (name,) + (None,) * 5 + (True,) if kind == "AVG" else description[positions[0]]
+                for kind, positions, name in plan
+            ]
+        return [project(row) for row in groups.values()], description
+
+    def _split(self, rows):
+        """Group dict rows by shard and column set."""
+        batches = {}
+        for row in rows:
+            if self.shard_key not in row:
+                raise ValueError(f"Row is missing shard key '{self.shard_key}'")
+            shard = self.shard_for(row[self.shard_key])
+            columns = tuple(row)
+            batches.setdefault((shard, columns), []).append(tuple(row[c] for c in columns))
+        return batches
+
+    def insert(self, table, rows, batch_size=1000):
+        """Insert dict rows (or Insert builders) on their shards in batches.
+
+        Returns the number of rows written to each shard.
+        """
+        table_name = getattr(table, '__tablename__', table)
+        rows = [getattr(row, '_values', row) for row in rows]
+        batches = self._split(rows)
+
+        by_shard = {}
+        for (shard, columns), values in batches.items():
+            by_shard.setdefault(shard, []).append((columns, values))
+
+        def run(item):
+            shard, groups = item
+            count = 0
+            with Session(self.shards[shard]) as session:
+                with session.begin():
+                    for columns, values in groups:
+                        sql = itp.insert_many_template(table_name, list(columns))
+                        for start in range(0, len(values), batch_size):
+                            session.executemany(sql, values[start:start + batch_size])
+                        count += len(values)
+            return shard, count
+
+        return dict(self._map(run, by_shard.items()))
+
+    def insert_dataframe(self, table_name, dataframe, if_exists="append", chunk_size=None):
+        """Split a DataFrame by shard and load each part through SQLTable.
+
+        Returns the number of rows written to each shard.
+        """
+        from .sqltable import SQLTable
+
+        shard_of = dataframe[self.shard_key].map(self.shard_for)
+
+        def run(item):
+            shard, frame = item
+            with self.shards[shard].begin() as conn:
+                table = SQLTable(conn.cursor(), table_name, frame, if_exists=if_exists)
+                table.create()
+                table.insert(chunk_size=chunk_size)
+            return shard, len(frame)
+
+        parts = [(shard, frame) for shard, frame in dataframe.groupby(shard_of, sort=False)]
+        return dict(self._map(run, parts))
@@ -0,0 +1,393 @@
+"""
+Result sets larger than memory.
+
+Rows are kept in memory up to a byte budget. Past the budget they are
+written to one local file per column: fixed-width NumPy values for
+integer, float, boolean and datetime columns and pickled segments for
+everything else. The files are memory-mapped for reading and deleted when
+the result is closed or garbage collected.
+"""
+
+import datetime
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from bisect import bisect_right
+from .adaptive import fetch_batches, _estimate_row_bytes
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Fixed-width layouts by Python type: (dtype, fill value for NULL, accepted types)
+_LAYOUTS = {
+    bool: ('bool', False, (bool,)),
+    int: ('int64', 0, (int,)),
+    float: ('float64', float('nan'), (float, int)),
+    datetime.datetime: ('datetime64[us]', None, (datetime.datetime,)),
+    datetime.date: ('datetime64[D]', None, (datetime.date,)),
+}
+
+
+def _layout(value):
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return None
+    return _LAYOUTS.get(type(value))
+
+
+class _ColumnFile:
+    """One column of a spilled result, appended one segment at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.layout = None
+        self.count = 0
+        # Leading NULLs seen before the column's type is known
+        self._pending = 0
+        # Largest append so far: the segment size used when demoting
+        self._batch = 1
+        self._data = None
+        self._mask = None
+        self._objects = None
+        self._segments = []
+        self._starts = []
+        self._cache = (None, None)
+        self._maps = (None, None, None)
+
+    def _open_typed(self, layout):
+        self.layout = layout
+        self._data = open(self.path + ".bin", "wb")
+        self._mask = open(self.path + ".mask", "wb")
+        if self._pending:
+            self._write_typed([None] * self._pending)
+
+    def _open_objects(self):
+        self.layout = 'object'
+        self._objects = open(self.path + ".pickle", "wb")
+        if self._pending:
+            self._write_objects([None] * self._pending)
+
+    def append(self, values):
+        self._batch = max(self._batch, len(values))
+        if self.layout is None:
+            first = next((v for v in values if v is not None), None)
+            if first is None:
+                self._pending += len(values)
+                self.count += len(values)
+                return
+            layout = _layout(first)
+            self._open_typed(layout) if layout else self._open_objects()
+        if self.layout != 'object':
+            accepted = self.layout[2]
+            if all(v is None or (type(v) in accepted and _layout(v) is not None) for v in values):
+                try:
+                    self._write_typed(values)
+                    self.count += len(values)
+                    return
+                except OverflowError:
+                    pass
+            self._demote()
+        self._write_objects(values)
+        self.count += len(values)
+
+    def _write_typed(self, values):
+        import numpy as np
+        dtype, fill, _ = self.layout
+        data = np.array([fill if v is None else v for v in values], dtype=dtype)
+        mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        self._data.write(data.tobytes())
+        self._mask.write(mask.tobytes())
+
+    def _write_objects(self, values):
+        start = self._starts[-1] + self._segments[-1][2] if self._segments else 0
+        offset = self._objects.tell()
+        self._objects.write(pickle.dumps(list(values), protocol=pickle.HIGHEST_PROTOCOL))
+        self._segments.append((offset, self._objects.tell() - offset, len(values)))
+        self._starts.append(start)
+
+    def _demote(self):
+        """
+        Rewrite the values so far as objects, for a value that does not fit
+        the layout; one batch-sized segment at a time so the column never
+        has to fit in memory.
+        """
+        self.finish()
+        self._objects = open(self.path + ".pickle", "wb")
+        for start in range(0, self.count, self._batch):
+            self._write_objects(self.values(start, min(start + self._batch, self.count)))
+        self.layout = 'object'
+        self._maps = (None, None, None)
+        for handle in (self._data, self._mask):
+            handle.close()
+            os.remove(handle.name)
+        self._data = self._mask = None
+        self._pending = 0
+
+    def finish(self):
+        for handle in (self._data, self._mask, self._objects):
+            if handle is not None:
+                handle.flush()
+
+    def close(self):
+        for handle in (self._data, self._mask, self._objects):
+            if handle is not None:
+                handle.close()
+
+    def array(self):
+        """All values as a NumPy array; memory-mapped for fixed-width columns."""
+        import numpy as np
+        if self.layout is None:
+            return np.full(self.count, None, dtype=object)
+        if self.layout == 'object':
+            values = np.empty(self.count, dtype=object)
+            values[:] = self.values(0, self.count)
+            return values
+        return self._mapped()[0]
+
+    def mask(self):
+        """NULL flags of a fixed-width column, memory-mapped."""
+        return self._mapped()[1]
+
+    def _mapped(self):
+        import numpy as np
+        count, data, mask = self._maps
+        if count != self.count:
+            if self.count:
+                data = np.memmap(self.path + ".bin", dtype=self.layout[0], mode="r", shape=(self.count,))
+                mask = np.memmap(self.path + ".mask", dtype=bool, mode="r", shape=(self.count,))
+            else:
+                data, mask = np.empty(0, dtype=self.layout[0]), np.empty(0, dtype=bool)
+            self._maps = (self.count, data, mask)
+        return data, mask
+
+    def values(self, start, stop):
+        """Python values of rows ``start`` to ``stop``."""
+        if start >= stop:
+            return []
+        if self.layout is None:
+            return [None] * (stop - start)
+        if self.layout == 'object':
+            return self._object_values(start, stop)
+        values = self.array()[start:stop].tolist()
+        if self.layout[1] is not None:
+            for i in self.mask()[start:stop].nonzero()[0].tolist():
+                values[i] = None
+        return values
+
+    def _object_values(self, start, stop):
+        values = []
+        index = bisect_right(self._starts, start) - 1
+        while start < stop:
+            segment = self._segment(index)
+            first = self._starts[index]
+            chunk = segment[start - first:stop - first]
+            values.extend(chunk)
+            start += len(chunk)
+            index += 1
+        return values
+
+    def _segment(self, index):
+        # Sequential reads hit the same segment many times
+        if self._cache[0] == index:
+            return self._cache[1]
+        offset, length, _ = self._segments[index]
+        with open(self.path + ".pickle", "rb") as f:
+            f.seek(offset)
+            segment = pickle.loads(f.read(length))
+        self._cache = (index, segment)
+        return segment
+
+
+def _cleanup(files, directory):
+    for column in files:
+        column.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class SpilledResult:
+    """
+    A result set held in memory up to ``memory_limit`` bytes and in local
+    column files beyond it.
+
+    Supports ``len()``, iteration, indexing and slicing (which read only
+    the rows asked for), ``column(name)`` and ``to_pandas()``. Temporary
+    files are removed by ``close()``, on leaving a ``with`` block, or when
+    the object is garbage collected.
+    """
+
+    def __init__(self, columns, memory_limit=DEFAULT_MEMORY_LIMIT, directory=None, make_row=None):
+        self.columns = list(columns)
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self.make_row = make_row
+        self.path = None
+        self._rows = []
+        self._row_bytes = None
+        self._files = None
+        self._count = 0
+        self._finalizer = None
+
+    @property
+    def spilled(self):
+        """Whether the rows were written to disk."""
+        return self._files is not None
+
+    @property
+    def nbytes(self):
+        """Bytes held in spill files."""
+        if not self.spilled:
+            return 0
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
+
+    def append(self, rows):
+        """Add a batch of rows, spilling to disk once over the memory budget."""
+        rows = [tuple(row) for row in rows]
+        if not rows:
+            return
+        self._count += len(rows)
+        if self.spilled:
+            self._write(rows)
+            return
+        if self._row_bytes is None:
+            self._row_bytes = _estimate_row_bytes(rows)
+        self._rows.extend(rows)
+        if len(self._rows) * self._row_bytes > self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        self.path = tempfile.mkdtemp(prefix="dbrm-spill-", dir=self.directory)
+        self._files = [_ColumnFile(os.path.join(self.path, str(i))) for i in range(len(self.columns))]
+        self._finalizer = weakref.finalize(self, _cleanup, self._files, self.path)
+        rows, self._rows = self._rows, []
+        batch = max(int(self.memory_limit // self._row_bytes) // 4, 1000)
+        for start in range(0, len(rows), batch):
+            self._write(rows[start:start + batch])
+
+    def _write(self, rows):
+        for i, column in enumerate(self._files):
+            column.append([row[i] for row in rows])
+
+    def finish(self):
+        """Flush spill files so they can be read; called once all rows are added."""
+        for column in self._files or ():
+            column.finish()
+        return self
+
+    def _raw(self, start, stop):
+        if not self.spilled:
+            return self._rows[start:stop]
+        return list(zip(*(column.values(start, stop) for column in self._files)))
+
+    def _wrap(self, rows):
+        return [self.make_row(row) for row in rows] if self.make_row else rows
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._wrap(self._raw(start, stop))
+        if key < 0:
+            key += self._count
+        if not 0 <= key < self._count:
+            raise IndexError("result index out of range")
+        return self._wrap(self._raw(key, key + 1))[0]
+
+    def iterate(self, batch_size=10000):
+        """Yield rows, reading ``batch_size`` rows from disk at a time."""
+        for start in range(0, self._count, batch_size):
+            yield from self[start:start + batch_size]
+
+    def __iter__(self):
+        return self.iterate()
+
+    def column(self, name):
+        """
+        One column as a NumPy array.
+        Args:
+            name (str): Column name.
+        Returns:
+            numpy.ndarray: Memory-mapped for spilled integer, float, boolean
+                           and datetime columns, with NULLs as 0/False/NaN/NaT
+                           (see ``to_pandas`` for NULL-aware columns).
+        """
+        import numpy as np
+        index = self.columns.index(name)
+        if self.spilled:
+            return self._files[index].array()
+        values = np.empty(self._count, dtype=object)
+        values[:] = [row[index] for row in self._rows]
+        return values
+
+    def to_pandas(self, columns=None):
+        """
+        Load the result into a DataFrame, one column at a time.
+        Args:
+            columns (list, optional): Column names to load; all if omitted.
+        Returns:
+            pandas.DataFrame: Spilled fixed-width columns wrap the
+                              memory-mapped files; integer and boolean
+                              columns with NULLs use pandas' nullable types.
+        """
+        import pandas as pd
+        names = self.columns if columns is None else list(columns)
+        if not self.spilled:
+            indexes = [self.columns.index(name) for name in names]
+            return pd.DataFrame.from_records([[row[i] for i in indexes] for row in self._rows], columns=names)
+
+        data = {}
+        for name in names:
+            column = self._files[self.columns.index(name)]
+            values = column.array()
+            if column.layout is not None and column.layout != 'object' and column.layout[1] is not None:
+                mask = column.mask()
+                if mask.any():
+                    if column.layout[0] == 'int64':
+                        values = pd.arrays.IntegerArray(values, mask)
+                    elif column.layout[0] == 'bool':
+                        values = pd.arrays.BooleanArray(values, mask)
+            data[name] = values
+        return pd.DataFrame(data, columns=names, copy=False)
+
+    def close(self):
+        """Remove the spill files and drop buffered rows."""
+        self._rows = []
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        where = f"spilled to {self.path}" if self.spilled else "in memory"
+        return f"SpilledResult(rows={self._count}, columns={len(self.columns)}, {where})"
+
+
+def spill_result(cursor, memory_limit=DEFAULT_MEMORY_LIMIT, batch_size=10000, directory=None, make_row=None):
+    """
+    Fetch a cursor's pending result into a SpilledResult.
+    Args:
+        cursor: A DBAPI cursor with a pending result set.
+        memory_limit (int): Bytes of rows kept in memory before spilling.
+        batch_size (int | str): Rows per ``fetchmany`` call, or "auto".
+        directory (str, optional): Where to create spill files; the system
+                                   temp directory if omitted.
+        make_row (callable, optional): Applied to each row on access.
+    Returns:
+        SpilledResult: The finished result.
+    """
+    columns = [col[0] for col in cursor.description]
+    result = SpilledResult(columns, memory_limit, directory, make_row)
+    try:
+        for batch in fetch_batches(cursor, batch_size):
+            result.append(batch)
+    except BaseException:
+        result.close()
+        raise
+    return result.finish()
@@ -1,5 +1,6 @@
 from dbrm._template import *
 from dbrm.utils import check_size, process_value
+from dbrm.expression import compile_clauses
 from typing import Literal, Union, List, Tuple, Optional, Any
 
 
@@ -45,29 +46,39 @@ def drop_table(
 
 
 def where(
-    condition: Union[str, Tuple, List]
-) -> str:
+    condition: Union[str, Tuple, List, Any],
+    bind: bool = False
+) -> Union[str, Tuple[str, List]]:
     """
     Generate SQL code for a WHERE clause.
 
     Args:
-        condition (Union[str, Tuple, List]): The condition for the WHERE clause.
+        condition (Union[str, Tuple, List, Any]): The condition for the WHERE clause,
+            as SQL text or expressions such as ``User.id == 5``.
+        bind (bool): Return the bound parameters along with the SQL.
 
     Returns:
-        str: The SQL code for the WHERE clause.
+        Union[str, Tuple[str, List]]: The SQL code for the WHERE clause, or
+            (sql, params) if bind is True.
     """
-    if condition is None or condition == '':
-        return ''
-    condition = ' AND '.join(condition) if isinstance(condition, (tuple, list)) else condition
+    if condition is None or (isinstance(condition, str) and condition == ''):
+        return ('', []) if bind else ''
+    clauses = condition if isinstance(condition, (tuple, list)) else [condition]
+    condition, params = compile_clauses(clauses)
     sql_str = WHERE.format(condition)
+    if bind:
+        return sql_str, params
+    if params:
+        raise ValueError("condition has bound parameters; use bind=True")
     return sql_str
 
 
 def select(
     column_name: Union[str, Tuple, List], 
     table_name: Union[str, Tuple, List], 
-    condition: Optional[Union[str, Tuple, List]] = None
-) -> str:
+    condition: Optional[Union[str, Tuple, List]] = None,
+    bind: bool = False
+) -> Union[str, Tuple[str, List]]:
     """
     Generate SQL code to select data from a table.
 
@@ -75,22 +86,24 @@ def select(
         column_name (Union[str, Tuple, List]): The column to select.
         table_name (Union[str, Tuple, List]): The table to select from.
         condition (Optional[Union[str, Tuple, List]]): The condition for the selection.
+        bind (bool): Return (sql, params) with condition values bound to placeholders.
 
     Returns:
-        str: The SQL code to select data from the table.
+        Union[str, Tuple[str, List]]: The SQL code to select data from the table.
     """
-    columns = ', '.join(column_name) if isinstance(column_name, (tuple, list)) else column_name
+    columns = ', '.join(map(str, column_name)) if isinstance(column_name, (tuple, list)) else str(column_name)
     tables = ', '.join(table_name) if isinstance(table_name, (tuple, list)) else table_name
-    condition = where(condition)
-    sql_str = SELECT.format(columns, tables, condition)
-    return sql_str.strip()
+    condition, params = where(condition, bind=True) if bind else (where(condition), [])
+    sql_str = SELECT.format(columns, tables, condition).strip()
+    return (sql_str, params) if bind else sql_str
 
 
 def insert(
     table_name: str, 
     column_name: Union[str, Tuple, List], 
-    value
-) -> str:
+    value,
+    bind: bool = False
+) -> Union[str, Tuple[str, List]]:
     """
     Generate SQL code to insert data into a table.
 
@@ -98,13 +111,18 @@ def insert(
         table_name (str): The table to insert data into.
         column_name (Union[str, Tuple, List]): The column to insert data into.
         value: The value to insert.
+        bind (bool): Use ``?`` placeholders and return (sql, params), so the
+            SQL text is the same for every value.
 
     Returns:
-        str: The SQL code to insert data into the table.
+        Union[str, Tuple[str, List]]: The SQL code to insert data into the table.
     """
     if not check_size(column_name, value):
         raise ValueError("column_names and values must have the same length")
     columns = ', '.join(column_name) if isinstance(column_name, (tuple, list)) else column_name
+    if bind:
+        params = list(value) if isinstance(value, (tuple, list)) else [value]
+        return insert_many_template(table_name, column_name), params
     value = process_value(value)
     value = ', '.join(value) if isinstance(value, list) else value
     sql_str = INSERT.format(table_name, columns, value)
@@ -115,8 +133,9 @@ def update(
     table_name: str, 
     column_name: Union[str, Tuple, List], 
     value,
-    condition: Optional[Union[str, Tuple, List]] = None
-) -> str:
+    condition: Optional[Union[str, Tuple, List]] = None,
+    bind: bool = False
+) -> Union[str, Tuple[str, List]]:
     """
     Generate SQL code to update data in a table.
 
@@ -125,12 +144,21 @@ def update(
         column_name (Union[str, Tuple, List]): The column to update.
         value: The value to update.
         condition (Optional[Union[str, Tuple, List]]): The condition for the update.
+        bind (bool): Use ``?`` placeholders and return (sql, params), so the
+            SQL text is the same for every value.
 
     Returns:
-        str: The SQL code to update data in the table.
+        Union[str, Tuple[str, List]]: The SQL code to update data in the table.
     """
     if not check_size(column_name, value):
         raise ValueError("column_names and values must have the same length")
+    if bind:
+        columns = column_name if isinstance(column_name, (tuple, list)) else [column_name]
+        params = list(value) if isinstance(value, (tuple, list)) else [value]
+        set_clause = ', '.join(f"{col} = ?" for col in columns)
+        condition, condition_params = where(condition, bind=True)
+        sql_str = UPDATE.format(table_name, set_clause, condition).strip()
+        return sql_str, params + condition_params
     value = process_value(value)
     set_clause = ', '.join(f"{col} = {val}" for col, val in zip(column_name, value)) if isinstance(column_name, (tuple, list)) else f"{column_name} = {value}"
     condition = where(condition)
@@ -140,21 +168,23 @@ def update(
 
 def delete(
     table_name: str, 
-    condition: Optional[Union[str, Tuple, List]] = None
-) -> str:
+    condition: Optional[Union[str, Tuple, List]] = None,
+    bind: bool = False
+) -> Union[str, Tuple[str, List]]:
     """
     Generate SQL code to delete data from a table.
 
     Args:
         table_name (str): The table to delete data from.
         condition (Optional[Union[str, Tuple, List]]): The condition for the deletion.
+        bind (bool): Return (sql, params) with condition values bound to placeholders.
 
     Returns:
-        str: The SQL code to delete data from the table.
+        Union[str, Tuple[str, List]]: The SQL code to delete data from the table.
     """
-    condition = where(condition)
-    sql_str = DELETE.format(table_name, condition)
-    return sql_str.strip()
+    condition, params = where(condition, bind=True) if bind else (where(condition), [])
+    sql_str = DELETE.format(table_name, condition).strip()
+    return (sql_str, params) if bind else sql_str
 
 
 def like(
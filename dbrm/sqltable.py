@@ -4,6 +4,37 @@ from typing import Literal
 from itertools import islice
 import dbrm.sqlinterpreter as itp
 from dbrm.utils import DTYPE_MAPPING
+from dbrm.indexes import deferred_indexes
+from dbrm.adaptive import ChunkSizeController
+from dbrm.binding import input_sizes, bound_input_sizes, frame_rows
+from dbrm.profiling import LoadReport, frame_bytes
+from dbrm.compression import check_codec, encode
+from dbrm.dialect import of as dialect_of
+
+# Upper bound on the estimated size of one insert batch in auto mode
+AUTO_CHUNK_MEMORY = 64 * 1024 * 1024
+
+
+def _row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    """Vectorized 64-bit hash of every row; object columns are compared as text."""
+    normalized = {}
+    for col in frame.columns:
+        series = frame[col]
+        if series.dtype == object:
+            series = series.astype(str).mask(series.isna(), "\x00")
+        normalized[col] = series
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False)
+    return hashes.to_numpy().view(np.int64)
+
+
+def _compressed(series: pd.Series, codec: str) -> list:
+    """Serialize (dicts and lists as JSON) and compress a column's values."""
+    return [
+        None if value is None or (isinstance(value, float) and np.isnan(value))
+        else encode(value, 'dict', codec)
+        for value in series.tolist()
+    ]
+
 
 class SQLTable:
     def __init__(
@@ -11,13 +42,46 @@ class SQLTable:
         cursor,
         table_name: str,
         dataframe: pd.DataFrame | None = None,
-        if_exists: Literal["append", "replace", "fail"] = "fail",
+        if_exists: Literal["append", "replace", "fail", "sync"] = "fail",
+        bulk_load: bool = False,
+        sort_by: list[str] | None = None,
+        key_columns: list[str] | None = None,
+        hash_column: str | None = None,
+        trace_memory: bool = False,
+        profile: str | bool | None = None,
+        compress: dict[str, str] | None = None,
     ):
         self.cursor = cursor
         self.name = table_name
-        self.data = dataframe.replace([pd.NA, pd.NaT, np.nan], None)
-        self.dtypes = self._get_dtypes(dataframe)
+        # Stages run here are timed; tracing and profiling cover insert()
+        self.report = LoadReport(table_name, trace_memory=trace_memory, profile=profile)
+        if sort_by:
+            with self.report.stage("sort", rows=len(dataframe)):
+                dataframe = dataframe.sort_values(sort_by, kind="stable")
+        if if_exists == "sync" and not key_columns:
+            raise ValueError("if_exists='sync' requires key_columns.")
+        self.compress = dict(compress or {})
+        if self.compress:
+            for col, codec in self.compress.items():
+                check_codec(codec)
+            with self.report.stage("compress", rows=len(dataframe)):
+                dataframe = dataframe.assign(**{
+                    col: _compressed(dataframe[col], codec) for col, codec in self.compress.items()
+                })
+        if hash_column:
+            # Stored hashes let sync fetch only keys and hashes from the target
+            with self.report.stage("hash", rows=len(dataframe)):
+                dataframe = dataframe.assign(**{hash_column: _row_hashes(dataframe)})
+        self.key_columns = list(key_columns or [])
+        self.hash_column = hash_column
+        # Missing values become None when rows are converted for binding
+        self.data = dataframe
+        with self.report.stage("infer_types"):
+            self.dtypes = self._get_dtypes(dataframe)
+        self._input_sizes = None
         self.if_exists = if_exists
+        self.bulk_load = bulk_load
+        self.controller = None
 
     def exists(self) -> bool:
         try:
@@ -33,11 +97,18 @@ class SQLTable:
             dtype = df[col].dtype
             dtype_name = dtype.name if hasattr(dtype, 'name') else str(dtype)
             
-            if dtype_name == "object" and df[col].notna().any():
+            is_text = pd.api.types.is_string_dtype(dtype) or dtype == object
+            if is_text and df[col].notna().any():
                 length = df[col].str.len().max()
                 if length > 255:
                     dtype_name = "text"
             dtype_name = DTYPE_MAPPING[dtype_name]
+            if col in self.compress:
+                # Compressed values are framed bytes
+                dtype_name = DTYPE_MAPPING['bytes']
+            elif col == self.hash_column:
+                # Row hashes use the full 64 bits; INTEGER is 32-bit on most servers
+                dtype_name = "BIGINT"
             dtypes.append(dtype_name)
         return dtypes
     
@@ -47,6 +118,10 @@ class SQLTable:
         self.cursor.commit()
 
     def create(self) -> None:
+        with self.report.stage("create"):
+            self._create()
+
+    def _create(self) -> None:
         if self.exists():
             if self.if_exists == "fail":
                 raise ValueError(f"Table '{self.name}' already exists.")
@@ -55,36 +130,190 @@ class SQLTable:
                 self.cursor.execute(drop_sql)
                 self.cursor.commit()
                 self._execute_create()
-            elif self.if_exists == "append":
+            elif self.if_exists in ("append", "sync"):
                 pass
             else:
                 raise ValueError(f"'{self.if_exists}' is not valid for if_exists")
         else:
             self._execute_create()
 
+    def input_sizes(self, column_names: list[str] | None = None) -> list:
+        """ODBC parameter types and sizes for the columns, from the inferred schema."""
+        if self._input_sizes is None:
+            sizes = input_sizes(self.dtypes, dialect_of(self.cursor))
+            self._input_sizes = dict(zip(self.data.columns, sizes))
+        return [self._input_sizes[col] for col in (column_names or self.data.columns)]
+
+    def _executemany(self, sql: str, column_names: list[str], rows) -> None:
+        with bound_input_sizes(self.cursor, self.input_sizes(column_names)):
+            self.cursor.executemany(sql, rows)
+
     def _execute_insert(self, column_names: list[str], data_iter) -> None:
         sql_template = itp.insert_many_template(self.name, column_names)
-        self.cursor.executemany(sql_template, data_iter)
-        self.cursor.commit()
+        with self.report.stage("insert", rows=len(data_iter)):
+            self._executemany(sql_template, column_names, data_iter)
+        with self.report.stage("commit"):
+            self.cursor.commit()
 
-    def insert(self, chunk_size: int | None = None) -> None:
+    def insert(self, chunk_size: int | Literal["auto"] | None = None) -> LoadReport | dict:
         """
         Insert data from the dataframe into the table.
         
+        With ``if_exists="sync"`` only the differences are written; see
+        ``sync``, whose counts are returned. With ``bulk_load`` set, the table's non-unique secondary indexes
+        are dropped (or disabled on SQL Server) for the duration of the
+        load and rebuilt afterwards.
+        
         Args:
-            chunk_size (int, optional): Number of rows to insert at once. 
+            chunk_size (int | str, optional): Number of rows to insert at once. 
                                         If None, all rows are inserted in one go.
+                                        With "auto", the size is adjusted after
+                                        every batch from its rows/s and latency;
+                                        the controller is kept in ``self.controller``.
+        
+        Returns:
+            LoadReport: Time, rows and bytes per stage, also kept in
+                        ``self.report``; in sync mode the ``sync`` counts.
         """
+        if self.if_exists == "sync":
+            return self.sync()
         if self.data is None or self.data.empty:
             raise ValueError("No data to insert.")
-        
+        with self.report.run():
+            self._insert(chunk_size)
+        return self.report
+
+    def _insert(self, chunk_size: int | Literal["auto"] | None) -> None:
         nrows = len(self.data)
-        if chunk_size is None or chunk_size < 0:
+        self.controller = None
+        if chunk_size == "auto":
+            self.controller = ChunkSizeController(
+                initial=min(1000, nrows),
+                min_size=min(100, nrows),
+                max_size=nrows,
+                columns=len(self.data.columns),
+                memory_limit=AUTO_CHUNK_MEMORY,
+                row_bytes=self._row_bytes(),
+            )
+        elif isinstance(chunk_size, str):
+            raise ValueError(f"'{chunk_size}' is not a valid chunk size")
+        elif chunk_size is None or chunk_size < 0:
             chunk_size = nrows
         elif chunk_size == 0:
             raise ValueError("Chunk size cannot be zero.")
+        if self.bulk_load:
+            with deferred_indexes(self.cursor, self.name):
+                self._insert_chunks(chunk_size)
+        else:
+            self._insert_chunks(chunk_size)
+
+    def _row_bytes(self, sample: int = 1000) -> float:
+        head = self.data.head(sample)
+        return max(head.memory_usage(deep=True, index=False).sum() / len(head), 1)
+
+    def _insert_chunks(self, chunk_size: int | None) -> None:
+        nrows = len(self.data)
         column_names = self.data.columns.tolist()
-        data_iter = self.data.itertuples(index=False, name=None)
-        for _ in range(0, nrows, chunk_size):
-            chunk = list(islice(data_iter, chunk_size))
-            self._execute_insert(column_names, chunk)
\ No newline at end of file
+        with self.report.stage("convert", rows=nrows, bytes=frame_bytes(self.data)):
+            data_iter = frame_rows(self.data)
+        if self.controller is not None:
+            for chunk in self.controller.batches(data_iter):
+                with self.controller.timed(len(chunk)):
+                    self._execute_insert(column_names, chunk)
+        else:
+            for _ in range(0, nrows, chunk_size):
+                with self.report.stage("convert"):
+                    chunk = list(islice(data_iter, chunk_size))
+                self._execute_insert(column_names, chunk)
+        self.report.rows += nrows
+
+    def _target_hashes(self) -> pd.DataFrame:
+        """Fetch the target's keys with a hash of each stored row."""
+        keys = self.key_columns
+        columns = keys + [self.hash_column] if self.hash_column else self.data.columns.tolist()
+        rows = self.cursor.execute(itp.select(columns, self.name)).fetchall()
+        target = pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+        for col in columns:
+            # Compare in the incoming frame's types, e.g. 0/1 from the server as bool
+            try:
+                target[col] = target[col].astype(self.data[col].dtype)
+            except (TypeError, ValueError):
+                pass
+        if self.hash_column:
+            # Compare as Python ints, whatever type the driver returned; NULL never matches
+            hashes = np.array([None if pd.isna(value) else int(value)
+                               for value in target[self.hash_column]], dtype=object)
+        else:
+            hashes = _row_hashes(target).astype(object)
+        return target[keys].assign(_hash=hashes)
+
+    def sync(self) -> dict:
+        """
+        Make the table match the dataframe, writing only the rows that differ.
+        
+        Rows are matched on ``key_columns`` and compared by a hash of the
+        whole row. The target's hashes are read from ``hash_column`` when
+        it is set (the column is added to the written rows), otherwise they
+        are computed from the target's rows. New keys are inserted, changed
+        rows updated and keys missing from the dataframe deleted, in one
+        transaction.
+        
+        Returns:
+            dict: Row counts for "inserted", "updated", "deleted" and "unchanged".
+        """
+        with self.report.run():
+            return self._sync()
+
+    def _sync(self) -> dict:
+        keys = self.key_columns
+        if not keys:
+            raise ValueError("sync requires key_columns.")
+        if self.data.duplicated(keys).any():
+            raise ValueError(f"Key columns {keys} are not unique in the dataframe.")
+        if not self.exists():
+            self._execute_create()
+        
+        report = self.report
+        with report.stage("hash", rows=len(self.data)):
+            hashes = self.data[self.hash_column].to_numpy() if self.hash_column else _row_hashes(self.data)
+            # Python ints survive the outer merge; int64 would turn into lossy float64
+            hashes = hashes.astype(object)
+        with report.stage("fetch_target") as timer:
+            target = self._target_hashes()
+            timer.rows = len(target)
+        with report.stage("diff"):
+            source = self.data[keys].reset_index(drop=True).assign(_hash=hashes, _pos=np.arange(len(self.data)))
+            merged = source.merge(target, on=keys, how="outer", suffixes=("", "_target"), indicator=True)
+            new = merged[merged["_merge"] == "left_only"]
+            gone = merged[merged["_merge"] == "right_only"]
+            both = merged[merged["_merge"] == "both"]
+            changed = both[both["_hash"] != both["_hash_target"]]
+        
+        columns = self.data.columns.tolist()
+        values = [col for col in columns if col not in keys]
+        condition = " AND ".join(f"{col} = ?" for col in keys)
+        if len(new):
+            with report.stage("convert"):
+                rows = list(frame_rows(self.data.iloc[new["_pos"].astype(int)]))
+            with report.stage("insert", rows=len(rows)):
+                self._executemany(itp.insert_many_template(self.name, columns), columns, rows)
+        if len(changed) and values:
+            with report.stage("convert"):
+                rows = list(frame_rows(self.data.iloc[changed["_pos"].astype(int)][values + keys]))
+            set_clause = ", ".join(f"{col} = ?" for col in values)
+            with report.stage("update", rows=len(rows)):
+                self._executemany(f"UPDATE {self.name} SET {set_clause} WHERE {condition}", values + keys, rows)
+        if len(gone):
+            with report.stage("delete", rows=len(gone)):
+                self._executemany(
+                    f"DELETE FROM {self.name} WHERE {condition}", keys, list(frame_rows(gone[keys]))
+                )
+        with report.stage("commit"):
+            self.cursor.commit()
+        report.rows += len(new) + len(changed) + len(gone)
+        return {
+            "inserted": len(new),
+            "updated": len(changed),
+            "deleted": len(gone),
+            "unchanged": len(both) - len(changed),
+        }
@@ -0,0 +1,255 @@
+"""
+Statement timeouts and request-scoped deadlines.
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+_deadline = contextvars.ContextVar("dbrm_deadline", default=None)
+
+
+class QueryTimeout(Exception):
+    """A statement ran past its timeout or the current deadline."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Limit the total time of the statements run in a block, e.g. one request.
+
+    Statements inherit the time left as their timeout, and a statement
+    started after the deadline fails at once. Nested deadlines can only
+    shorten the outer one.
+
+    Args:
+        seconds (float): Time allowed for the block.
+    Yields:
+        float: The deadline, as a ``time.monotonic()`` value.
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def effective_timeout(*timeouts):
+    """
+    Pick the timeout for a statement.
+    Args:
+        timeouts: Candidate timeouts in order of precedence (statement,
+                  session, engine); the first number wins.
+    Returns:
+        float | None: That timeout, shortened to the time left before the
+                      current deadline, or None if there is no limit.
+    """
+    timeout = next((t for t in timeouts if isinstance(t, (int, float)) and not isinstance(t, bool)), None)
+    left = remaining()
+    if left is not None:
+        timeout = left if timeout is None else min(timeout, left)
+    return timeout
+
+
+class _WatchdogThread:
+    """
+    One background thread that fires every armed watchdog at its deadline.
+
+    Watchdogs sit in a heap of (deadline, sequence, watchdog) entries.
+    Disarmed entries are skipped when they come up, and the heap is
+    rebuilt without them once they make up most of it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._counter = itertools.count()
+        self._disarmed = 0
+        self._thread = None
+
+    def arm(self, watchdog, expires):
+        with self._cond:
+            heapq.heappush(self._heap, (expires, next(self._counter), watchdog))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="dbrm-watchdog", daemon=True)
+                self._thread.start()
+            elif self._heap[0][2] is watchdog:
+                # New earliest deadline: wake the thread to shorten its wait
+                self._cond.notify()
+
+    def disarmed(self):
+        with self._cond:
+            self._disarmed += 1
+            if self._disarmed > 64 and self._disarmed * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if not entry[2]._done]
+                heapq.heapify(self._heap)
+                self._disarmed = 0
+
+    def _due(self):
+        """Pop the watchdogs whose deadline has passed, waiting for the next one."""
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2]._done:
+                    heapq.heappop(self._heap)
+                    self._disarmed = max(self._disarmed - 1, 0)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                due = []
+                while self._heap and self._heap[0][0] <= time.monotonic():
+                    due.append(heapq.heappop(self._heap)[2])
+                return due
+
+    def _run(self):
+        while True:
+            # cursor.cancel() can block, so it runs outside the heap lock
+            for watchdog in self._due():
+                try:
+                    watchdog._cancel()
+                except Exception:
+                    # A failed cancel must not stop the other watchdogs
+                    pass
+
+
+_watchdogs = _WatchdogThread()
+
+
+class Watchdog:
+    """
+    Cancels a cursor's statement once ``timeout`` seconds pass.
+
+    All watchdogs share one timer thread. The thread and ``disarm()``
+    share a lock, so once ``disarm()`` returns a late firing can no longer
+    cancel whatever the cursor runs next.
+    """
+
+    def __init__(self, cursor, timeout, metrics=None):
+        self.cursor = cursor
+        self.timeout = timeout
+        self.metrics = metrics
+        self.fired = threading.Event()
+        self._lock = threading.Lock()
+        self._done = False
+        self._reported = False
+        _watchdogs.arm(self, time.monotonic() + timeout)
+
+    def _cancel(self):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            self.fired.set()
+            self.cursor.cancel()
+
+    def disarm(self):
+        """Stop the watchdog; safe to call more than once."""
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+        _watchdogs.disarmed()
+
+    @contextmanager
+    def guard(self):
+        """Re-raise errors caused by the cancel as QueryTimeout."""
+        try:
+            yield self
+        except Exception as e:
+            if self.fired.is_set():
+                if self.metrics is not None and not self._reported:
+                    self.metrics.incr("statements_timed_out")
+                self._reported = True
+                raise QueryTimeout(f"Statement cancelled after {self.timeout:.3g}s") from e
+            raise
+
+
+class TimedCursor:
+    """Cursor proxy whose fetches stay under the statement's watchdog.
+
+    The watchdog is disarmed once the result is used up, or by the session
+    before the cursor runs its next statement.
+    """
+
+    _FETCHES = ("fetchone", "fetchmany", "fetchall", "fetchval", "nextset")
+
+    def __init__(self, cursor, watchdog):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_watchdog', watchdog)
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name not in self._FETCHES:
+            return attr
+
+        def fetch(*args, **kwargs):
+            with self._watchdog.guard():
+                result = attr(*args, **kwargs)
+            if name == "fetchall" or not result:
+                self._watchdog.disarm()
+            return result
+        return fetch
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+@contextmanager
+def statement_timeout(cursor, timeout, metrics=None, keep=False):
+    """
+    Cancel the cursor's statement if it runs longer than ``timeout`` seconds.
+
+    A watchdog calls ``cursor.cancel()`` (SQLCancel on pyodbc), which
+    makes the blocked execute raise; that error is re-raised as
+    QueryTimeout and counted as ``statements_timed_out`` in ``metrics``.
+
+    Args:
+        cursor: The cursor about to execute.
+        timeout (float | None): Seconds allowed; None for no limit.
+        metrics (Metrics, optional): Where to count timeouts.
+        keep (bool): Leave the watchdog running when the block succeeds, so
+                     that it also bounds the fetches; the caller must
+                     ``disarm()`` it before the cursor runs anything else.
+    Yields:
+        Watchdog | None: The running watchdog; None without a limit.
+    """
+    if timeout is None:
+        yield None
+        return
+    if timeout <= 0:
+        if metrics is not None:
+            metrics.incr("statements_timed_out")
+        raise QueryTimeout("Deadline exceeded before the statement started")
+
+    watchdog = Watchdog(cursor, timeout, metrics)
+    try:
+        with watchdog.guard():
+            yield watchdog
+    except BaseException:
+        watchdog.disarm()
+        raise
+    if not keep:
+        watchdog.disarm()
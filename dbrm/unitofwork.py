@@ -0,0 +1,223 @@
+import dbrm.sqlinterpreter as itp
+from .binding import column_input_sizes
+
+# INSERT statements that return a generated key, by dialect; MySQL reads
+# it with LAST_INSERT_ID() after a plain INSERT
+_RETURNING = {
+    'mssql': "INSERT INTO {table} ({columns}) OUTPUT INSERTED.{key} VALUES ({values})",
+    'postgresql': "INSERT INTO {table} ({columns}) VALUES ({values}) RETURNING {key}",
+    'sqlite': "INSERT INTO {table} ({columns}) VALUES ({values}) RETURNING {key}",
+    'mysql': "INSERT INTO {table} ({columns}) VALUES ({values})",
+}
+
+
+def _generated_key(cls, columns):
+    """Name of the single-column primary key left for the database to fill, or None."""
+    if len(cls._primary_key) == 1 and cls._primary_key[0] not in columns:
+        return cls._primary_key[0]
+    return None
+
+
+class UnitOfWork:
+    """Tracks row objects for a Session and writes their changes in batches.
+
+    Objects are kept in an identity map keyed by (table class, primary
+    key), so each row is represented by one object per session and
+    primary-key lookups can skip the database. On flush, pending inserts,
+    updates and deletes are grouped by table and column set and sent with
+    ``executemany``. Inserted rows whose primary key is generated by the
+    database are written one at a time so the key can be read back.
+    """
+
+    def __init__(self):
+        self.identity_map = {}
+        self._new = {}
+        self._deleted = {}
+        # Inserted rows whose generated key could not be read back
+        self._unkeyed = {}
+        # State of rows flushed in the open transaction, before their first flush
+        self._flushed = {}
+
+    def add(self, obj):
+        """Register an object; new objects are inserted on the next flush."""
+        if not obj._state.persistent:
+            self._new[id(obj)] = obj
+            return
+        key = obj._identity()
+        if key is not None:
+            self.identity_map.setdefault(key, obj)
+
+    def delete(self, obj):
+        """Mark an object for deletion on the next flush."""
+        if id(obj) in self._new:
+            del self._new[id(obj)]
+            return
+        if not obj._primary_key or id(obj) in self._unkeyed:
+            raise ValueError(f"Cannot delete from {obj.__tablename__} without a primary key")
+        self._deleted[id(obj)] = obj
+
+    def get(self, session, cls, key):
+        """Fetch a row by primary key, from the identity map when possible."""
+        key = key if isinstance(key, tuple) else (key,)
+        if len(key) != len(cls._primary_key):
+            raise ValueError(f"{cls.__name__} has a {len(cls._primary_key)}-column primary key")
+
+        obj = self.identity_map.get((cls, key))
+        if obj is not None:
+            return None if id(obj) in self._deleted else obj
+
+        names = list(cls._columns)
+        condition = [f"{name} = ?" for name in cls._primary_key]
+        sql = itp.select(names, cls.__tablename__, condition)
+        row = session.execute(sql, list(key)).fetchone()
+        if row is None:
+            return None
+        obj = cls._from_row(names, row)
+        self.identity_map[(cls, key)] = obj
+        return obj
+
+    @property
+    def dirty(self):
+        """Persistent objects with unflushed changes."""
+        return [
+            obj for obj in self.identity_map.values()
+            if obj._state.modified and id(obj) not in self._deleted and obj._state.changes(obj)
+        ]
+
+    def flush(self, session):
+        """Write pending changes; returns counts per operation."""
+        inserts, updates, deletes = {}, {}, {}
+
+        for obj in self._unkeyed.values():
+            if obj._state.changes(obj):
+                raise ValueError(
+                    f"Cannot update {obj.__tablename__}: its generated primary key was not read back"
+                )
+
+        for obj in self._new.values():
+            columns = tuple(name for name in obj._columns if name in obj.__dict__)
+            inserts.setdefault((type(obj), columns), []).append(obj)
+
+        for obj in self.dirty:
+            if not obj._primary_key:
+                raise ValueError(f"Cannot update {obj.__tablename__} without a primary key")
+            columns = tuple(obj._state.changes(obj))
+            updates.setdefault((type(obj), columns), []).append(obj)
+
+        for obj in self._deleted.values():
+            deletes.setdefault(type(obj), []).append(obj)
+
+        dialect = session.dialect
+
+        def sizes(cls, names):
+            return column_input_sizes([cls._columns[name] for name in names], dialect)
+
+        def stored(obj, names):
+            return tuple(obj._columns[name].to_db(obj.__dict__[name]) for name in names)
+
+        for (cls, columns), objs in inserts.items():
+            sql = itp.insert_many_template(cls.__tablename__, list(columns))
+            generated = _generated_key(cls, columns)
+            if generated is None or dialect not in _RETURNING:
+                session.executemany(
+                    sql, [stored(obj, columns) for obj in objs],
+                    input_sizes=sizes(cls, columns),
+                )
+                continue
+            names = ", ".join(columns)
+            values = ", ".join("?" for _ in columns)
+            sql = _RETURNING[dialect].format(
+                table=cls.__tablename__, columns=names, values=values, key=generated,
+            )
+            for obj in objs:
+                cursor = session.execute(sql, list(stored(obj, columns)))
+                if dialect == 'mysql':
+                    cursor = session.execute("SELECT LAST_INSERT_ID()")
+                obj.__dict__[generated] = cls._columns[generated].from_db(cursor.fetchone()[0])
+
+        for (cls, columns), objs in updates.items():
+            set_clause = ", ".join(f"{name} = ?" for name in columns)
+            condition = " AND ".join(f"{name} = ?" for name in cls._primary_key)
+            sql = f"UPDATE {cls.__tablename__} SET {set_clause} WHERE {condition}"
+            session.executemany(sql, [
+                stored(obj, columns)
+                + tuple(obj._state.committed[k] for k in cls._primary_key)
+                for obj in objs
+            ], input_sizes=sizes(cls, columns + tuple(cls._primary_key)))
+
+        for cls, objs in deletes.items():
+            condition = " AND ".join(f"{name} = ?" for name in cls._primary_key)
+            sql = f"DELETE FROM {cls.__tablename__} WHERE {condition}"
+            session.executemany(sql, [
+                tuple(obj._state.committed[k] for k in cls._primary_key) for obj in objs
+            ], input_sizes=sizes(cls, cls._primary_key))
+
+        counts = {
+            "inserted": sum(len(objs) for objs in inserts.values()),
+            "updated": sum(len(objs) for objs in updates.values()),
+            "deleted": sum(len(objs) for objs in deletes.values()),
+        }
+
+        for objs in list(inserts.values()) + list(updates.values()) + list(deletes.values()):
+            for obj in objs:
+                state = obj._state
+                self._flushed.setdefault(
+                    id(obj), (obj, state.persistent, dict(state.committed), set(state.modified))
+                )
+        for objs in list(inserts.values()) + list(updates.values()):
+            for obj in objs:
+                old_key = None
+                if obj._state.persistent:
+                    old_key = (type(obj), tuple(obj._state.committed[k] for k in obj._primary_key))
+                obj._state.mark_flushed(obj)
+                key = obj._identity()
+                if old_key is not None and old_key != key:
+                    self.identity_map.pop(old_key, None)
+                if key is not None:
+                    self.identity_map[key] = obj
+                elif obj._primary_key:
+                    # Tracked so that later changes raise instead of being lost
+                    self._unkeyed[id(obj)] = obj
+        for objs in deletes.values():
+            for obj in objs:
+                key = (type(obj), tuple(obj._state.committed[k] for k in obj._primary_key))
+                self.identity_map.pop(key, None)
+                obj._state.persistent = False
+
+        self._new.clear()
+        self._deleted.clear()
+        return counts
+
+    def commit(self):
+        """Keep the flushed state once the transaction is committed."""
+        self._flushed.clear()
+
+    def rollback(self):
+        """Undo the flushes of a rolled-back transaction.
+
+        Rows flushed in it get back the state they had before; rows it
+        inserted are no longer tracked, and rows it deleted are tracked
+        again. Changes made to the objects since are kept as unflushed
+        changes.
+        """
+        for obj, persistent, committed, modified in self._flushed.values():
+            if obj._state.persistent:
+                key = (type(obj), tuple(obj._state.committed.get(k) for k in obj._primary_key))
+                if self.identity_map.get(key) is obj:
+                    del self.identity_map[key]
+            self._unkeyed.pop(id(obj), None)
+            obj._state.persistent = persistent
+            obj._state.committed = committed
+            obj._state.modified = modified | set(obj._columns)
+            if persistent:
+                old_key = (type(obj), tuple(committed[k] for k in obj._primary_key))
+                self.identity_map[old_key] = obj
+        self._flushed.clear()
+
+    def clear(self):
+        """Forget all tracked objects."""
+        self.identity_map.clear()
+        self._new.clear()
+        self._deleted.clear()
+        self._unkeyed.clear()
+        self._flushed.clear()
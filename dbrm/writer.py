@@ -0,0 +1,398 @@
+import atexit
+import glob
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import deque
+import dbrm.sqlinterpreter as itp
+from .session import Session
+from .metrics import Metrics
+from .binding import column_input_sizes
+
+OVERFLOW_POLICIES = ("block", "drop", "spill")
+
+
+def _load_rows(f):
+    """Yield the rows pickled in a spill file, stopping at a truncated record."""
+    while True:
+        try:
+            yield pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            return
+
+
+class BufferedWriter:
+    """Collects rows from many threads and inserts them in batches.
+
+    ``write()`` only appends to an in-memory buffer. A background thread
+    flushes it once ``batch_size`` rows are waiting or ``flush_interval``
+    seconds have passed, and ``close()`` (also run at interpreter exit)
+    flushes the rest. Rows are sent with ``executemany``, or as multi-row
+    ``VALUES`` lists of at most ``max_params`` parameters with
+    ``method="values"``.
+
+    At most ``max_rows`` rows are buffered. Beyond that ``overflow``
+    decides: "block" waits for the next flush, "drop" discards the row
+    (``write`` returns False) and "spill" appends it to a local file that
+    is loaded again after later flushes.
+
+    A failed batch is split in halves to isolate the rows that fail on
+    their own; the rest are written. Failed rows count towards ``max_rows``
+    and are retried after ``retry_backoff`` seconds, doubling per
+    consecutive failure up to ``max_backoff``, and no flushes run in
+    between. Rows still failing after ``max_retries`` attempts are moved
+    to ``dead_letters`` as (row, exception) pairs.
+
+    Counts and flush latencies are kept in ``metrics``.
+    """
+
+    def __init__(self, engine, table, batch_size=1000, flush_interval=1.0, max_rows=100_000,
+                 overflow="block", spill_path=None, method="executemany", max_params=2000,
+                 max_retries=5, retry_backoff=0.5, max_backoff=30.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"'{overflow}' is not a valid overflow policy")
+        if method not in ("executemany", "values"):
+            raise ValueError(f"'{method}' is not a valid insert method")
+        self.engine = engine
+        self.table = table
+        self.table_name = getattr(table, '__tablename__', table)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.overflow = overflow
+        self.method = method
+        self.max_params = max_params
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.metrics = Metrics()
+        self.last_error = None
+        self.dead_letters = []
+
+        self.spill_path = spill_path
+        if overflow == "spill" and spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix="dbrm-spill-", suffix=".pkl")
+            os.close(fd)
+        self._spill_file = None
+        self._spilled = 0
+        # One drain at a time; each moves the spill file to its own name
+        self._drain_lock = threading.Lock()
+        if self.spill_path:
+            self._recover_spill()
+
+        self._buffer = deque()
+        # (row, attempts) pairs of rows whose insert failed
+        self._failed = deque()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._closed = False
+        self._last_flush = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="dbrm-buffered-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _as_dict(row, values):
+        if row is None:
+            return values
+        if hasattr(row, '_values'):
+            return dict(row._values)
+        if hasattr(row, '_columns'):
+            return {name: row.__dict__[name] for name in row._columns if name in row.__dict__}
+        return dict(row, **values)
+
+    @property
+    def pending(self):
+        """Rows waiting in memory, for a retry and in the spill file."""
+        with self._cond:
+            return len(self._buffer) + len(self._failed) + self._spilled
+
+    def _held(self):
+        return len(self._buffer) + len(self._failed)
+
+    def write(self, row=None, **values):
+        """
+        Queue a row for insertion.
+        Args:
+            row: A dict, an ``Insert`` builder or a Table row object;
+                 or pass the values as keyword arguments.
+        Returns:
+            bool: False if the row was dropped because the buffer was full.
+        """
+        row = self._as_dict(row, values)
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("BufferedWriter is closed")
+            if self._held() >= self.max_rows:
+                if self.overflow == "drop":
+                    self.metrics.incr("rows_dropped")
+                    return False
+                if self.overflow == "spill":
+                    self._spill([row])
+                    return True
+                self.metrics.incr("writes_blocked")
+            while self._held() >= self.max_rows:
+                self._cond.notify_all()
+                self._cond.wait()
+                if self._closing:
+                    raise RuntimeError("BufferedWriter is closed")
+            self._buffer.append(row)
+            self.metrics.gauge("buffered_rows", len(self._buffer))
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _spill(self, rows):
+        """Append rows to the spill file; caller holds the lock."""
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "ab")
+        for row in rows:
+            pickle.dump(row, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spill_file.flush()
+        self._spilled += len(rows)
+        self.metrics.incr("rows_spilled", len(rows))
+
+    def _drain_pattern(self):
+        return glob.escape(self.spill_path) + ".*.draining"
+
+    def _recover_spill(self):
+        """Count rows left in the spill file and reload drains a previous process did not finish."""
+        if os.path.exists(self.spill_path):
+            with open(self.spill_path, "rb") as f:
+                self._spilled = sum(1 for _ in _load_rows(f))
+        for leftover in sorted(glob.glob(self._drain_pattern())):
+            with open(leftover, "rb") as f:
+                rows = list(_load_rows(f))
+            if rows:
+                self._spill(rows)
+            os.remove(leftover)
+
+    def _take(self, force=False):
+        """
+        Remove and return the (row, attempts) pairs to write, with rows due
+        for a retry first; caller holds the lock.
+        """
+        entries = []
+        if force or time.monotonic() >= self._retry_at:
+            entries.extend(self._failed)
+            self._failed.clear()
+        entries.extend((row, 0) for row in self._buffer)
+        self._buffer.clear()
+        self.metrics.gauge("buffered_rows", 0)
+        self._last_flush = time.monotonic()
+        self._cond.notify_all()
+        return entries
+
+    def _wait_time(self):
+        """Seconds until the next flush is due; caller holds the lock."""
+        now = time.monotonic()
+        if now < self._retry_at:
+            # Backing off after a failure
+            return self._retry_at - now
+        if self._failed or len(self._buffer) >= self.batch_size:
+            return 0
+        return self._last_flush + self.flush_interval - now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closing:
+                    remaining = self._wait_time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                entries = self._take()
+                closing = self._closing
+            if entries:
+                self._write(entries)
+            self._drain_spill()
+            if closing:
+                return
+
+    def _statements(self, columns, rows):
+        """(sql, params_seq, many) batches for rows sharing one column set."""
+        if self.method == "executemany":
+            sql = itp.insert_many_template(self.table_name, list(columns))
+            for start in range(0, len(rows), self.batch_size):
+                yield sql, rows[start:start + self.batch_size], True
+            return
+        per_statement = max(1, min(self.batch_size, self.max_params // len(columns)))
+        placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            sql = (f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES "
+                   + ", ".join(placeholders for _ in chunk))
+            yield sql, [value for row in chunk for value in row], False
+
+    def _insert(self, rows):
+        """Insert rows in one transaction; returns the exception on failure."""
+        groups = {}
+        table_columns = getattr(self.table, '_columns', None)
+        for row in rows:
+            columns = tuple(row)
+            if table_columns is None:
+                values = tuple(row[c] for c in columns)
+            else:
+                values = tuple(table_columns[c].to_db(row[c]) for c in columns)
+            groups.setdefault(columns, []).append(values)
+
+        try:
+            with Session(self.engine) as session:
+                with session.begin():
+                    for columns, values in groups.items():
+                        sizes = None
+                        if hasattr(self.table, '_columns'):
+                            sizes = column_input_sizes([self.table._columns[c] for c in columns], session.dialect)
+                        for sql, params, many in self._statements(columns, values):
+                            if many:
+                                session.executemany(sql, params, input_sizes=sizes)
+                            else:
+                                session.execute(sql, params)
+        except Exception as e:
+            return e
+        return None
+
+    def _isolate(self, rows):
+        """(row, error) pairs of a failed batch, found by inserting it in halves."""
+        if len(rows) == 1:
+            return [(rows[0], self.last_error)]
+        middle = len(rows) // 2
+        halves, failed = (rows[:middle], rows[middle:]), []
+        for half in halves:
+            error = self._insert(half)
+            if error is not None:
+                self.last_error = error
+                failed.append(half)
+        if len(failed) == 2:
+            # Both halves fail: more likely the server than single rows
+            return [(row, self.last_error) for row in rows]
+        return [pair for half in failed for pair in self._isolate(half)]
+
+    def _write(self, entries):
+        """Insert (row, attempts) pairs; returns True if all were written."""
+        rows = [row for row, _ in entries]
+        start = time.perf_counter()
+        error = self._insert(rows)
+        if error is None:
+            self.metrics.observe("flush_seconds", time.perf_counter() - start)
+            self.metrics.incr("flushes")
+            self.metrics.incr("rows_written", len(rows))
+            with self._cond:
+                self._failures = 0
+                self._retry_at = 0.0
+                self._cond.notify_all()
+            return True
+
+        self.last_error = error
+        self.metrics.incr("flush_errors")
+        errors = {id(row): e for row, e in self._isolate(rows)}
+        written = len(rows) - len(errors)
+        if written:
+            self.metrics.incr("rows_written", written)
+        with self._cond:
+            for row, attempts in entries:
+                if id(row) not in errors:
+                    continue
+                if attempts + 1 >= self.max_retries:
+                    self.dead_letters.append((row, errors[id(row)]))
+                    self.metrics.incr("rows_failed")
+                else:
+                    self._failed.append((row, attempts + 1))
+            self._failures += 1
+            backoff = min(self.retry_backoff * 2 ** (self._failures - 1), self.max_backoff)
+            self._retry_at = time.monotonic() + backoff
+            self.metrics.gauge("retry_rows", len(self._failed))
+            self._cond.notify_all()
+        return False
+
+    def _drain_spill(self):
+        """Load spilled rows back and insert them in batches."""
+        with self._drain_lock:
+            with self._cond:
+                if not self._spilled or self._held() >= self.max_rows or time.monotonic() < self._retry_at:
+                    return
+                if self._spill_file is not None:
+                    self._spill_file.close()
+                    self._spill_file = None
+                self._spilled = 0
+                fd, draining = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.spill_path)),
+                                                prefix=os.path.basename(self.spill_path) + ".",
+                                                suffix=".draining")
+                os.close(fd)
+                os.replace(self.spill_path, draining)
+
+            unwritten = []
+            f = open(draining, "rb")
+            try:
+                rows = _load_rows(f)
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= self.batch_size:
+                        # Rows stay unwritten until _write has taken care of them
+                        unwritten = batch
+                        ok = self._write([(row, 0) for row in batch])
+                        unwritten = batch = []
+                        if not ok:
+                            break
+                else:
+                    if batch:
+                        unwritten = batch
+                        self._write([(row, 0) for row in batch])
+                        unwritten = []
+            finally:
+                # Rows after a failed batch, or left by an error, go back to the spill file
+                rest = unwritten + list(_load_rows(f))
+                f.close()
+                if rest:
+                    with self._cond:
+                        self._spill(rest)
+                os.remove(draining)
+
+    def flush(self):
+        """Write everything buffered now, including rows waiting for a retry."""
+        with self._cond:
+            entries = self._take(force=True)
+            self._retry_at = 0.0
+        if entries:
+            self._write(entries)
+        self._drain_spill()
+
+    def close(self):
+        """
+        Stop the background thread and write all remaining rows.
+        Raises the last flush error if rows could not be written; with the
+        "spill" policy they are kept in the spill file.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self.spill_path and not self._spilled and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        if self.pending and self.last_error is not None:
+            raise self.last_error
+
+    def stats(self):
+        """Counters, flush latency and the number of pending rows."""
+        stats = self.metrics.snapshot()
+        stats["pending_rows"] = self.pending
+        return stats
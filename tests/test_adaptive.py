@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from dbrm.adaptive import ChunkSizeController, fetch_batches
+from dbrm.sqltable import SQLTable
+
+
+class TestChunkSizeController(unittest.TestCase):
+    def test_grows_while_throughput_improves(self):
+        controller = ChunkSizeController(initial=100, min_size=10, max_size=10000)
+        self.assertEqual(controller.record(100, 0.1), 200)   # 1000 rows/s
+        self.assertEqual(controller.record(200, 0.1), 400)   # 2000 rows/s
+        # Throughput fell: reverse direction
+        self.assertEqual(controller.record(400, 1.0), 200)
+        self.assertEqual(controller.record(200, 0.05), 100)  # still improving, keep shrinking
+
+    def test_shrinks_on_slow_batches(self):
+        controller = ChunkSizeController(initial=1000, min_size=100, target_latency=1.0)
+        self.assertEqual(controller.record(1000, 5.0), 500)
+        for _ in range(10):
+            controller.record(controller.size, 5.0)
+        self.assertEqual(controller.size, 100)
+
+    def test_partial_batches_do_not_adjust(self):
+        controller = ChunkSizeController(initial=1000)
+        self.assertEqual(controller.record(10, 0.001), 1000)
+
+    def test_bounds(self):
+        controller = ChunkSizeController(initial=5000, min_size=10, max_params=2100, columns=10)
+        self.assertEqual(controller.upper_bound, 210)
+        self.assertEqual(controller.size, 210)
+
+        controller = ChunkSizeController(initial=5000, min_size=10, memory_limit=1000, row_bytes=100)
+        self.assertEqual(controller.size, 10)
+        controller.record(10, 0.001)
+        self.assertEqual(controller.size, 10)
+
+    def test_batches(self):
+        controller = ChunkSizeController(initial=2, min_size=1)
+        sizes = [len(batch) for batch in controller.batches(range(7))]
+        self.assertEqual(sizes, [2, 2, 2, 1])
+
+
+class TestFetchBatches(unittest.TestCase):
+    def make_cursor(self, total):
+        cursor = MagicMock()
+        remaining = list(range(total))
+
+        def fetchmany(size):
+            batch = [(value,) for value in remaining[:size]]
+            del remaining[:size]
+            return batch
+
+        cursor.fetchmany.side_effect = fetchmany
+        return cursor
+
+    def test_fixed_size(self):
+        cursor = self.make_cursor(25)
+        sizes = [len(batch) for batch in fetch_batches(cursor, 10)]
+        self.assertEqual(sizes, [10, 10, 5])
+
+    def test_auto_size(self):
+        cursor = self.make_cursor(5000)
+        batches = list(fetch_batches(cursor, "auto", initial=100, min_size=100))
+        self.assertEqual(sum(len(batch) for batch in batches), 5000)
+        self.assertEqual(len(batches[0]), 100)
+        self.assertGreaterEqual(cursor.arraysize, 100)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            list(fetch_batches(MagicMock(), "fast"))
+
+
+class TestAdaptiveInsert(unittest.TestCase):
+    def test_auto_chunks_cover_all_rows(self):
+        cursor = MagicMock()
+        frame = pd.DataFrame({"id": range(2500), "name": ["x"] * 2500})
+        table = SQLTable(cursor, "items", frame, if_exists="append")
+        table.insert(chunk_size="auto")
+
+        inserted = [row for call in cursor.executemany.call_args_list for row in call.args[1]]
+        self.assertEqual(len(inserted), 2500)
+        self.assertEqual(inserted[0], (0, "x"))
+        self.assertEqual(len(cursor.executemany.call_args_list[0].args[1]), 1000)
+        self.assertTrue(table.controller.history)
+
+    def test_invalid_chunk_size(self):
+        table = SQLTable(MagicMock(), "items", pd.DataFrame({"id": [1]}))
+        with self.assertRaises(ValueError):
+            table.insert(chunk_size="big")
+
+
+if __name__ == '__main__':
+    unittest.main()
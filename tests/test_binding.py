@@ -0,0 +1,83 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+from dbrm import Table, Column, Integer, String, DateTime, Session
+from dbrm.binding import (
+    input_sizes, column_input_sizes, frame_rows,
+    SQL_BIGINT, SQL_DOUBLE, SQL_WVARCHAR, SQL_TYPE_TIMESTAMP, SQL_BIT,
+)
+from dbrm.sqltable import SQLTable
+from dbrm.remote import _frame_sql_types
+
+
+class TestInputSizes(unittest.TestCase):
+    def test_sizes_from_schema_types(self):
+        self.assertEqual(
+            input_sizes(["INTEGER", "DOUBLE", "VARCHAR(40)", "TEXT", "BOOLEAN", "DATETIME", "INTERVAL"]),
+            [(SQL_BIGINT, 0, 0), (SQL_DOUBLE, 0, 0), (SQL_WVARCHAR, 40, 0), (SQL_WVARCHAR, 0, 0),
+             (SQL_BIT, 0, 0), (SQL_TYPE_TIMESTAMP, 26, 6), None],
+        )
+        # SQL Server DATETIME only stores milliseconds
+        self.assertEqual(input_sizes(["DATETIME"], "mssql"), [(SQL_TYPE_TIMESTAMP, 23, 3)])
+
+    def test_sizes_from_columns(self):
+        class Event(Table):
+            __tablename__ = 'events'
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+            at = Column(DateTime)
+
+        self.assertEqual(
+            column_input_sizes(Event._columns.values()),
+            [(SQL_BIGINT, 0, 0), (SQL_WVARCHAR, 255, 0), (SQL_TYPE_TIMESTAMP, 26, 6)],
+        )
+
+    def test_frame_rows_convert_in_bulk(self):
+        frame = pd.DataFrame({
+            "id": np.array([1, 2], dtype=np.int64),
+            "score": [1.5, np.nan],
+            "at": pd.to_datetime(["2024-01-01 10:00:00", None]),
+            "name": ["a", None],
+            "flag": [True, False],
+        })
+        rows = list(frame_rows(frame))
+        self.assertEqual(rows, [
+            (1, 1.5, datetime.datetime(2024, 1, 1, 10), "a", True),
+            (2, None, None, None, False),
+        ])
+        self.assertIs(type(rows[0][0]), int)
+        self.assertIs(type(rows[0][2]), datetime.datetime)
+
+    def test_sqltable_binds_sizes(self):
+        cursor = MagicMock()
+        frame = pd.DataFrame({"id": [1, 2], "name": ["a", "b"], "score": [0.5, None]})
+        SQLTable(cursor, "scores", frame, if_exists="append").insert()
+
+        self.assertEqual(cursor.setinputsizes.call_args_list[0].args[0],
+                         [(SQL_BIGINT, 0, 0), (SQL_WVARCHAR, 255, 0), (SQL_DOUBLE, 0, 0)])
+        cursor.setinputsizes.assert_called_with(None)
+        cursor.executemany.assert_called_once_with(
+            "INSERT INTO scores (id, name, score) VALUES (?, ?, ?)", [(1, "a", 0.5), (2, "b", None)]
+        )
+
+    def test_long_strings_bind_as_text(self):
+        frame = pd.DataFrame({"id": [1, 2], "note": ["x" * 300, "short"]})
+        self.assertEqual(_frame_sql_types(frame), ["INTEGER", "TEXT"])
+
+        cursor = MagicMock()
+        SQLTable(cursor, "notes", frame, if_exists="append").insert()
+        self.assertEqual(cursor.setinputsizes.call_args_list[0].args[0],
+                         [(SQL_BIGINT, 0, 0), (SQL_WVARCHAR, 0, 0)])
+
+    def test_session_executemany_input_sizes(self):
+        session = Session(MagicMock())
+        session._cursor = MagicMock()
+        session._connection = MagicMock()
+        session.executemany("INSERT INTO t (id) VALUES (?)", [(1,)], input_sizes=[(SQL_BIGINT, 0, 0)])
+        session._cursor.setinputsizes.assert_any_call([(SQL_BIGINT, 0, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import importlib.util
+import json
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from dbrm import Table, Column, Integer, JSON, BLOB, Insert, Update, Select, Session
+from dbrm.compression import compress, decompress, is_framed, STORED, ZLIB, HEADER_SIZE
+from dbrm.binding import column_input_sizes, SQL_VARBINARY
+from dbrm.sqltable import SQLTable
+
+
+class Document(Table):
+    __tablename__ = 'documents'
+    id = Column(Integer, primary_key=True)
+    body = Column(JSON, compress="zlib")
+    attachment = Column(BLOB, compress="zlib")
+    meta = Column(JSON)
+
+
+PAYLOAD = {"lines": [{"sku": i, "name": "widget " * 4} for i in range(40)]}
+
+
+class TestFraming(unittest.TestCase):
+    def test_round_trip(self):
+        data = json.dumps(PAYLOAD).encode()
+        framed = compress(data, "zlib")
+        self.assertTrue(is_framed(framed))
+        self.assertEqual(framed[3], ZLIB)
+        self.assertLess(len(framed), len(data))
+        self.assertEqual(decompress(framed), data)
+
+    def test_incompressible_values_are_stored(self):
+        framed = compress(b"ab", "zlib")
+        self.assertEqual((framed[3], framed[HEADER_SIZE:]), (STORED, b"ab"))
+        self.assertEqual(decompress(framed), b"ab")
+
+    def test_plain_values_pass_through(self):
+        self.assertFalse(is_framed(b'{"a": 1}'))
+        self.assertEqual(decompress(b'{"a": 1}'), b'{"a": 1}')
+        self.assertEqual(decompress("text"), "text")
+
+    @unittest.skipUnless(importlib.util.find_spec("zstandard"), "zstandard is not installed")
+    def test_zstd(self):
+        data = json.dumps(PAYLOAD).encode()
+        self.assertEqual(decompress(compress(data, "zstd")), data)
+
+    def test_column_validation(self):
+        with self.assertRaises(ValueError):
+            Column(JSON, compress="lz4")
+        with self.assertRaises(ValueError):
+            Column(Integer, compress="zlib")
+
+
+class TestCompressedColumns(unittest.TestCase):
+    def test_insert_serializes_and_compresses(self):
+        sql, params = Insert(Document).values(id=1, body=PAYLOAD, attachment=b"x" * 500, meta={"v": 2}).build()
+        self.assertEqual(sql, "INSERT INTO documents (id, body, attachment, meta) VALUES (?, ?, ?, ?)")
+        self.assertEqual(json.loads(decompress(params[1])), PAYLOAD)
+        self.assertEqual(decompress(params[2]), b"x" * 500)
+        self.assertEqual(params[3], '{"v": 2}')
+
+        _, params = Update(Document).set(body=None).where(Document.id == 1).build()
+        self.assertEqual(params, [None, 1])
+
+    def test_rows_decompress_on_access(self):
+        _, params = Insert(Document).values(id=1, body=PAYLOAD, attachment=b"x" * 500).build()
+        cursor = MagicMock()
+        cursor.description = [("id",), ("body",), ("attachment",), ("meta",)]
+        make_row = Select().from_(Document)._row_class(cursor)
+
+        row = make_row((1, params[1], params[2], '{"v": 2}'))
+        self.assertIsNotNone(row._raw_body)
+        self.assertEqual(row.body, PAYLOAD)
+        self.assertEqual(row.attachment, b"x" * 500)
+        self.assertEqual(row.meta, {"v": 2})
+
+        # Values written before compression was enabled
+        row = make_row((2, b'{"plain": true}', memoryview(b"raw"), None))
+        self.assertEqual(row.body, {"plain": True})
+        self.assertEqual(row.attachment, b"raw")
+
+    def test_schema_and_binding_use_binary(self):
+        session = MagicMock()
+        Document.create(session)
+        create_sql = session.execute.call_args_list[0].args[0]
+        self.assertIn("body BLOB", create_sql)
+        self.assertIn("meta JSON", create_sql)
+        self.assertEqual(column_input_sizes([Document._columns["body"]])[0][0], SQL_VARBINARY)
+
+    def test_flush_compresses(self):
+        session = Session(MagicMock())
+        session._cursor = MagicMock()
+        session._connection = MagicMock()
+        session.add(Document(id=1, body=PAYLOAD))
+        session.flush()
+
+        rows = session._cursor.executemany.call_args.args[1]
+        self.assertEqual(json.loads(decompress(rows[0][1])), PAYLOAD)
+
+    def test_get_decodes_and_writes_back_once(self):
+        _, params = Insert(Document).values(id=1, body=PAYLOAD, attachment=b"x" * 500).build()
+        session = Session(MagicMock())
+        session._cursor = MagicMock()
+        session._connection = MagicMock()
+        session._cursor.fetchone.return_value = (1, params[1], params[2], '{"v": 2}')
+
+        document = session.get(Document, 1)
+        self.assertEqual((document.body, document.attachment, document.meta), (PAYLOAD, b"x" * 500, {"v": 2}))
+        document.meta = {"v": 3}
+        document.attachment = params[2]  # already framed values are stored as is
+        session.flush()
+
+        sql, rows = session._cursor.executemany.call_args.args
+        self.assertEqual(sql, "UPDATE documents SET attachment = ?, meta = ? WHERE id = ?")
+        self.assertEqual(rows, [(params[2], '{"v": 3}', 1)])
+
+    def test_sqltable_compress(self):
+        cursor = MagicMock()
+        frame = pd.DataFrame({"id": [1, 2], "body": [PAYLOAD, None]})
+        table = SQLTable(cursor, "documents", frame, if_exists="append", compress={"body": "zlib"})
+        self.assertEqual(table.dtypes, ["INTEGER", "BLOB"])
+        table.insert()
+
+        rows = cursor.executemany.call_args.args[1]
+        self.assertEqual(json.loads(decompress(rows[0][1])), PAYLOAD)
+        self.assertIsNone(rows[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,348 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from dbrm import Engine, ReplicatedEngine, Session, ReadOnlyError, Select, Workload, workload
+from dbrm.pool import PoolTimeout
+from dbrm.scheduler import Scheduler
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.engine = Engine("DSN=test", pool_size=1, max_overflow=1, pool_timeout=0.01)
+        self.created = []
+
+        def create():
+            conn = MagicMock()
+            self.created.append(conn)
+            return conn
+
+        self.engine._create_connection = create
+        self.engine.pool._creator = create
+
+    def test_connections_are_reused(self):
+        self.engine.connect().close()
+        self.engine.connect().close()
+        self.assertEqual(len(self.created), 1)
+        self.created[0].rollback.assert_called()
+
+    def test_pooling_is_opt_in(self):
+        engine = Engine("DSN=test")
+        self.assertIsNone(engine.pool)
+        engine._create_connection = MagicMock()
+        engine.connect()
+        engine.connect()
+        self.assertEqual(engine._create_connection.call_count, 2)
+
+    def test_overflow_and_timeout(self):
+        first = self.engine.connect()
+        second = self.engine.connect()
+        with self.assertRaises(PoolTimeout):
+            self.engine.connect()
+        second.close()
+        first.close()
+        # Only pool_size connections are kept idle
+        self.assertEqual(self.engine.pool.idle, 1)
+        self.created[0].close.assert_called_once()
+
+    def test_isolation_set_once_per_checkout(self):
+        self.engine.dialect = "postgresql"
+        with Session(self.engine, isolation="snapshot") as session:
+            session.execute("SELECT 1")
+            with session.begin():
+                session.execute("SELECT 2")
+        with Session(self.engine) as session:
+            session.execute("SELECT 3")
+
+        self.assertEqual(len(self.created), 1)
+        statements = [c.args[0] for c in self.created[0].cursor.return_value.execute.call_args_list]
+        self.assertEqual(statements, [
+            "SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL REPEATABLE READ",
+            "SELECT 1",
+            "SELECT 2",
+            # reset by the pool on return
+            "SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL READ COMMITTED",
+            "SELECT 3",
+        ])
+
+    def test_dialect_detected_from_first_connection(self):
+        self.assertIsNone(self.engine.dialect)
+        self.engine.pool._creator = lambda: MagicMock(
+            spec=["getinfo", "cursor", "commit", "rollback", "close"], **{"getinfo.return_value": "PostgreSQL"})
+        with Session(self.engine) as session:
+            self.assertEqual(session.dialect, "postgresql")
+        self.assertEqual(self.engine.dialect, "postgresql")
+        self.assertEqual(Engine("Driver={SQLite3};Database=x.db").dialect, "sqlite")
+
+    def test_invalid_isolation(self):
+        with self.assertRaises(ValueError):
+            Session(self.engine, isolation="dirty")
+
+    def test_readonly_enforced_by_server(self):
+        self.engine.dialect = "postgresql"
+        with Session(self.engine, readonly=True) as session:
+            session.execute("SELECT 1")
+        with Session(self.engine) as session:
+            session.execute("SELECT 2")
+
+        statements = [c.args[0] for c in self.created[0].cursor.return_value.execute.call_args_list]
+        self.assertEqual(statements, [
+            "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+            "SELECT 1",
+            "SET SESSION CHARACTERISTICS AS TRANSACTION READ WRITE",
+            "SELECT 2",
+        ])
+
+    def test_readonly_ignores_quoted_keywords(self):
+        with Session(self.engine, readonly=True) as session:
+            session.execute("SELECT * FROM log WHERE action = 'DELETE'")
+            session.execute("SELECT * FROM notes WHERE body LIKE '%update%; drop'")
+            session.execute('SELECT "into", [merge] FROM t -- insert later')
+            session.execute("/* nightly */ SELECT 1")
+            with self.assertRaises(ReadOnlyError):
+                session.execute("SELECT 'x'; DELETE FROM t")
+
+
+class _SQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection that accepts the autocommit flag Session sets."""
+
+
+class SQLiteEngine(Engine):
+    """Engine over a SQLite file, standing in for one server of a replica set."""
+
+    def __init__(self, path):
+        super().__init__(f"Driver=SQLite3;Database={path}")
+        self.path = path
+
+    def _create_connection(self):
+        return sqlite3.connect(self.path, factory=_SQLiteConnection, check_same_thread=False)
+
+
+class TestReplicatedEngineWithSQLite(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.paths = [os.path.join(directory.name, f"{name}.db") for name in ("primary", "replica0", "replica1")]
+        for path in self.paths:
+            with sqlite3.connect(path) as connection:
+                connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+                connection.execute("INSERT INTO users VALUES (1, ?)", [os.path.basename(path)[:-3]])
+            connection.close()
+        self.primary, *self.replicas = [SQLiteEngine(path) for path in self.paths]
+        self.engine = ReplicatedEngine(self.primary, self.replicas)
+        for engine in (self.primary, *self.replicas):
+            self.addCleanup(engine.dispose)
+
+    def names(self, path):
+        connection = sqlite3.connect(path)
+        try:
+            return [name for (name,) in connection.execute("SELECT name FROM users ORDER BY id")]
+        finally:
+            connection.close()
+
+    def test_reads_are_served_by_replicas(self):
+        with Session(self.engine) as session:
+            first = session.execute("SELECT name FROM users").fetchall()
+        with Session(self.engine) as session:
+            second = session.execute("SELECT name FROM users").fetchall()
+        self.assertEqual([first, second], [[("replica0",)], [("replica1",)]])
+
+    def test_writes_reach_only_the_primary(self):
+        with Session(self.engine) as session:
+            with session.begin():
+                session.execute("INSERT INTO users (id, name) VALUES (?, ?)", [2, "new"])
+            # Sticky sessions read their own write from the primary
+            self.assertEqual(session.execute("SELECT name FROM users WHERE id = 2").fetchall(), [("new",)])
+
+        self.assertEqual(self.names(self.paths[0]), ["primary", "new"])
+        self.assertEqual(self.names(self.paths[1]), ["replica0"])
+        self.assertEqual(self.names(self.paths[2]), ["replica1"])
+
+    def test_non_sticky_session_reads_the_replica_after_a_write(self):
+        with Session(self.engine, sticky=False) as session:
+            session.execute("UPDATE users SET name = 'renamed'")
+            session.commit()
+            self.assertEqual(session.execute("SELECT name FROM users").fetchall(), [("replica0",)])
+        self.assertEqual(self.names(self.paths[0]), ["renamed"])
+
+    def test_readonly_session_stays_on_a_replica(self):
+        with Session(self.engine, readonly=True) as session:
+            with session.begin():
+                self.assertEqual(session.execute("SELECT name FROM users").fetchall(), [("replica0",)])
+            with self.assertRaises(ReadOnlyError):
+                session.execute("DELETE FROM users")
+        self.assertEqual([self.names(path) for path in self.paths], [["primary"], ["replica0"], ["replica1"]])
+
+    def test_unreachable_replica_is_skipped(self):
+        self.replicas[0].path = os.path.join(self.paths[0], "missing", "replica0.db")
+        for _ in range(2):
+            with Session(self.engine) as session:
+                self.assertEqual(session.execute("SELECT name FROM users").fetchall(), [("replica1",)])
+        self.assertEqual(self.engine.check_health(), [False, True])
+
+
+class TestReplicatedEngine(unittest.TestCase):
+    def setUp(self):
+        self.primary = MagicMock()
+        self.replicas = [MagicMock(), MagicMock()]
+        self.engine = ReplicatedEngine(self.primary, self.replicas)
+
+    def test_round_robin(self):
+        for _ in range(4):
+            self.engine.connect(readonly=True).close()
+        self.assertEqual(self.replicas[0].connect.call_count, 2)
+        self.assertEqual(self.replicas[1].connect.call_count, 2)
+        self.primary.connect.assert_not_called()
+
+    def test_least_outstanding(self):
+        engine = ReplicatedEngine(self.primary, self.replicas, strategy="least_outstanding")
+        held = engine.connect(readonly=True)
+        engine.connect(readonly=True)
+        self.assertEqual(self.replicas[1].connect.call_count, 1)
+        held.close()
+        engine.connect(readonly=True)
+        self.assertEqual(self.replicas[0].connect.call_count, 2)
+
+    def test_failed_replica_leaves_rotation(self):
+        self.replicas[0].connect.side_effect = Exception("down")
+        for _ in range(3):
+            self.engine.connect(readonly=True)
+        self.assertEqual(self.replicas[0].connect.call_count, 1)
+        self.assertEqual(self.replicas[1].connect.call_count, 3)
+        self.assertEqual(self.engine.check_health(), [False, True])
+
+    def test_all_replicas_down_falls_back_to_primary(self):
+        for replica in self.replicas:
+            replica.connect.side_effect = Exception("down")
+        self.engine.connect(readonly=True)
+        self.primary.connect.assert_called_once()
+
+    def test_session_routing_and_stickiness(self):
+        with Session(self.engine) as session:
+            Select("*").from_("users").execute(session)
+            self.primary.connect.assert_not_called()
+
+            session.execute("INSERT INTO users (id) VALUES (?)", [1])
+            session.execute("SELECT * FROM users")
+            self.primary.connect.assert_called_once()
+            primary_cursor = self.primary.connect.return_value.cursor.return_value
+            self.assertEqual(primary_cursor.execute.call_count, 2)
+
+    def test_session_transaction_uses_primary(self):
+        with Session(self.engine, sticky=False) as session:
+            with session.begin():
+                session.execute("SELECT * FROM users")
+            session.execute("SELECT * FROM users")
+        primary_cursor = self.primary.connect.return_value.cursor.return_value
+        self.assertEqual(primary_cursor.execute.call_count, 1)
+        self.assertEqual(self.replicas[0].connect.call_count, 1)
+
+    def test_readonly_session(self):
+        with Session(self.engine, readonly=True) as session:
+            with session.begin():
+                session.execute("SELECT * FROM orders")
+                session.execute("WITH t AS (SELECT 1 AS x) SELECT x FROM t")
+            with self.assertRaises(ReadOnlyError):
+                session.execute("UPDATE orders SET total = 0")
+            with self.assertRaises(ReadOnlyError):
+                session.executemany("INSERT INTO orders (id) VALUES (?)", [[1]])
+        self.primary.connect.assert_not_called()
+        replica = self.replicas[0].connect.return_value
+        self.assertEqual(replica.cursor.return_value.execute.call_count, 2)
+        replica.commit.assert_called_once()
+
+
+
+class TestScheduler(unittest.TestCase):
+    def wait_for(self, predicate):
+        for _ in range(200):
+            if predicate():
+                return
+            time.sleep(0.005)
+        self.fail("condition not reached")
+
+    def test_class_limit_and_timeout(self):
+        scheduler = Scheduler(capacity=4, workloads={
+            "interactive": Workload(), "batch": Workload(limit=1),
+        })
+        name = scheduler.acquire("batch")
+        with self.assertRaises(PoolTimeout):
+            scheduler.acquire("batch", timeout=0.01)
+        # Other classes are not held up by the batch limit
+        scheduler.release(scheduler.acquire("interactive", timeout=0.01))
+        scheduler.release(name)
+        scheduler.release(scheduler.acquire("batch", timeout=0.01))
+        self.assertEqual(scheduler.stats()["batch"], {"active": 0, "waiting": 0, "limit": 1})
+
+    def test_fair_sharing_between_classes(self):
+        scheduler = Scheduler(capacity=2, workloads={
+            "interactive": Workload(weight=3), "batch": Workload(weight=1, priority=1),
+        })
+        held = [scheduler.acquire("batch"), scheduler.acquire("batch")]
+        order = []
+
+        def wait(name):
+            scheduler.acquire(name)
+            order.append(name)
+
+        batch = threading.Thread(target=wait, args=("batch",))
+        batch.start()
+        self.wait_for(lambda: scheduler.stats()["batch"]["waiting"] == 1)
+        interactive = threading.Thread(target=wait, args=("interactive",))
+        interactive.start()
+        self.wait_for(lambda: scheduler.stats()["interactive"]["waiting"] == 1)
+
+        # The interactive request queued later but gets the first free slot
+        scheduler.release(held.pop())
+        self.wait_for(lambda: order == ["interactive"])
+        scheduler.release(held.pop())
+        self.wait_for(lambda: order == ["interactive", "batch"])
+        batch.join()
+        interactive.join()
+
+    def test_engine_checkout_per_workload(self):
+        engine = Engine("DSN=test", pool_size=1, max_overflow=1, pool_timeout=0.01,
+                        workloads={"interactive": Workload(), "batch": Workload(limit=1)})
+        engine.pool._creator = MagicMock
+
+        with workload("batch"):
+            first = engine.connect()
+            with self.assertRaises(PoolTimeout):
+                Session(engine).execute("SELECT 1")
+        second = engine.connect()
+        self.assertEqual(engine.scheduler.stats()["batch"]["active"], 1)
+        first.close()
+        first.close()
+        second.close()
+        self.assertEqual(engine.scheduler.stats()["batch"]["active"], 0)
+
+        session = Session(engine, workload="batch")
+        session.execute("SELECT 1")
+        self.assertEqual(engine.scheduler.stats()["batch"]["active"], 1)
+        session.close()
+
+        stats = engine.metrics.snapshot()
+        self.assertEqual(stats["checkout_timeouts.batch"], 1)
+        self.assertEqual(stats["checkout_wait.batch"]["count"], 2)
+        self.assertEqual(stats["queue_depth.batch_peak"], 1)
+
+    def test_admission_wait_counts_against_pool_timeout(self):
+        engine = Engine("DSN=test", pool_size=1, pool_timeout=1.0,
+                        workloads={"interactive": Workload()})
+        engine.pool.connect = MagicMock()
+
+        def acquire(name, timeout):
+            time.sleep(0.2)
+            return "interactive"
+        engine.scheduler.acquire = acquire
+        engine.connect()
+        timeout = engine.pool.connect.call_args.kwargs["timeout"]
+        self.assertLessEqual(timeout, 0.8)
+        self.assertGreater(timeout, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
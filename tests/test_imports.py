@@ -0,0 +1,32 @@
+import subprocess
+import sys
+import unittest
+
+
+class TestLazyImports(unittest.TestCase):
+    def run_python(self, code):
+        return subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        loaded = self.run_python(
+            "import sys, dbrm\n"
+            "print(','.join(m for m in ('pandas', 'numpy', 'pyodbc', 'dotenv') if m in sys.modules))"
+        )
+        self.assertEqual(loaded, "")
+
+    def test_building_sql_stays_light(self):
+        loaded = self.run_python(
+            "import sys\n"
+            "from dbrm import Select, Table, Column, Integer\n"
+            "class T(Table):\n"
+            "    id = Column(Integer, primary_key=True)\n"
+            "Select().from_(T).where(T.id == 1).compile()\n"
+            "print('pandas' in sys.modules)"
+        )
+        self.assertEqual(loaded, "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
-from dbrm import Select, Insert, Update, Delete, Engine, Session, Table, Column, Integer, String
+from unittest.mock import MagicMock
+from dbrm import Select, Insert, Update, Delete, Engine, Session, Table, Column, Index, Integer, String, text
+from dbrm.indexes import deferred_indexes
+import dbrm.sqlinterpreter as itp
 
 class TestQueryBuilder(unittest.TestCase):
     
@@ -36,6 +39,51 @@ class TestQueryBuilder(unittest.TestCase):
         expected = "SELECT e.name, d.department_name FROM employees e INNER JOIN departments d ON e.dept_id = d.id"
         self.assertEqual(query.build(), expected)
     
+    def test_select_partitions(self):
+        query = Select("id", "name").from_("employees").where("age > 30")
+        parts = query.partitions("id", (1, 10), 3)
+        self.assertEqual(parts, [
+            ("SELECT id, name FROM employees WHERE age > 30 AND id >= ? AND id < ?", [1, 4]),
+            ("SELECT id, name FROM employees WHERE age > 30 AND id >= ? AND id < ?", [4, 7]),
+            ("SELECT id, name FROM employees WHERE age > 30 AND id >= ? AND id < ?", [7, 11]),
+        ])
+        self.assertEqual(query.build(), "SELECT id, name FROM employees WHERE age > 30")
+        
+        # Float ranges close the last partition
+        parts = query.partitions("salary", (0.0, 1.0), 2)
+        self.assertEqual(parts[-1][0][-len("salary <= ?"):], "salary <= ?")
+        self.assertEqual(parts[-1][1], [0.5, 1.0])
+        
+        # An OR in raw SQL must not swallow the range
+        query = Select("id").from_("employees").where(text("age > ? OR dept = 'HR'", 30))
+        self.assertEqual(query.partitions("id", (1, 2), 1), [
+            ("SELECT id FROM employees WHERE (age > ? OR dept = 'HR') AND id >= ? AND id < ?", [30, 1, 3]),
+        ])
+    
+    def test_server_side_copies(self):
+        query = Select("dept", "COUNT(*)").from_("employees").where(text("age > ?", 30)).group_by("dept")
+        insert = query.insert_into("dept_counts", ["dept", "total"])
+        self.assertEqual(insert.compile(), (
+            "INSERT INTO dept_counts (dept, total) SELECT dept, COUNT(*) FROM employees "
+            "WHERE age > ? GROUP BY dept", [30]
+        ))
+        
+        create = Select("*").from_("employees").create_table_as("employees_copy")
+        self.assertEqual(create.build(), "CREATE TABLE employees_copy AS SELECT * FROM employees")
+        with self.assertRaises(ValueError):
+            insert.build()
+        self.assertEqual(create.build("mssql"), "SELECT * INTO employees_copy FROM employees")
+        
+        session = MagicMock()
+        session.dialect = "sqlite"
+        session.execute.return_value.rowcount = -1
+        session.execute.return_value.fetchone.return_value = (12,)
+        self.assertEqual(create.execute(session), 12)
+        session.execute.assert_called_with("SELECT COUNT(*) FROM employees_copy")
+        
+        session.execute.return_value.rowcount = 4
+        self.assertEqual(insert.execute(session), 4)
+    
     def test_insert_query(self):
         # Test insert with values
         insert = Insert("employees")
@@ -73,6 +121,67 @@ class TestQueryBuilder(unittest.TestCase):
         expected = "DELETE FROM employees WHERE age > 60 AND department = 'HR'"
         self.assertEqual(delete.build(), expected)
 
+class TestExpressions(unittest.TestCase):
+    def setUp(self):
+        class Person(Table):
+            __tablename__ = 'people'
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+            age = Column(Integer)
+        
+        class Pet(Table):
+            __tablename__ = 'pets'
+            id = Column(Integer, primary_key=True)
+            owner_id = Column(Integer)
+        
+        self.Person = Person
+        self.Pet = Pet
+    
+    def test_select_binds_parameters(self):
+        Person, Pet = self.Person, self.Pet
+        query = (Select(Person.id, Person.name).from_(Person)
+                 .join(Pet, Person.id == Pet.owner_id)
+                 .where((Person.age >= 18) & (Person.name.in_(["a", "b"]) | Person.name.like("c%")))
+                 .where(Person.id.between(1, 9))
+                 .order_by(Person.name.desc()))
+        sql, params = query.compile()
+        self.assertEqual(sql, "SELECT people.id, people.name FROM people "
+                              "INNER JOIN pets ON people.id = pets.owner_id "
+                              "WHERE (people.age >= ? AND (people.name IN (?, ?) OR people.name LIKE ?)) "
+                              "AND people.id BETWEEN ? AND ? ORDER BY people.name DESC")
+        self.assertEqual(params, [18, "a", "b", "c%", 1, 9])
+        
+        # The SQL text does not change with the values
+        self.assertEqual(Select().from_(Person).where(Person.id == 1).compile()[0],
+                         Select().from_(Person).where(Person.id == 2).compile()[0])
+    
+    def test_null_and_negation(self):
+        Person = self.Person
+        sql, params = Delete(Person).where(~(Person.name == None) & (Person.age != 3)).compile()
+        self.assertEqual(sql, "DELETE FROM people WHERE (NOT (people.name IS NULL) AND people.age <> ?)")
+        self.assertEqual(params, [3])
+    
+    def test_update_with_expression(self):
+        sql, params = Update(self.Person).set(name="x").where(self.Person.id == 4).build()
+        self.assertEqual(sql, "UPDATE people SET name = ? WHERE people.id = ?")
+        self.assertEqual(params, ["x", 4])
+    
+    def test_interpreter_bind(self):
+        Person = self.Person
+        self.assertEqual(itp.insert("people", ["name", "age"], ["a", 3], bind=True),
+                         ("INSERT INTO people (name, age) VALUES (?, ?)", ["a", 3]))
+        self.assertEqual(itp.update("people", ["name"], ["b"], Person.id == 1, bind=True),
+                         ("UPDATE people SET name = ? WHERE people.id = ?", ["b", 1]))
+        self.assertEqual(itp.select(["id"], "people", [Person.age > 3, "name IS NOT NULL"], bind=True),
+                         ("SELECT id FROM people WHERE people.age > ? AND name IS NOT NULL", [3]))
+        self.assertEqual(itp.delete("people", Person.id.in_([1, 2]), bind=True),
+                         ("DELETE FROM people WHERE people.id IN (?, ?)", [1, 2]))
+        # Literal inlining is unchanged without bind
+        self.assertEqual(itp.insert("people", ["name", "age"], ["a", 3]),
+                         "INSERT INTO people (name, age) VALUES ('a', 3)")
+        with self.assertRaises(ValueError):
+            itp.where(Person.id == 1)
+
 class TestTableDefinition(unittest.TestCase):
     def setUp(self):
         # Define a simple test table
@@ -99,6 +208,42 @@ class TestTableDefinition(unittest.TestCase):
         name_col = self.TestEmployee._columns['name']
         self.assertEqual(name_col.type, String)
         self.assertFalse(name_col.nullable)
+    def test_index_definitions(self):
+        class TestOrder(Table):
+            __tablename__ = 'test_orders'
+            id = Column(Integer, primary_key=True)
+            customer = Column(Integer, index=True)
+            status = Column(String)
+            __indexes__ = [Index('ix_orders_status', status, customer, unique=True), ('status', 'id')]
+        
+        self.assertEqual(TestOrder.create_index_sql(), [
+            "CREATE INDEX ix_test_orders_customer ON test_orders (customer)",
+            "CREATE UNIQUE INDEX ix_orders_status ON test_orders (status, customer)",
+            "CREATE INDEX ix_test_orders_status_id ON test_orders (status, id)",
+        ])
+        self.assertTrue(TestOrder.create_index_sql('sqlite')[0].startswith("CREATE INDEX IF NOT EXISTS"))
+        self.assertEqual(TestOrder.create_index_sql('mssql')[0],
+                         "IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_test_orders_customer' "
+                         "AND object_id = OBJECT_ID('test_orders')) "
+                         "CREATE INDEX ix_test_orders_customer ON test_orders (customer)")
+        
+        # MySQL has no IF NOT EXISTS, so existing indexes are looked up first
+        session = MagicMock(spec=["execute", "commit"], dialect="mysql")
+        session.execute.return_value.fetchall.return_value = [("PRIMARY",), ("IX_ORDERS_STATUS",)]
+        TestOrder.create(session)
+        statements = [c.args[0] for c in session.execute.call_args_list]
+        self.assertEqual(statements[2:], [
+            "CREATE INDEX ix_test_orders_customer ON test_orders (customer)",
+            "CREATE INDEX ix_test_orders_status_id ON test_orders (status, id)",
+        ])
+    
+    def test_deferred_indexes(self):
+        executor = MagicMock()
+        executor.execute.return_value.fetchall.return_value = [("ix_a", None)]
+        with deferred_indexes(executor, "orders", dialect="mssql") as names:
+            self.assertEqual(names, ["ix_a"])
+            executor.execute.assert_called_with("ALTER INDEX ix_a ON orders DISABLE")
+        executor.execute.assert_called_with("ALTER INDEX ix_a ON orders REBUILD")
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,111 @@
+import sqlite3
+import unittest
+from unittest.mock import MagicMock
+from dbrm import Table, Column, Integer, String, Select, frame, col
+
+
+class Order(Table):
+    __tablename__ = 'orders'
+    id = Column(Integer, primary_key=True)
+    region = Column(String)
+    amount = Column(float)
+    status = Column(String)
+
+
+class TestCompile(unittest.TestCase):
+    def test_pushdown_into_one_statement(self):
+        query = (frame(Order)
+                 .filter(Order.status == "paid")
+                 .groupby(Order.region)
+                 .agg(total=(Order.amount, "sum"), orders=("id", "count"))
+                 .sort_values("total", ascending=False)
+                 .head(3))
+        self.assertEqual(query.compile(), (
+            "SELECT orders.region, SUM(orders.amount) AS total, COUNT(id) AS orders FROM orders "
+            "WHERE orders.status = ? GROUP BY orders.region ORDER BY total DESC LIMIT 3",
+            ["paid"],
+        ))
+        self.assertTrue(query.compile("mssql")[0].startswith("SELECT TOP 3 orders.region"))
+
+    def test_projection_and_filters(self):
+        query = frame(Order)[Order.amount > 5][[Order.id, Order.region]].filter(status="open").head(10)
+        self.assertEqual(query.compile(), (
+            "SELECT orders.id, orders.region FROM orders WHERE orders.amount > ? AND status = ? LIMIT 10",
+            [5, "open"],
+        ))
+
+    def test_unselected_aggregates_are_dropped(self):
+        query = frame(Order).groupby("region").agg({"amount": ["min", "max"]}).select("region", "amount_max")
+        self.assertEqual(query.compile()[0],
+                         "SELECT region, MAX(amount) AS amount_max FROM orders GROUP BY region")
+        with self.assertRaises(ValueError):
+            frame(Order).agg(total=("amount", "sum")).select("amount").compile()
+
+    def test_subqueries_where_order_requires(self):
+        query = frame(Order).groupby("region").size().filter(col("size") > 10)
+        self.assertEqual(query.compile(), (
+            "SELECT * FROM (SELECT region, COUNT(*) AS size FROM orders GROUP BY region) AS orders WHERE size > ?",
+            [10],
+        ))
+        query = frame(Order).sort_values(Order.amount.desc()).head(5).filter(status="open")
+        self.assertEqual(query.compile("mssql")[0],
+                         "SELECT * FROM (SELECT TOP 5 * FROM orders ORDER BY orders.amount DESC) AS orders "
+                         "WHERE status = ?")
+
+    def test_dialect_aggregates(self):
+        self.assertEqual(frame(Order).agg(avg=("amount", "mean")).compile("mssql")[0],
+                         "SELECT AVG(CAST(amount AS FLOAT)) AS avg FROM orders")
+        with self.assertRaises(ValueError):
+            frame(Order).agg(x=("amount", "median"))
+        with self.assertRaises(ValueError):
+            frame(Order).agg(x=("amount", "std")).compile("sqlite")
+
+    def test_select_source(self):
+        query = frame(Select("region", "amount").from_(Order).where(Order.amount > 3)).filter(col("amount") < 9)
+        self.assertEqual(query.compile(), (
+            "SELECT * FROM (SELECT region, amount FROM orders WHERE orders.amount > ?) AS source WHERE amount < ?",
+            [3, 9],
+        ))
+
+    def test_nothing_runs_until_collect(self):
+        session = MagicMock(dialect="generic")
+        query = frame(Order, session).filter(status="paid").head(2)
+        session.execute.assert_not_called()
+        query.collect()
+        session.execute.assert_called_once_with(
+            "SELECT * FROM orders WHERE status = ? LIMIT 2", ["paid"])
+        with self.assertRaises(ValueError):
+            frame(Order).collect()
+
+
+class TestCollect(unittest.TestCase):
+    def setUp(self):
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, amount REAL, status TEXT)")
+        connection.executemany("INSERT INTO orders VALUES (?, ?, ?, ?)", [
+            (i, "nesw"[i % 4], float(i), "paid" if i % 3 else "open") for i in range(100)
+        ])
+        self.session = MagicMock(dialect="sqlite")
+        self.session.execute.side_effect = lambda sql, params=None: connection.execute(sql, params or [])
+
+    def test_collect_and_to_pandas(self):
+        query = (frame(Order, self.session)
+                 .filter(Order.status == "paid")
+                 .groupby(Order.region)
+                 .agg(total=(Order.amount, "sum"), orders=(Order.id, "count"))
+                 .sort_values("total", ascending=False)
+                 .head(2))
+        rows = query.collect()
+        self.assertEqual([(row.region, row.orders) for row in rows], [("s", 17), ("e", 17)])
+
+        df = query.to_pandas()
+        self.assertEqual(list(df.columns), ["region", "total", "orders"])
+        self.assertEqual(df["total"].tolist(), [rows[0].total, rows[1].total])
+
+    def test_table_rows(self):
+        rows = frame(Order).filter(region="n").sort_values("id").head(2).collect(self.session)
+        self.assertEqual([(row.id, row.status) for row in rows], [(0, "open"), (4, "paid")])
+
+
+if __name__ == '__main__':
+    unittest.main()
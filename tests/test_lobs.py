@@ -0,0 +1,96 @@
+import io
+import sqlite3
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+from dbrm import Table, Column, Integer, BLOB, Text, open_blob, write_blob
+
+
+class Document(Table):
+    __tablename__ = 'documents'
+    id = Column(Integer, primary_key=True)
+    data = Column(BLOB)
+    body = Column(Text)
+
+
+class SQLiteSession:
+    """Just enough of Session for the large-object helpers."""
+
+    dialect = "sqlite"
+
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, data BLOB, body TEXT)")
+        self.connection.execute("INSERT INTO documents (id) VALUES (1)")
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        return self.connection.execute(sql, params or [])
+
+    @contextmanager
+    def begin(self):
+        with self.connection:
+            yield self
+
+
+class TestLargeObjects(unittest.TestCase):
+    def setUp(self):
+        self.session = SQLiteSession()
+        self.payload = bytes(range(256)) * 40
+
+    def test_write_in_chunks(self):
+        written = write_blob(self.session, Document, Document.data, Document.id == 1,
+                             io.BytesIO(self.payload), chunk_size=1000)
+        self.assertEqual(written, len(self.payload))
+        self.assertEqual(len(self.session.statements), 11)
+        self.assertEqual(self.session.statements[-1],
+                         "UPDATE documents SET data = CAST(data || ? AS BLOB) WHERE documents.id = ?")
+        stored = self.session.connection.execute("SELECT data FROM documents").fetchone()[0]
+        self.assertEqual(stored, self.payload)
+
+    def test_read_ranges_on_demand(self):
+        write_blob(self.session, "documents", "data", {"id": 1}, self.payload)
+        self.session.statements.clear()
+        reader = open_blob(self.session, Document, Document.data, {"id": 1}, chunk_size=1000)
+
+        self.assertEqual(reader.read(10), self.payload[:10])
+        self.assertEqual(reader.read(10), self.payload[10:20])
+        self.assertEqual(len(self.session.statements), 1)
+        reader.seek(-5, io.SEEK_END)
+        self.assertEqual(reader.read(), self.payload[-5:])
+        self.assertEqual(reader.tell(), len(self.payload))
+        self.assertEqual(reader.read(10), b"")
+        reader.seek(0)
+        self.assertEqual(reader.read(), self.payload)
+
+    def test_text(self):
+        text = "première ligne\nsecond line\n" + "x" * 300
+        write_blob(self.session, Document, Document.body, {"id": 1}, io.StringIO(text), chunk_size=50)
+        reader = open_blob(self.session, Document, Document.body, {"id": 1}, text=True, chunk_size=8)
+
+        self.assertEqual(reader.size, len(text))
+        self.assertEqual(reader.readline(), "première ligne\n")
+        self.assertEqual(reader.readline(), "second line\n")
+        self.assertEqual(reader.read(), "x" * 300)
+
+    def test_missing_row(self):
+        with self.assertRaises(ValueError):
+            open_blob(self.session, Document, Document.data, {"id": 2}).read(1)
+        with self.assertRaises(ValueError):
+            write_blob(self.session, Document, Document.data, {"id": 2}, b"x")
+
+    def test_sql_server_statements(self):
+        session = MagicMock()
+        session.execute.return_value.fetchone.return_value = (b"abc",)
+        write_blob(session, Document, Document.data, {"id": 1}, b"abcdef", chunk_size=3, dialect="mssql")
+        self.assertEqual(session.execute.call_args.args,
+                         ("UPDATE documents SET data.WRITE(?, NULL, NULL) WHERE id = ?", [b"def", 1]))
+
+        open_blob(session, Document, Document.data, {"id": 1}, dialect="mssql").read(3)
+        self.assertEqual(session.execute.call_args.args,
+                         ("SELECT SUBSTRING(data, ?, ?) FROM documents WHERE id = ?", [1, 1024 * 1024, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import decimal
+import time
+import unittest
+from unittest.mock import MagicMock
+from dbrm import Mirror, Select, Table, Column, String, Float, Integer
+from dbrm.expression import text
+from dbrm.mirror import referenced_tables
+
+
+class Currency(Table):
+    __tablename__ = 'currencies'
+    code = Column(String, primary_key=True)
+    rate = Column(Float)
+    version = Column(Integer)
+
+
+def describe(*columns):
+    return [(name, type_code, None, None, None, None, True) for name, type_code in columns]
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.engine = MagicMock()
+        self.cursor = self.engine.connect.return_value.cursor.return_value
+        self.cursor.description = describe(("code", str), ("rate", float), ("version", int))
+        self.cursor.fetchall.return_value = [("USD", 1.0, 1), ("EUR", 0.9, 2)]
+        self.mirror = Mirror(self.engine, background=False, max_staleness=60)
+        self.addCleanup(self.mirror.close)
+
+    def test_selects_are_served_locally(self):
+        self.mirror.add(Currency, watermark="version")
+        self.cursor.execute.reset_mock()
+
+        rows = Select().from_(Currency).where(text("code = ?", "EUR")).all(self.mirror)
+        self.assertEqual([(row.code, row.rate) for row in rows], [("EUR", 0.9)])
+        self.cursor.execute.assert_not_called()
+        self.assertEqual(self.mirror.metrics.get("local_reads"), 1)
+
+    def test_incremental_refresh_upserts_changed_rows(self):
+        self.mirror.add(Currency, watermark="version")
+        self.cursor.fetchall.return_value = [("EUR", 0.95, 3), ("JPY", 150.0, 4)]
+        self.assertEqual(self.mirror.refresh("currencies"), 2)
+
+        self.cursor.execute.assert_called_with("SELECT * FROM currencies WHERE version > ?", [2])
+        result = self.mirror.execute("SELECT code, rate FROM currencies ORDER BY code")
+        self.assertEqual(result.fetchall(), [("EUR", 0.95), ("JPY", 150.0), ("USD", 1.0)])
+        self.assertEqual(self.mirror.tables["currencies"].last_watermark, 4)
+
+    def test_full_refresh_drops_deleted_rows(self):
+        self.mirror.add(Currency, watermark="version")
+        self.cursor.fetchall.return_value = [("USD", 1.0, 1)]
+        self.mirror.refresh(full=True)
+
+        self.cursor.execute.assert_called_with("SELECT * FROM currencies")
+        self.assertEqual(self.mirror.execute("SELECT code FROM currencies").fetchall(), [("USD",)])
+
+    def test_stale_tables_are_refreshed_before_reads(self):
+        self.mirror.add(Currency, watermark="version")
+        self.mirror.tables["currencies"].refreshed_at = time.monotonic() - 120
+        self.cursor.fetchall.return_value = []
+        self.mirror.execute("SELECT * FROM currencies")
+
+        self.assertEqual(self.mirror.metrics.get("stale_refreshes"), 1)
+        self.assertTrue(self.mirror.is_fresh("currencies"))
+
+    def test_other_tables_go_to_the_server(self):
+        self.mirror.add(Currency)
+        self.cursor.fetchall.return_value = [(7,)]
+        result = self.mirror.execute("SELECT o.id FROM orders o JOIN currencies c ON o.code = c.code")
+
+        self.assertEqual(result.fetchall(), [(7,)])
+        self.assertEqual(self.mirror.metrics.get("remote_reads"), 1)
+
+    def test_decimals_keep_their_digits(self):
+        self.cursor.description = describe(("code", str), ("amount", decimal.Decimal))
+        self.cursor.fetchall.return_value = [("a", decimal.Decimal("0.10")),
+                                             ("b", decimal.Decimal("12345678901234567.89"))]
+        self.mirror.add(Select("code", "amount").from_(Currency), name="amounts", key=["code"])
+
+        rows = self.mirror.execute("SELECT amount FROM amounts ORDER BY code").fetchall()
+        self.assertEqual(rows, [(decimal.Decimal("0.10"),), (decimal.Decimal("12345678901234567.89"),)])
+
+    def test_mirror_a_select(self):
+        with self.assertRaises(ValueError):
+            self.mirror.add(Select("code", "rate").from_(Currency))
+        self.cursor.description = describe(("code", str), ("rate", float))
+        self.cursor.fetchall.return_value = [("USD", 1.0)]
+        self.mirror.add(Select("code", "rate").from_(Currency).where(text("rate > ?", 0)),
+                        name="rates", key=["code"])
+        self.assertEqual(self.mirror.execute("SELECT * FROM rates").fetchall(), [("USD", 1.0)])
+
+    def test_writes_go_to_the_server(self):
+        self.mirror.add(Currency)
+        self.mirror.execute("DELETE FROM currencies WHERE code = ?", ["USD"])
+        self.mirror.execute("INSERT INTO history SELECT * FROM currencies")
+
+        self.assertEqual(self.mirror.metrics.get("remote_reads"), 2)
+        self.assertEqual(self.mirror.execute("SELECT COUNT(*) FROM currencies").fetchall(), [(2,)])
+
+    def test_referenced_tables(self):
+        self.assertEqual(referenced_tables("SELECT * FROM a JOIN B ON a.id = B.id WHERE x IN (SELECT y FROM c)"),
+                         {"a", "b", "c"})
+        self.assertEqual(referenced_tables("SELECT * FROM currencies c, orders AS o WHERE c.code = o.code"),
+                         {"currencies", "orders"})
+        self.assertEqual(referenced_tables("SELECT * FROM (SELECT code FROM currencies) AS t, dbo.rates"),
+                         {"currencies", "dbo.rates"})
+        self.assertEqual(referenced_tables("SELECT 'FROM x' FROM a LEFT JOIN b ON 1 = 1"), {"a", "b"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from dbrm import LoadReport
+from dbrm.remote import _insert_dataframe_to_table
+from dbrm.sqltable import SQLTable
+
+
+class TestLoadReport(unittest.TestCase):
+    def test_stages_accumulate(self):
+        report = LoadReport("t")
+        with report.run():
+            for _ in range(3):
+                with report.stage("insert", rows=10, bytes=100):
+                    sum(range(10000))
+            with report.stage("read_csv") as timer:
+                timer.rows = 5
+
+        insert = report.stages["insert"]
+        self.assertEqual((insert.calls, insert.rows, insert.bytes), (3, 30, 300))
+        self.assertGreater(insert.wall, 0)
+        self.assertEqual(report.stages["read_csv"].rows, 5)
+        self.assertIsNone(report.peak_memory)
+        self.assertGreaterEqual(report.wall, insert.wall)
+        self.assertIn("insert", report.summary())
+        self.assertEqual(set(report.as_dict()["stages"]), {"insert", "read_csv"})
+
+    def test_trace_memory(self):
+        report = LoadReport(trace_memory=True)
+        with report.run():
+            with report.stage("allocate"):
+                data = [bytes(1024) for _ in range(1000)]
+        self.assertGreater(report.peak_memory, 1000 * 1024)
+        del data
+
+    def test_profile_output(self):
+        path = os.path.join(tempfile.mkdtemp(), "load.prof")
+        with LoadReport(profile=path).run():
+            sorted(range(1000), key=lambda x: -x)
+        self.assertIsInstance(pstats.Stats(path), pstats.Stats)
+
+        report = LoadReport(profile=True)
+        with report.run():
+            pass
+        self.assertIsInstance(report.profile, pstats.Stats)
+
+
+class TestLoaderReports(unittest.TestCase):
+    def setUp(self):
+        self.frame = pd.DataFrame({"id": [3, 1, 2], "name": ["c", None, "b"]})
+
+    def test_dataframe_insert_stages(self):
+        report = LoadReport("people")
+        _insert_dataframe_to_table(self.frame, "people", MagicMock(), report)
+
+        self.assertEqual(report.rows, 3)
+        self.assertEqual(list(report.stages), ["convert", "insert", "commit"])
+        self.assertEqual(report.stages["insert"].rows, 3)
+        self.assertGreater(report.stages["convert"].bytes, 0)
+
+    def test_sqltable_insert_returns_report(self):
+        table = SQLTable(MagicMock(), "people", self.frame, if_exists="append", sort_by=["id"])
+        report = table.insert(chunk_size=2)
+
+        self.assertIs(report, table.report)
+        self.assertEqual(report.rows, 3)
+        self.assertEqual(report.stages["insert"].calls, 2)
+        self.assertEqual(report.stages["commit"].calls, 2)
+        self.assertIn("sort", report.stages)
+        self.assertIn("infer_types", report.stages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import MagicMock
+from dbrm import Select, Table, Column, Integer, String, JSON, Text
+from dbrm.rows import row_class, _build_row_class, _CACHE_SIZE
+
+
+class TestRowClasses(unittest.TestCase):
+    def setUp(self):
+        class Document(Table):
+            __tablename__ = 'documents'
+            id = Column(Integer, primary_key=True)
+            title = Column(String)
+            meta = Column(JSON)
+            body = Column(Text, lazy=True)
+            extra = Column(JSON, lazy=True)
+
+        self.Document = Document
+
+    def test_slots_row(self):
+        make_row = self.Document.row_class()
+        self.assertIs(make_row, self.Document.row_class())
+        row = make_row((1, "a", '{"k": 1}', b"text", '[1, 2]'))
+
+        self.assertEqual(row.id, 1)
+        self.assertEqual(row["title"], "a")
+        self.assertEqual(row.meta, {"k": 1})
+        self.assertEqual(row._raw_body, b"text")  # not decoded yet
+        self.assertEqual(row.body, "text")
+        self.assertEqual(row.extra, [1, 2])
+        self.assertEqual(list(row), [1, "a", {"k": 1}, "text", [1, 2]])
+        self.assertFalse(hasattr(row, "__dict__"))
+
+    def test_rows_hash_by_value(self):
+        make_row = row_class(("id", "name"))
+        first, second = make_row((1, "a")), make_row((1, "a"))
+        self.assertEqual(first, second)
+        self.assertEqual(len({first, second, make_row((2, "a"))}), 2)
+
+    def test_class_cache_is_bounded(self):
+        for i in range(_CACHE_SIZE + 10):
+            row_class((f"c{i}",))
+        self.assertEqual(_build_row_class.cache_info().currsize, _CACHE_SIZE)
+
+    def test_select_all_maps_to_table(self):
+        session = MagicMock()
+        cursor = session.execute.return_value
+        cursor.description = [("id",), ("title",)]
+        cursor.fetchall.return_value = [(1, "a"), (2, "b")]
+
+        rows = Select("id", "title").from_(self.Document).all(session)
+        self.assertEqual(type(rows[0]).__name__, "DocumentRow")
+        self.assertEqual([row.title for row in rows], ["a", "b"])
+        self.assertEqual(rows[1]._asdict(), {"id": 2, "title": "b"})
+
+    def test_unnamed_and_duplicate_columns(self):
+        session = MagicMock()
+        cursor = session.execute.return_value
+        cursor.description = [("id",), ("id",), ("COUNT(*)",)]
+        cursor.fetchone.return_value = (1, 2, 3)
+
+        row = Select("a.id", "b.id", "COUNT(*)").from_("a").first(session)
+        self.assertEqual(row._fields, ("id", "id_1", "col2"))
+        self.assertEqual((row.id, row.id_1, row.col2), (1, 2, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
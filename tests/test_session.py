@@ -0,0 +1,319 @@
+import unittest
+import asyncio
+import gc
+import threading
+import time
+from unittest.mock import MagicMock
+from dbrm import scoped_session, deadline, QueryTimeout, Metrics, Session, Select, Insert, Table, Column, Integer, String
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.cursor.description = [("id",), ("name",)]
+        self.cursor.fetchall.side_effect = [[(1, "a")], [(2, "b")]]
+        self.cursor.nextset.side_effect = [True, False]
+        self.cursor.rowcount = -1
+
+        self.session = Session(MagicMock())
+        self.session._cursor = self.cursor
+        self.session._connection = MagicMock()
+
+    def test_batch_single_round_trip(self):
+        batch = self.session.batch(
+            Select("id", "name").from_("users").where("id = 1"),
+            Insert("users").values(id=2, name="b"),
+        )
+        results = batch.run()
+
+        self.cursor.execute.assert_called_once_with(
+            "SELECT id, name FROM users WHERE id = 1;\nINSERT INTO users (id, name) VALUES (?, ?)",
+            [2, "b"],
+        )
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].fetchall(), [(1, "a")])
+        self.assertEqual(results[1].columns, ["id", "name"])
+
+    def test_batch_collects_ddl(self):
+        class BatchUser(Table):
+            __tablename__ = 'batch_users'
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+
+        self.cursor.nextset.side_effect = [False]
+        self.cursor.description = None
+        with self.session.batch() as batch:
+            BatchUser.create(batch)
+            BatchUser.drop(batch)
+
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        sql = self.cursor.execute.call_args[0][0]
+        self.assertIn("CREATE TABLE IF NOT EXISTS batch_users", sql)
+        self.assertIn("DROP TABLE IF EXISTS batch_users", sql)
+        self.session._connection.commit.assert_called_once()
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        class Account(Table):
+            __tablename__ = 'accounts'
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+            balance = Column(Integer, default=0)
+
+        self.Account = Account
+        self.cursor = MagicMock()
+        self.session = Session(MagicMock())
+        self.session._cursor = self.cursor
+        self.session._connection = MagicMock()
+
+    def test_flush_batches_inserts(self):
+        self.session.add_all([self.Account(id=1, name="a"), self.Account(id=2, name="b"),
+                              self.Account(id=3)])
+        counts = self.session.flush()
+
+        self.assertEqual(counts, {"inserted": 3, "updated": 0, "deleted": 0})
+        self.assertEqual(self.cursor.executemany.call_count, 2)
+        sql, rows = self.cursor.executemany.call_args_list[0][0]
+        self.assertEqual(sql, "INSERT INTO accounts (id, name, balance) VALUES (?, ?, ?)")
+        self.assertEqual(rows, [(1, "a", 0), (2, "b", 0)])
+
+    def test_identity_map_and_dirty_tracking(self):
+        self.cursor.fetchone.return_value = (7, "x", 10)
+        account = self.session.get(self.Account, 7)
+        self.assertIs(self.session.get(self.Account, 7), account)
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        self.assertEqual(self.cursor.execute.call_args[0],
+                         ("SELECT id, name, balance FROM accounts WHERE id = ?", [7]))
+
+        account.balance = 10  # unchanged value is not written
+        self.assertEqual(self.session.flush()["updated"], 0)
+
+        account.balance = 25
+        self.session.delete(self.session.get(self.Account, 7))
+        self.assertIsNone(self.session.get(self.Account, 7))
+        self.session.commit()
+
+        statements = [c[0] for c in self.cursor.executemany.call_args_list]
+        self.assertEqual(statements, [("DELETE FROM accounts WHERE id = ?", [(7,)])])
+        self.session._connection.commit.assert_called_once()
+
+    def test_update_groups_by_changed_columns(self):
+        rows = iter([(1, "a", 0), (2, "b", 0)])
+        self.cursor.fetchone.side_effect = lambda: next(rows)
+        first, second = self.session.get(self.Account, 1), self.session.get(self.Account, 2)
+        first.balance, second.balance = 5, 6
+
+        self.assertEqual(self.session.flush()["updated"], 2)
+        self.cursor.executemany.assert_called_once_with(
+            "UPDATE accounts SET balance = ? WHERE id = ?", [(5, 1), (6, 2)]
+        )
+
+    def test_generated_key_is_read_back(self):
+        self.session.engine.dialect = 'sqlite'
+        self.cursor.fetchone.return_value = (11,)
+        account = self.Account(name="a")
+        self.session.add(account)
+        self.session.flush()
+
+        self.cursor.execute.assert_called_once_with(
+            "INSERT INTO accounts (name, balance) VALUES (?, ?) RETURNING id", ["a", 0]
+        )
+        self.assertEqual(account.id, 11)
+        self.assertIs(self.session.get(self.Account, 11), account)
+
+        self.session.engine.dialect = 'mssql'
+        self.session.add(self.Account(name="b"))
+        self.session.flush()
+        self.assertEqual(self.cursor.execute.call_args[0][0],
+                         "INSERT INTO accounts (name, balance) OUTPUT INSERTED.id VALUES (?, ?)")
+
+    def test_unread_generated_key_raises_on_change(self):
+        self.session.engine.dialect = 'oracle'
+        account = self.Account(name="a")
+        self.session.add(account)
+        self.session.flush()
+        self.assertIsNone(account.id)
+
+        account.balance = 5
+        with self.assertRaises(ValueError):
+            self.session.flush()
+
+    def test_rollback_restores_flushed_state(self):
+        self.cursor.fetchone.return_value = (1, "a", 0)
+        account = self.session.get(self.Account, 1)
+        account.balance = 5
+        added = self.Account(id=2, name="b")
+        self.session.add(added)
+        self.session.flush()
+        self.session.rollback()
+
+        self.session._connection.rollback.assert_called_once()
+        self.assertFalse(added._state.persistent)
+        self.assertNotIn((self.Account, (2,)), self.session.identity_map)
+        self.assertIs(self.session.get(self.Account, 1), account)
+        self.cursor.executemany.reset_mock()
+        self.assertEqual(self.session.flush()["updated"], 1)
+        self.cursor.executemany.assert_called_once_with(
+            "UPDATE accounts SET balance = ? WHERE id = ?", [(5, 1)]
+        )
+
+
+
+class TestScopedSession(unittest.TestCase):
+    def setUp(self):
+        self.engine = MagicMock()
+        self.engine.routes_reads = False
+
+    def test_one_session_per_thread(self):
+        db = scoped_session(self.engine)
+        main = db()
+        self.assertIs(db(), main)
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(db()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen[0], main)
+
+        db.execute("SELECT 1")
+        self.engine.connect.return_value.cursor.return_value.execute.assert_called_with("SELECT 1")
+
+        db.remove()
+        self.assertFalse(db.has_session)
+        self.assertIsNot(db(), main)
+        self.engine.connect.return_value.close.assert_called()
+
+    def test_finished_threads_release_sessions(self):
+        db = scoped_session(self.engine)
+        thread = threading.Thread(target=lambda: db().execute("SELECT 1"))
+        thread.start()
+        thread.join()
+        del thread
+        gc.collect()
+
+        stats = db.stats()
+        self.assertEqual(stats["sessions_created"], 1)
+        self.assertEqual(stats["sessions_active"], 0)
+        self.assertEqual(stats["sessions_closed"], 1)
+
+    def test_scope_removes_and_rolls_back(self):
+        db = scoped_session(self.engine)
+        outer = db()
+        with self.assertRaises(RuntimeError):
+            with db.scope() as session:
+                self.assertIs(db(), session)
+                self.assertIsNot(session, outer)
+                session.execute("UPDATE t SET x = 1")
+                raise RuntimeError("request failed")
+        self.engine.connect.return_value.rollback.assert_called()
+        self.assertIs(db(), outer)
+        self.assertEqual(db.stats()["sessions_active"], 1)
+        self.assertEqual(db.stats()["sessions_active_peak"], 2)
+
+    def test_context_scope(self):
+        db = scoped_session(self.engine, scope="context")
+
+        async def handler():
+            with db.scope():
+                first = db()
+                await asyncio.sleep(0)
+                self.assertIs(db(), first)
+                return first
+
+        async def main():
+            return await asyncio.gather(handler(), handler())
+
+        first, second = asyncio.run(main())
+        self.assertIsNot(first, second)
+        self.assertEqual(db.stats()["sessions_active"], 0)
+
+
+
+class TestTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.cancelled = threading.Event()
+        self.cursor = MagicMock()
+        self.cursor.cancel.side_effect = self.cancelled.set
+
+        def execute(*args):
+            # Blocks like a long-running query until cancelled
+            if "slow" in args[0] and self.cancelled.wait(5):
+                raise RuntimeError("Operation canceled")
+            return self.cursor
+        self.cursor.execute.side_effect = execute
+
+        self.engine = MagicMock()
+        self.engine.routes_reads = False
+        self.engine.timeout = None
+        self.engine.metrics = Metrics()
+        self.engine.connect.return_value.cursor.return_value = self.cursor
+
+    def test_statement_timeout(self):
+        session = Session(self.engine)
+        with self.assertRaises(QueryTimeout):
+            session.execute("SELECT slow", timeout=0.05)
+        self.assertTrue(self.cancelled.is_set())
+        self.assertEqual(self.engine.metrics.get("statements_timed_out"), 1)
+
+        self.cursor.fetchall.return_value = [(1,)]
+        self.assertEqual(session.execute("SELECT 1", timeout=0.05).fetchall(), [(1,)])
+
+    def test_timeout_covers_fetches(self):
+        def fetchall():
+            # Rows stream in until the watchdog cancels the statement
+            if self.cancelled.wait(5):
+                raise RuntimeError("Operation canceled")
+        self.cursor.fetchall.side_effect = fetchall
+        session = Session(self.engine)
+        cursor = session.execute("SELECT 1", timeout=0.05)
+        with self.assertRaises(QueryTimeout):
+            cursor.fetchall()
+        self.assertEqual(self.engine.metrics.get("statements_timed_out"), 1)
+
+    def test_late_timer_does_not_cancel_the_next_statement(self):
+        session = Session(self.engine)
+        session.execute("SELECT 1", timeout=0.05)
+        session.execute("SELECT 2")
+        time.sleep(0.1)
+        self.assertFalse(self.cancelled.is_set())
+
+    def test_watchdogs_share_one_thread(self):
+        session = Session(self.engine)
+        session.execute("SELECT 1", timeout=5)
+        before = threading.active_count()
+        for _ in range(20):
+            session.execute("SELECT 1", timeout=5)
+        self.assertEqual(threading.active_count(), before)
+        with self.assertRaises(QueryTimeout):
+            session.execute("SELECT slow", timeout=0.05)
+
+    def test_engine_and_session_defaults(self):
+        self.engine.timeout = 0.05
+        with self.assertRaises(QueryTimeout):
+            Session(self.engine).execute("SELECT slow")
+        self.cancelled.clear()
+        with self.assertRaises(QueryTimeout):
+            Session(self.engine, timeout=0.05).execute("SELECT slow")
+
+    def test_deadline_is_inherited(self):
+        session = Session(self.engine)
+        with deadline(0.05):
+            with self.assertRaises(QueryTimeout):
+                session.execute("SELECT slow", timeout=10)
+            with self.assertRaises(QueryTimeout):
+                session.execute("SELECT 1")
+        self.assertEqual(self.engine.metrics.get("statements_timed_out"), 2)
+        session.execute("SELECT 1")
+
+    def test_cancel_from_another_thread(self):
+        session = Session(self.engine)
+        session.execute("SELECT 1")
+        threading.Timer(0.05, session.cancel).start()
+        with self.assertRaises(RuntimeError):
+            session.execute("SELECT slow")
+        self.assertEqual(self.engine.metrics.get("statements_cancelled"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from dbrm import ShardedEngine, Select, Result
+
+
+class TestShardedEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = ShardedEngine([MagicMock(), MagicMock()], lambda key: key % 2, "customer_id")
+        self.description = [("customer_id",), ("amount",)]
+
+    def fan_out(self, *shard_rows):
+        results = {i: Result(rows, self.description) for i, rows in enumerate(shard_rows)}
+        return patch.object(self.engine, 'fan_out', return_value=results)
+
+    def test_order_by_limit_merge(self):
+        with self.fan_out([(2, 50), (4, 20), (6, 10)], [(1, 40), (3, 30)]) as fan_out:
+            query = Select("customer_id", "amount").from_("events").order_by("amount DESC").limit(2).offset(1)
+            result = self.engine.select(query)
+
+        shard_query = fan_out.call_args[0][0]
+        self.assertEqual(shard_query.limit_count, 3)
+        self.assertIsNone(shard_query.offset_count)
+        self.assertEqual(query.limit_count, 2)
+        self.assertEqual(result.fetchall(), [(1, 40), (3, 30)])
+
+    def test_null_placement_follows_the_dialect(self):
+        shards = ([(1, None), (3, 30)], [(4, None), (2, 10)])
+        query = Select("customer_id", "amount").from_("events").order_by("amount")
+        with self.fan_out(*shards):
+            self.assertEqual(self.engine.select(query).fetchall(), [(1, None), (4, None), (2, 10), (3, 30)])
+
+        for shard in self.engine.shards.values():
+            shard.dialect = "postgresql"
+        shards = ([(3, 30), (1, None)], [(2, 10), (4, None)])
+        with self.fan_out(*shards):
+            self.assertEqual(self.engine.select(query).fetchall(), [(2, 10), (3, 30), (1, None), (4, None)])
+
+        shards = ([(3, 30), (1, None)], [(2, 10), (4, None)])
+        query = Select("customer_id", "amount").from_("events").order_by("amount DESC NULLS LAST")
+        with self.fan_out(*shards):
+            self.assertEqual(self.engine.select(query).fetchall(), [(3, 30), (2, 10), (1, None), (4, None)])
+
+    def test_order_by_expression_is_rejected(self):
+        for term in ("SUM(amount)", "amount + 1 DESC"):
+            with self.fan_out([(1, 2)], [(3, 4)]):
+                with self.assertRaises(ValueError):
+                    self.engine.select(Select("customer_id", "amount").from_("events").order_by(term))
+
+    def test_aggregate_recombination(self):
+        self.description = [("region",), ("n",), ("total",), ("lo",), ("hi",)]
+        with self.fan_out([("eu", 2, 30, 5, 25), ("us", 1, 7, 7, 7)], [("eu", 3, 12, 1, 9)]):
+            query = (Select("region", "COUNT(*) AS n", "SUM(amount)", "MIN(amount)", "MAX(amount)")
+                     .from_("events").group_by("region").order_by("region"))
+            result = self.engine.select(query)
+
+        self.assertEqual(result.fetchall(), [("eu", 5, 42, 1, 25), ("us", 1, 7, 7, 7)])
+
+    def test_average_is_merged_from_sum_and_count(self):
+        self.description = [("region",), ("avg_sum_1",), ("avg_count_1",)]
+        with self.fan_out([("eu", 30, 3), ("us", 7, 1)], [("eu", 12, 1), ("us", None, 0)]) as fan_out:
+            query = (Select("region", "AVG(amount) AS mean").from_("events")
+                     .group_by("region").order_by("mean DESC"))
+            result = self.engine.select(query)
+
+        shard_query = fan_out.call_args[0][0]
+        self.assertEqual(shard_query.columns,
+                         ["region", "SUM(amount) AS avg_sum_1", "COUNT(amount) AS avg_count_1"])
+        self.assertEqual(shard_query.order_by_columns, [])
+        self.assertEqual(result.fetchall(), [("eu", 10.5), ("us", 7.0)])
+        self.assertEqual([col[0] for col in result.description], ["region", "mean"])
+
+    def test_unmergeable_aggregate(self):
+        for column in ("SUM(amount) / COUNT(*)", "COUNT(DISTINCT amount)", "STDEV(amount)",
+                       "MAX(amount) - MIN(amount) AS spread"):
+            with self.fan_out([(1,)], [(2,)]):
+                with self.assertRaises(ValueError):
+                    self.engine.select(Select("region", column).from_("events").group_by("region"))
+
+    def test_key_routing(self):
+        query = Select("*").from_("events").where("customer_id = 3")
+        with patch.object(self.engine, 'session') as session:
+            self.engine.execute(query)
+        session.assert_called_once_with(3)
+
+    def test_insert_batches_per_shard(self):
+        rows = [{"customer_id": i, "amount": i * 10} for i in range(5)]
+        counts = self.engine.insert("events", rows, batch_size=2)
+        self.assertEqual(counts, {0: 3, 1: 2})
+
+        cursor = self.engine.shards[0].connect.return_value.cursor.return_value
+        self.assertEqual(cursor.executemany.call_count, 2)
+        sql, values = cursor.executemany.call_args_list[0][0]
+        self.assertEqual(sql, "INSERT INTO events (customer_id, amount) VALUES (?, ?)")
+        self.assertEqual(values, [(0, 0), (2, 20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import datetime
+import gc
+import os
+import sqlite3
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+from dbrm import Table, Column, Integer, String, JSON, Select, SpilledResult
+
+
+class Order(Table):
+    __tablename__ = 'orders'
+    id = Column(Integer, primary_key=True)
+    customer = Column(String)
+    total = Column(float)
+    meta = Column(JSON)
+
+
+class TestSpilledResult(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, total REAL, meta TEXT)")
+        self.connection.executemany(
+            "INSERT INTO orders VALUES (?, ?, ?, ?)",
+            [(i, f"c{i % 10}", None if i % 5 == 0 else i / 2, '{"n": %d}' % i) for i in range(5000)],
+        )
+        self.session = MagicMock()
+        self.session.execute.side_effect = lambda sql, params=None: self.connection.execute(sql, params or [])
+
+    def test_small_results_stay_in_memory(self):
+        with Select().from_(Order).where(Order.id < 10).spill(self.session) as result:
+            self.assertFalse(result.spilled)
+            self.assertEqual(len(result), 10)
+            self.assertEqual(result[3].meta, {"n": 3})
+            self.assertEqual(list(result.to_pandas().columns), ["id", "customer", "total", "meta"])
+
+    def test_spill_to_disk(self):
+        result = Select().from_(Order).spill(self.session, memory_limit=20000, batch_size=500)
+        self.assertTrue(result.spilled)
+        self.assertGreater(result.nbytes, 0)
+        self.assertEqual(len(result), 5000)
+
+        self.assertEqual((result[7].id, result[7].customer, result[7].total), (7, "c7", 3.5))
+        self.assertIsNone(result[10].total)
+        self.assertEqual(result[-1].meta, {"n": 4999})
+        self.assertEqual([row.id for row in result[498:503]], [498, 499, 500, 501, 502])
+        self.assertEqual([row.id for row in result[:9:4]], [0, 4, 8])
+        self.assertEqual(sum(1 for _ in result), 5000)
+
+        ids = result.column("id")
+        self.assertIsInstance(ids, np.memmap)
+        frame = result.to_pandas(["id", "total"])
+        self.assertEqual(frame["id"].sum(), sum(range(5000)))
+        self.assertEqual(frame["total"].isna().sum(), 1000)
+
+        path = result.path
+        del result, ids, frame
+        gc.collect()
+        self.assertFalse(os.path.exists(path))
+
+    def test_nullable_and_mixed_columns(self):
+        result = SpilledResult(["count", "day", "value"], memory_limit=1)
+        result.append([(None, None, 1), (None, datetime.date(2024, 1, 1), 2)])
+        result.append([(3, datetime.date(2024, 1, 2), "three"), (True, None, 2 ** 70)])
+        result.finish()
+
+        self.assertEqual(result[:], [
+            (None, None, 1),
+            (None, datetime.date(2024, 1, 1), 2),
+            (3, datetime.date(2024, 1, 2), "three"),
+            (True, None, 2 ** 70),
+        ])
+        frame = result.to_pandas()
+        self.assertEqual(frame["value"].dtype, object)
+        self.assertTrue(pd.isna(frame["day"][0]))
+        result.close()
+        self.assertFalse(os.path.exists(result.path))
+
+    def test_demoted_column_is_rewritten_in_segments(self):
+        result = SpilledResult(["value"], memory_limit=1)
+        for start in range(0, 1000, 100):
+            result.append([(i,) for i in range(start, start + 100)])
+        result.append([("late",)])
+        result.finish()
+
+        column = result._files[0]
+        self.assertEqual(column.layout, 'object')
+        self.assertEqual(len(column._segments), 11)
+        self.assertEqual(result[499], (499,))
+        self.assertEqual(column._cache[0], 4)
+        self.assertEqual(result[-2:], [(999,), ("late",)])
+        result.close()
+
+    def test_nullable_integers(self):
+        result = SpilledResult(["n"], memory_limit=1)
+        result.append([(1,), (None,), (3,)])
+        frame = result.finish().to_pandas()
+        self.assertEqual(str(frame["n"].dtype), "Int64")
+        self.assertEqual(frame["n"].tolist(), [1, pd.NA, 3])
+        result.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
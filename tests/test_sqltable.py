@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from dbrm.sqltable import SQLTable
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.cursor.execute.return_value = self.cursor
+        # Current contents of the target table
+        self.cursor.fetchall.return_value = [
+            (1, "a", 1.5),
+            (2, "b", None),
+            (3, "c", 3.0),
+        ]
+        self.frame = pd.DataFrame({
+            "id": [1, 2, 4],
+            "name": ["a", "B", "d"],
+            "score": [1.5, None, 4.0],
+        })
+
+    def statements(self):
+        return {call.args[0]: call.args[1] for call in self.cursor.executemany.call_args_list}
+
+    def test_sync_writes_only_differences(self):
+        table = SQLTable(self.cursor, "scores", self.frame, if_exists="sync", key_columns=["id"])
+        counts = table.insert()
+
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1})
+        statements = self.statements()
+        self.assertEqual(statements["INSERT INTO scores (id, name, score) VALUES (?, ?, ?)"], [(4, "d", 4.0)])
+        self.assertEqual(statements["UPDATE scores SET name = ?, score = ? WHERE id = ?"], [("B", None, 2)])
+        self.assertEqual(statements["DELETE FROM scores WHERE id = ?"], [(3,)])
+        self.cursor.commit.assert_called()
+
+    def test_sync_unchanged(self):
+        self.cursor.fetchall.return_value = [(1, "a", 1.5), (2, "B", None), (4, "d", 4.0)]
+        counts = SQLTable(self.cursor, "scores", self.frame, if_exists="sync", key_columns=["id"]).sync()
+
+        self.assertEqual(counts, {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 3})
+        self.cursor.executemany.assert_not_called()
+
+    def test_sync_with_stored_hashes(self):
+        table = SQLTable(self.cursor, "scores", self.frame, if_exists="sync",
+                         key_columns=["id"], hash_column="row_hash")
+        stored = table.data["row_hash"].tolist()
+        self.cursor.fetchall.return_value = [(1, stored[0]), (2, 0), (3, 123)]
+        counts = table.sync()
+
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1})
+        self.assertEqual(self.cursor.execute.call_args_list[-1].args[0], "SELECT id, row_hash FROM scores")
+        update = self.statements()["UPDATE scores SET name = ?, score = ?, row_hash = ? WHERE id = ?"]
+        self.assertEqual(update, [("B", None, stored[1], 2)])
+
+    def test_hash_column_is_bigint(self):
+        table = SQLTable(self.cursor, "scores", self.frame, if_exists="sync",
+                         key_columns=["id"], hash_column="row_hash")
+        self.assertEqual(table.dtypes[-1], "BIGINT")
+        self.assertEqual(table.input_sizes(["row_hash"]), [(-5, 0, 0)])
+
+        # Drivers may hand BIGINT back as strings or Decimals; NULL counts as changed
+        stored = table.data["row_hash"].tolist()
+        self.cursor.fetchall.return_value = [(1, str(stored[0])), (2, None), (4, stored[2])]
+        counts = table.sync()
+        self.assertEqual(counts, {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 2})
+
+    def test_sync_requires_unique_keys(self):
+        frame = pd.DataFrame({"id": [1, 1], "name": ["a", "b"]})
+        with self.assertRaises(ValueError):
+            SQLTable(self.cursor, "scores", frame, if_exists="sync")
+        with self.assertRaises(ValueError):
+            SQLTable(self.cursor, "scores", frame, if_exists="sync", key_columns=["id"]).sync()
+
+
+if __name__ == '__main__':
+    unittest.main()
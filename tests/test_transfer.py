@@ -1,8 +1,9 @@
+import decimal
 import unittest
 from unittest.mock import MagicMock, patch, call
 import pandas as pd
 from dbrm import Engine, Session
-from dbrm.remote import transfer_csv, infer_schema_from_dataframe
+from dbrm.remote import transfer_csv, transfer_table, infer_schema_from_dataframe
 
 
 class TestTransferCSV(unittest.TestCase):
@@ -46,17 +47,14 @@ class TestTransferCSV(unittest.TestCase):
                        if 'CREATE TABLE' in call[0][0]]
         self.assertTrue(any('employee_table' in call for call in create_calls))
         
-        # Find any execute calls with INSERT INTO
-        insert_calls = [call[0][0] for call in self.mock_session.execute.call_args_list 
+        # Rows are sent in one executemany call with explicit input sizes
+        insert_calls = [call for call in self.mock_session.executemany.call_args_list 
                         if 'INSERT INTO employee_table' in call[0][0]]
-        self.assertTrue(len(insert_calls) > 0)
+        self.assertEqual(len(insert_calls), 1)
+        self.assertIsNotNone(insert_calls[0].kwargs["input_sizes"])
         
         # Check that all data rows were processed
-        self.assertEqual(
-            len([call for call in self.mock_session.execute.call_args_list 
-                if 'INSERT INTO employee_table' in call[0][0]]), 
-            len(self.test_data)
-        )
+        self.assertEqual(len(insert_calls[0][0][1]), len(self.test_data))
         
     @patch('dbrm.remote.Session')
     def test_transfer_csv_with_existing_table(self, mock_session_class):
@@ -103,5 +101,60 @@ class TestTransferCSV(unittest.TestCase):
             )
 
 
+
+class TestTransferTable(unittest.TestCase):
+    def setUp(self):
+        rows = [(i, f"name{i}") for i in range(5)]
+        self.src_cursor = MagicMock()
+        self.src_cursor.description = [("id", int, None, 10, 10, 0, False), ("name", str, None, 40, 40, 0, True)]
+        self.src_cursor.fetchmany.side_effect = lambda size: [rows.pop(0) for _ in range(min(size, len(rows)))]
+        self.src_engine = MagicMock()
+        self.src_engine.connect.return_value.cursor.return_value = self.src_cursor
+
+        self.dst_cursor = MagicMock()
+        def execute(sql, *args):
+            if sql.endswith("WHERE 1 = 0"):
+                raise Exception("no such table")
+            return self.dst_cursor
+        self.dst_cursor.execute.side_effect = execute
+        self.dst_engine = MagicMock()
+        self.dst_engine.connect.return_value.cursor.return_value = self.dst_cursor
+
+    def test_streams_batches_into_new_table(self):
+        report = transfer_table(self.src_engine, "people", self.dst_engine, "people_copy", batch_size=2)
+
+        self.assertEqual(report["rows"], 5)
+        self.assertEqual(report["batches"], 3)
+        self.src_cursor.execute.assert_called_with("SELECT * FROM people")
+        self.dst_cursor.execute.assert_any_call("CREATE TABLE IF NOT EXISTS people_copy (id INTEGER, name VARCHAR(40))")
+        inserts = self.dst_cursor.executemany.call_args_list
+        self.assertEqual(inserts[0], call("INSERT INTO people_copy (id, name) VALUES (?, ?)", [(0, "name0"), (1, "name1")]))
+        self.assertEqual(len(inserts), 3)
+        self.assertTrue(self.dst_cursor.fast_executemany)
+        self.src_engine.connect.return_value.close.assert_called_once()
+        self.dst_engine.connect.return_value.close.assert_called_once()
+
+    def test_types_come_from_the_description(self):
+        self.src_cursor.description = [
+            ("id", int, None, 19, 19, 0, False),
+            ("note", str, None, 0, 0, 0, True),
+            ("price", decimal.Decimal, None, 12, 12, 2, True),
+            ("ratio", float, None, 53, 53, 0, True),
+            ("n", None, None, None, None, None, True),
+        ]
+        rows = [(1, "short", decimal.Decimal("1.50"), 0.5, 7)]
+        self.src_cursor.fetchmany.side_effect = lambda size: [rows.pop() for _ in range(len(rows))]
+        transfer_table(self.src_engine, "notes", self.dst_engine, "notes_copy")
+
+        self.dst_cursor.execute.assert_any_call(
+            "CREATE TABLE IF NOT EXISTS notes_copy "
+            "(id BIGINT, note TEXT, price DECIMAL(12, 2), ratio DOUBLE, n BIGINT)")
+
+    def test_reader_errors_are_raised(self):
+        self.src_cursor.fetchmany.side_effect = RuntimeError("connection lost")
+        with self.assertRaises(RuntimeError):
+            transfer_table(self.src_engine, "people", self.dst_engine, "people_copy")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,210 @@
+import glob
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from dbrm import BufferedWriter, Table, Column, Integer, String
+
+
+class Event(Table):
+    __tablename__ = 'events'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String)
+
+
+def wait_for(condition, timeout=5.0):
+    expires = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > expires:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class TestBufferedWriter(unittest.TestCase):
+    def setUp(self):
+        self.engine = MagicMock()
+        self.cursor = self.engine.connect.return_value.cursor.return_value
+
+    def inserted(self):
+        return [row for call in self.cursor.executemany.call_args_list for row in call.args[1]]
+
+    def test_flushes_when_batch_is_full(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=3, flush_interval=60)
+        for i in range(3):
+            writer.write({"id": i, "kind": "click"})
+        wait_for(lambda: writer.metrics.get("rows_written") == 3)
+
+        self.cursor.executemany.assert_called_once_with(
+            "INSERT INTO events (id, kind) VALUES (?, ?)", [(0, "click"), (1, "click"), (2, "click")]
+        )
+        self.engine.connect.return_value.commit.assert_called()
+        self.assertEqual(writer.stats()["flush_seconds"]["count"], 1)
+        writer.close()
+
+    def test_flushes_on_interval_and_close(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=0.05)
+        writer.write(id=1, kind="a")
+        wait_for(lambda: writer.metrics.get("rows_written") == 1)
+
+        writer.write(id=2, kind="b")
+        writer.write(id=3)
+        writer.close()
+        self.assertEqual(sorted(self.inserted()), [(1, "a"), (2, "b"), (3,)])
+        with self.assertRaises(RuntimeError):
+            writer.write(id=4)
+
+    def test_accepts_rows_from_many_threads(self):
+        writer = BufferedWriter(self.engine, Event, batch_size=50, flush_interval=0.05, max_rows=20)
+
+        def produce(start):
+            for i in range(start, start + 100):
+                writer.write(Event(id=i, kind="view"))
+
+        threads = [threading.Thread(target=produce, args=(n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.assertEqual(sorted(row[0] for row in self.inserted()), list(range(400)))
+        self.assertEqual(writer.stats()["pending_rows"], 0)
+        self.cursor.setinputsizes.assert_called()
+
+    def test_drop_policy(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60,
+                                max_rows=2, overflow="drop")
+        self.assertTrue(writer.write(id=1))
+        self.assertTrue(writer.write(id=2))
+        self.assertFalse(writer.write(id=3))
+        self.assertEqual(writer.metrics.get("rows_dropped"), 1)
+        writer.close()
+        self.assertEqual(self.inserted(), [(1,), (2,)])
+
+    def test_spill_policy(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60,
+                                max_rows=1, overflow="spill")
+        for i in range(3):
+            writer.write(id=i)
+        self.assertEqual(writer.metrics.get("rows_spilled"), 2)
+        self.assertEqual(writer.pending, 3)
+        writer.close()
+
+        self.assertEqual(sorted(self.inserted()), [(0,), (1,), (2,)])
+        self.assertFalse(os.path.exists(writer.spill_path))
+
+    def test_spilled_rows_survive_a_failing_drain(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=2, flush_interval=60,
+                                max_rows=1, overflow="spill")
+        with writer._cond:
+            # Park the background thread so only this test drains
+            writer._retry_at = time.monotonic() + 60
+        for i in range(4):
+            writer.write(id=i)
+        with writer._cond:
+            entries = writer._take(force=True)
+        writer._write(entries)
+        original = writer._write
+        writer._write = MagicMock(side_effect=RuntimeError("process stopped"))
+        writer._retry_at = 0.0
+        with self.assertRaises(RuntimeError):
+            writer._drain_spill()
+        self.assertEqual(writer.pending, 3)
+        self.assertEqual(glob.glob(writer.spill_path + ".*.draining"), [])
+
+        writer._write = original
+        writer.close()
+        self.assertEqual(sorted(self.inserted()), [(0,), (1,), (2,), (3,)])
+
+    def test_leftover_drain_is_loaded_on_start(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        spill_path = os.path.join(directory.name, "events.pkl")
+        with open(spill_path + ".x1.draining", "wb") as f:
+            for i in range(3):
+                pickle.dump({"id": i}, f)
+        with open(spill_path, "wb") as f:
+            pickle.dump({"id": 3}, f)
+
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60,
+                                overflow="spill", spill_path=spill_path)
+        self.assertEqual(writer.pending, 4)
+        writer.close()
+        self.assertEqual(sorted(self.inserted()), [(0,), (1,), (2,), (3,)])
+        self.assertEqual(os.listdir(directory.name), [])
+
+    def test_failed_flush_is_retried(self):
+        self.cursor.executemany.side_effect = [RuntimeError("deadlock"), None]
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60)
+        writer.write(id=1)
+        writer.flush()
+        self.assertEqual(writer.metrics.get("flush_errors"), 1)
+        self.assertEqual(writer.pending, 1)
+        self.engine.connect.return_value.rollback.assert_called()
+
+        writer.close()
+        self.assertEqual(writer.metrics.get("rows_written"), 1)
+
+    def test_close_raises_when_rows_are_left(self):
+        self.cursor.executemany.side_effect = RuntimeError("server gone")
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60)
+        writer.write(id=1)
+        with self.assertRaises(RuntimeError):
+            writer.close()
+        self.assertEqual(writer.pending, 1)
+
+    def test_bad_row_is_isolated_and_dead_lettered(self):
+        def insert(sql, rows):
+            if any(row[0] == 5 for row in rows):
+                raise ValueError("constraint violated")
+
+        self.cursor.executemany.side_effect = insert
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60, max_retries=2)
+        for i in range(8):
+            writer.write(id=i)
+        writer.flush()
+        self.assertEqual(writer.metrics.get("rows_written"), 7)
+        self.assertEqual(writer.pending, 1)
+
+        writer.flush()
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual([row for row, _ in writer.dead_letters], [{"id": 5}])
+        self.assertIsInstance(writer.dead_letters[0][1], ValueError)
+        writer.close()
+
+    def test_failures_back_off(self):
+        self.cursor.executemany.side_effect = RuntimeError("server gone")
+        writer = BufferedWriter(self.engine, "events", batch_size=1, flush_interval=60,
+                                retry_backoff=0.3, max_retries=100)
+        writer.write(id=1)
+        wait_for(lambda: writer.metrics.get("flush_errors") == 1)
+        time.sleep(0.15)
+        self.assertEqual(writer.metrics.get("flush_errors"), 1)
+        self.assertEqual(self.cursor.executemany.call_count, 1)
+        wait_for(lambda: writer.metrics.get("flush_errors") == 2)
+        with self.assertRaises(RuntimeError):
+            writer.close()
+
+    def test_multi_row_values(self):
+        writer = BufferedWriter(self.engine, "events", batch_size=100, flush_interval=60,
+                                method="values", max_params=4)
+        for i in range(3):
+            writer.write(id=i, kind="k")
+        writer.close()
+
+        statements = [call.args for call in self.cursor.execute.call_args_list]
+        self.assertEqual(statements, [
+            ("INSERT INTO events (id, kind) VALUES (?, ?), (?, ?)", [0, "k", 1, "k"]),
+            ("INSERT INTO events (id, kind) VALUES (?, ?)", [2, "k"]),
+        ])
+
+    def test_rejects_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            BufferedWriter(self.engine, "events", overflow="queue")
+
+
+if __name__ == '__main__':
+    unittest.main()